@@ -1,163 +1,1086 @@
-import pickle
+import bisect
+import mmap
+import struct
+import sys
+import zlib
+from array import array
 from BEABC import BEABC
+from ComponentTable import table as component_table
+from ReverseIndex import ReverseIndex
 from Selector import Algorithms
 
+# Maximum number of children kept in a sorted-array node before it is promoted to a hash node
+NODE_N_MAX_CHILDREN = 16
+
+# Snapshot file header: magic, byte order (1 little, 2 big), then the number of components, the length of the
+# components blob, the number of hash slots, nodes, values, value names, AS names and AS name component ids
+SNAPSHOT_MAGIC = b'PNPECHT1'
+SNAPSHOT_HEADER = struct.Struct('=8s9I')
+
+
+# region Adaptive nodes
+class _Leaf:
+    """
+    A node without children. `value` holds the hosting AS list, or None for an intermediary node.
+    """
+    __slots__ = ('value',)
+
+    def __init__(self, value=None):
+        self.value = value
+
+    def __len__(self):
+        return 0
+
+    def nbytes(self):
+        return sys.getsizeof(self)
+
+    def find(self, b):
+        return None
+
+    def insert(self, b, child):
+        return _Node1(self.value, b, child)
+
+    def replace(self, b, child):
+        raise KeyError(b)
+
+    def delete(self, b):
+        raise KeyError(b)
+
+    def items(self):
+        return ()
+
+
+class _Node1:
+    """
+    A node with exactly one child, i.e. the 'google' node of '/com/google/www'.
+    """
+    __slots__ = ('value', 'key', 'child')
+
+    def __init__(self, value, key, child):
+        self.value = value
+        self.key = key
+        self.child = child
+
+    def __len__(self):
+        return 1
+
+    def nbytes(self):
+        return sys.getsizeof(self)
+
+    def find(self, b):
+        return self.child if b == self.key else None
+
+    def insert(self, b, child):
+        if b < self.key:
+            return _NodeN(self.value, [b, self.key], [child, self.child])
+        return _NodeN(self.value, [self.key, b], [self.child, child])
+
+    def replace(self, b, child):
+        self.child = child
+
+    def delete(self, b):
+        return _Leaf(self.value)
+
+    def items(self):
+        return ((self.key, self.child),)
+
+
+class _NodeN:
+    """
+    A low fan-out node. Children are kept in two parallel lists sorted by component and searched with bisect.
+    """
+    __slots__ = ('value', 'keys', 'children')
+
+    def __init__(self, value, keys, children):
+        self.value = value
+        self.keys = keys
+        self.children = children
+
+    def __len__(self):
+        return len(self.keys)
+
+    def nbytes(self):
+        return sys.getsizeof(self) + sys.getsizeof(self.keys) + sys.getsizeof(self.children)
+
+    def find(self, b):
+        keys = self.keys
+        i = bisect.bisect_left(keys, b)
+        if i < len(keys) and keys[i] == b:
+            return self.children[i]
+        return None
+
+    def insert(self, b, child):
+        if len(self.keys) >= NODE_N_MAX_CHILDREN:
+            children = dict(zip(self.keys, self.children))
+            children[b] = child
+            return _NodeH(self.value, children)
+        i = bisect.bisect_left(self.keys, b)
+        self.keys.insert(i, b)
+        self.children.insert(i, child)
+        return self
+
+    def replace(self, b, child):
+        self.children[bisect.bisect_left(self.keys, b)] = child
+
+    def delete(self, b):
+        i = bisect.bisect_left(self.keys, b)
+        del self.keys[i]
+        del self.children[i]
+        if len(self.keys) == 1:
+            return _Node1(self.value, self.keys[0], self.children[0])
+        return self
+
+    def items(self):
+        return zip(self.keys, self.children)
+
+
+class _NodeH:
+    """
+    A high fan-out node, i.e. the TLD layer. Children are kept in a dictionary.
+    """
+    __slots__ = ('value', 'children')
+
+    def __init__(self, value=None, children=None):
+        self.value = value
+        self.children = {} if children is None else children
+
+    def __len__(self):
+        return len(self.children)
+
+    def nbytes(self):
+        return sys.getsizeof(self) + sys.getsizeof(self.children)
+
+    def find(self, b):
+        return self.children.get(b)
+
+    def insert(self, b, child):
+        self.children[b] = child
+        return self
+
+    def replace(self, b, child):
+        self.children[b] = child
+
+    def delete(self, b):
+        del self.children[b]
+        # Dictionaries never shrink, demote with some hysteresis so that churn does not flip the node type
+        if len(self.children) <= NODE_N_MAX_CHILDREN // 2:
+            keys = sorted(self.children)
+            return _NodeN(self.value, keys, [self.children[k] for k in keys])
+        return self
+
+    def items(self):
+        return self.children.items()
+# endregion Adaptive nodes
+
+
+# region Node helpers
+# Nodes are keyed on the component ids of the shared ComponentTable
+def _make_path(root, ids):
+    """
+    Walks the component ids from root, creating the missing nodes on the way.
+    :return: (the node of the last component, the number of created nodes, the number of bytes the nodes grew by)
+    """
+    created = 0
+    grown_bytes = 0
+    parent = None
+    parent_b = None
+    node = root
+    for b in ids:
+        child = node.find(b)
+        if child is None:
+            # this is where we handle non-existent nodes, the parent may be promoted to a larger node type
+            child = _Leaf()
+            before = node.nbytes()
+            grown = node.insert(b, child)
+            if grown is not node:
+                parent.replace(parent_b, grown)
+                node = grown
+            created += 1
+            grown_bytes += grown.nbytes() - before + child.nbytes()
+        parent, parent_b, node = node, b, child
+    return node, created, grown_bytes
+
+
+def _prune(root, ids):
+    """
+    Deletes the nodes at the end of the path of ids that carry no value and have no children, deepest first. Their
+    parents may be demoted to a smaller node type, the root is always kept as it is.
+    :return: (the number of deleted nodes, the number of bytes the nodes grew by, zero or negative)
+    """
+    path = [root]
+    node = root
+    for b in ids:
+        node = node.find(b)
+        if node is None:
+            return 0, 0
+        path.append(node)
+    deleted = 0
+    grown_bytes = 0
+    depth = len(ids)
+    while depth > 0:
+        node = path[depth]
+        if node.value is not None or len(node):
+            break
+        parent = path[depth - 1]
+        b = ids[depth - 1]
+        before = parent.nbytes()
+        if parent is root:
+            del root.children[b]
+            shrunk = root
+        else:
+            shrunk = parent.delete(b)
+            if shrunk is not parent:
+                path[depth - 2].replace(ids[depth - 2], shrunk)
+                path[depth - 1] = shrunk
+        grown_bytes += shrunk.nbytes() - before - node.nbytes()
+        deleted += 1
+        depth -= 1
+    return deleted, grown_bytes
+
+
+def _find_node(root, entry_key):
+    """Returns the node of entry_key under root, or None if the path does not exist"""
+    get_id = component_table.ids.get
+    node = root
+    for component_byte in entry_key:
+        b = get_id(bytes(component_byte))
+        if b is None:
+            return None
+        node = node.find(b)
+        if node is None:
+            return None
+    return node
+
+
+def _lpm_node(root, entry_key):
+    """Returns (depth, value) of the deepest node on the path of entry_key that carries a value"""
+    get_id = component_table.ids.get
+    last_good_depth = 0
+    last_good_value = None
+    node = root
+    depth = 0
+    for component_byte in entry_key:
+        b = get_id(bytes(component_byte))
+        if b is None:
+            break
+        node = node.find(b)
+        if node is None:
+            break
+        depth += 1
+        if node.value is not None:
+            last_good_depth = depth
+            last_good_value = node.value
+    return last_good_depth, last_good_value
+
+
+def _iter_values(root):
+    """Yields (key, node) for every node under root that carries a value. Keys are lists of component ids"""
+    stack = [([], root)]
+    while stack:
+        key, node = stack.pop()
+        if node.value is not None and key:
+            yield key, node
+        for b, child in node.items():
+            stack.append((key + [b], child))
+
+
+def _node_for(value, keys, children):
+    """Returns the smallest node type able to hold the given sorted children"""
+    if not keys:
+        return _Leaf(value)
+    if len(keys) == 1:
+        return _Node1(value, keys[0], children[0])
+    if len(keys) <= NODE_N_MAX_CHILDREN:
+        return _NodeN(value, keys, children)
+    return _NodeH(value, dict(zip(keys, children)))
+# endregion Node helpers
+
+
+class FrozenECHT:
+    """
+    An immutable snapshot of an ECHT trie backed by flat arrays. Nodes are numbered in breadth-first order with the
+    root at 0, so the children of node i are the contiguous range [child_start[i], child_start[i + 1]), sorted by
+    label.
+
+    Attributes
+    ----------
+    labels : array
+        The component id of each node.
+    child_start : array
+        Offsets of the children range of each node, with one extra closing entry.
+    hashed : list
+        A {component id: child index} dictionary for every node with more than NODE_N_MAX_CHILDREN children, None for
+        the others, so high fan-out levels are not binary searched.
+    value_idx : array
+        Index of each node value in `values`, or -1 for intermediary nodes.
+    values : list
+        The hosting AS lists.
+    estimated_size : int
+        The number of bytes used by the snapshot, components and AS names excluded.
+    """
+
+    def __init__(self, root):
+        # Breadth-first walk, children sorted by component id
+        nodes = [root]
+        self.labels = array('I', [0])
+        self.child_start = array('I', [1])
+        self.hashed = []
+        i = 0
+        while i < len(nodes):
+            children = sorted(nodes[i].items())
+            lo = len(nodes)
+            for b, child in children:
+                nodes.append(child)
+                self.labels.append(b)
+            self.child_start.append(len(nodes))
+            # High fan-out nodes, i.e. the TLD layer, also get a hash index from component id to child position
+            if len(children) > NODE_N_MAX_CHILDREN:
+                self.hashed.append({b: lo + j for j, (b, child) in enumerate(children)})
+            else:
+                self.hashed.append(None)
+            i += 1
+        self.values = []
+        self.value_idx = array('i')
+        for node in nodes:
+            if node.value is None:
+                self.value_idx.append(-1)
+            else:
+                self.value_idx.append(len(self.values))
+                self.values.append(node.value)
+        self.estimated_size = sum(sys.getsizeof(a) for a in (self.labels, self.child_start, self.hashed,
+                                                             self.value_idx, self.values))
+        self.estimated_size += sum(sys.getsizeof(v) for v in self.values) + sys.getsizeof(self) + \
+            sys.getsizeof(self.__dict__)
+        for h in self.hashed:
+            if h is not None:
+                # Positions up to 256 are CPython's cached small ints and cost nothing
+                self.estimated_size += sys.getsizeof(h) + sum(sys.getsizeof(j) for j in h.values() if j > 256)
+
+    def __len__(self):
+        return len(self.labels)
+
+    def find(self, entry_key):
+        """Returns the index of the node of entry_key, or -1 if the path does not exist"""
+        get_id = component_table.ids.get
+        labels = self.labels
+        child_start = self.child_start
+        hashed = self.hashed
+        i = 0
+        for component_byte in entry_key:
+            b = get_id(bytes(component_byte))
+            if b is None:
+                return -1
+            h = hashed[i]
+            if h is None:
+                hi = child_start[i + 1]
+                j = bisect.bisect_left(labels, b, child_start[i], hi)
+                if j == hi or labels[j] != b:
+                    return -1
+            else:
+                j = h.get(b)
+                if j is None:
+                    return -1
+            i = j
+        return i
+
+    def value(self, i):
+        v = self.value_idx[i]
+        return None if v < 0 else self.values[v]
+
+    def get(self, entry_key):
+        i = self.find(entry_key)
+        return None if i < 0 else self.value(i)
+
+    def lpm(self, entry_key):
+        """Returns (depth, value) of the deepest node on the path of entry_key that carries a value"""
+        get_id = component_table.ids.get
+        labels = self.labels
+        child_start = self.child_start
+        hashed = self.hashed
+        value_idx = self.value_idx
+        last_good_depth = 0
+        last_good_value_idx = -1
+        i = 0
+        depth = 0
+        for component_byte in entry_key:
+            b = get_id(bytes(component_byte))
+            if b is None:
+                break
+            h = hashed[i]
+            if h is None:
+                hi = child_start[i + 1]
+                j = bisect.bisect_left(labels, b, child_start[i], hi)
+                if j == hi or labels[j] != b:
+                    break
+            else:
+                j = h.get(b)
+                if j is None:
+                    break
+            i = j
+            depth += 1
+            if value_idx[i] >= 0:
+                last_good_depth = depth
+                last_good_value_idx = value_idx[i]
+        if last_good_value_idx < 0:
+            return 0, None
+        return last_good_depth, self.values[last_good_value_idx]
+
+    def mark_components(self, ids, names):
+        """Adds the ComponentTable ids of the labels to ids, and the id() of the hosting AS names to names"""
+        ids.update(self.labels[1:])
+        for v in self.values:
+            names.update(map(id, v))
+
+    def thaw(self):
+        """Rebuilds the adaptive nodes of the snapshot. Values are shared with the snapshot"""
+        nodes = [None] * len(self.labels)
+        for i in range(len(self.labels) - 1, 0, -1):
+            lo, hi = self.child_start[i], self.child_start[i + 1]
+            keys = [component_table.canonical_id(b) for b in self.labels[lo:hi]]
+            nodes[i] = _node_for(self.value(i), keys, nodes[lo:hi])
+        lo, hi = self.child_start[0], self.child_start[1]
+        keys = [component_table.canonical_id(b) for b in self.labels[lo:hi]]
+        return _NodeH(self.value(0), dict(zip(keys, nodes[lo:hi])))
+
+    def save(self, path):
+        """
+        Writes the snapshot to path in the binary format opened by MappedECHT. The file carries its own components,
+        numbered by rank of their id in the shared ComponentTable so that children stay sorted by label.
+        """
+        # AS names, stored once and referenced by index from the values
+        name_index = {}
+        names = []
+        for v in self.values:
+            for name in v:
+                k = b''.join(name)
+                if k not in name_index:
+                    name_index[k] = len(names)
+                    names.append(name)
+        used = set(self.labels[1:])
+        for name in names:
+            used.update(component_table.ids[bytes(c)] for c in name)
+        ranks = {cid: rank for rank, cid in enumerate(sorted(used))}
+
+        components = [component_table.component(cid) for cid in sorted(used)]
+        component_offsets = array('I', [0])
+        for c in components:
+            component_offsets.append(component_offsets[-1] + len(c))
+        n_slots = 1
+        while n_slots < 2 * len(components):
+            n_slots *= 2
+        slots = array('I', bytes(4 * n_slots))
+        for cid, c in enumerate(components):
+            i = zlib.crc32(c) & (n_slots - 1)
+            while slots[i]:
+                i = (i + 1) & (n_slots - 1)
+            slots[i] = cid + 1
+
+        labels = array('I', [ranks.get(b, 0) for b in self.labels])
+        value_start = array('I', [0])
+        value_names = array('I')
+        for v in self.values:
+            value_names.extend(name_index[b''.join(name)] for name in v)
+            value_start.append(len(value_names))
+        name_start = array('I', [0])
+        name_ids = array('I')
+        for name in names:
+            name_ids.extend(ranks[component_table.ids[bytes(c)]] for c in name)
+            name_start.append(len(name_ids))
+
+        blob = b''.join(components)
+        with open(path, 'wb') as fh:
+            fh.write(SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, 1 if sys.byteorder == 'little' else 2, len(components),
+                                          len(blob), n_slots, len(labels), len(self.values), len(value_names),
+                                          len(names), len(name_ids)))
+            for a in (component_offsets, slots, labels, self.child_start, self.value_idx, value_start, value_names,
+                      name_start, name_ids):
+                a.tofile(fh)
+            fh.write(blob)
+
+
+class MappedECHT:
+    """
+    A FrozenECHT saved with FrozenECHT.save() and opened with mmap. Opening costs a few system calls whatever the
+    size of the snapshot: pages are read on first access and shared by all the processes mapping the same file.
+
+    The file carries its own components, looked up through an open addressing hash table on crc32 and memoized, so
+    nothing is interned when opening. Children are binary searched at every level, there is no hashed index as in
+    FrozenECHT.
+
+    Attributes
+    ----------
+    estimated_size : int
+        The number of bytes used by the Python objects of the snapshot when opened, memoized components excluded. The
+        mapped file itself is not counted, it is paged in and out by the kernel.
+    """
+
+    def __init__(self, path):
+        with open(path, 'rb') as fh:
+            self._mm = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, byte_order, n_components, blob_len, n_slots, n_nodes, n_values, n_value_names, n_names,
+         n_name_ids) = SNAPSHOT_HEADER.unpack_from(self._mm)
+        if magic != SNAPSHOT_MAGIC or byte_order != (1 if sys.byteorder == 'little' else 2):
+            raise ValueError('{} is not an ECHT snapshot of this platform'.format(path))
+        view = memoryview(self._mm)
+        offset = SNAPSHOT_HEADER.size
+        sections = []
+        for count, fmt in ((n_components + 1, 'I'), (n_slots, 'I'), (n_nodes, 'I'), (n_nodes + 1, 'I'),
+                           (n_nodes, 'i'), (n_values + 1, 'I'), (n_value_names, 'I'), (n_names + 1, 'I'),
+                           (n_name_ids, 'I')):
+            sections.append(view[offset:offset + 4 * count].cast(fmt))
+            offset += 4 * count
+        (self.component_offsets, self.slots, self.labels, self.child_start, self.value_idx, self.value_start,
+         self.value_names, self.name_start, self.name_ids) = sections
+        self._blob_offset = offset
+        self._ids = {}
+        self._names = {}
+        self.estimated_size = sys.getsizeof(self) + sys.getsizeof(self.__dict__) + sys.getsizeof(self._mm) + \
+            sum(sys.getsizeof(s) for s in sections) + sys.getsizeof(sections) + sys.getsizeof(self._ids) + \
+            sys.getsizeof(self._names)
+
+    def __len__(self):
+        return len(self.labels)
+
+    def component(self, cid) -> bytes:
+        offsets = self.component_offsets
+        return self._mm[self._blob_offset + offsets[cid]:self._blob_offset + offsets[cid + 1]]
+
+    def _component_id(self, component):
+        """Returns the id of a component in the file, or None. Ids found are memoized"""
+        c = bytes(component)
+        cid = self._ids.get(c)
+        if cid is not None:
+            return cid
+        slots = self.slots
+        mask = len(slots) - 1
+        i = zlib.crc32(c) & mask
+        while True:
+            s = slots[i]
+            if not s:
+                return None
+            if self.component(s - 1) == c:
+                self._ids[c] = s - 1
+                return s - 1
+            i = (i + 1) & mask
+
+    def _name(self, n):
+        name = self._names.get(n)
+        if name is None:
+            name = self._names[n] = component_table.intern_name(
+                [self.component(c) for c in self.name_ids[self.name_start[n]:self.name_start[n + 1]]])
+        return name
+
+    def find(self, entry_key):
+        """Returns the index of the node of entry_key, or -1 if the path does not exist"""
+        labels = self.labels
+        child_start = self.child_start
+        i = 0
+        for component_byte in entry_key:
+            b = self._component_id(component_byte)
+            if b is None:
+                return -1
+            hi = child_start[i + 1]
+            j = bisect.bisect_left(labels, b, child_start[i], hi)
+            if j == hi or labels[j] != b:
+                return -1
+            i = j
+        return i
+
+    def value(self, i):
+        v = self.value_idx[i]
+        if v < 0:
+            return None
+        return [self._name(n) for n in self.value_names[self.value_start[v]:self.value_start[v + 1]]]
+
+    def get(self, entry_key):
+        i = self.find(entry_key)
+        return None if i < 0 else self.value(i)
+
+    def lpm(self, entry_key):
+        """Returns (depth, value) of the deepest node on the path of entry_key that carries a value"""
+        labels = self.labels
+        child_start = self.child_start
+        value_idx = self.value_idx
+        last_good_depth = 0
+        last_good_node = -1
+        i = 0
+        depth = 0
+        for component_byte in entry_key:
+            b = self._component_id(component_byte)
+            if b is None:
+                break
+            hi = child_start[i + 1]
+            j = bisect.bisect_left(labels, b, child_start[i], hi)
+            if j == hi or labels[j] != b:
+                break
+            i = j
+            depth += 1
+            if value_idx[i] >= 0:
+                last_good_depth = depth
+                last_good_node = i
+        if last_good_node < 0:
+            return 0, None
+        return last_good_depth, self.value(last_good_node)
+
+    def mark_components(self, ids, names):
+        """
+        Adds the id() of the hosting AS names interned so far to names. Labels are ids of the file, the snapshot holds
+        no ComponentTable id
+        """
+        names.update(map(id, self._names.values()))
+
+    def _global_ids(self):
+        """Interns every component of the file in the shared ComponentTable, returns the ids indexed by file id"""
+        return [component_table.intern(self.component(c)) for c in range(len(self.component_offsets) - 1)]
+
+    def iter_values(self):
+        """Yields (key, value) for every node that carries a value. Keys are tuples of ComponentTable ids"""
+        ids = self._global_ids()
+        child_start = self.child_start
+        labels = self.labels
+        value_idx = self.value_idx
+        stack = [((), 0)]
+        while stack:
+            key, i = stack.pop()
+            if value_idx[i] >= 0 and key:
+                yield key, self.value(i)
+            for j in range(child_start[i], child_start[i + 1]):
+                stack.append((key + (ids[labels[j]],), j))
+
+    def thaw(self):
+        """Rebuilds the adaptive nodes of the snapshot, keyed on ComponentTable ids"""
+        ids = self._global_ids()
+        nodes = [None] * len(self.labels)
+        for i in range(len(self.labels) - 1, -1, -1):
+            lo, hi = self.child_start[i], self.child_start[i + 1]
+            keys = [ids[b] for b in self.labels[lo:hi]]
+            # File ids are ranks of ComponentTable ids at save time, new ids may not keep the order
+            children = sorted(zip(keys, nodes[lo:hi]), key=lambda kc: kc[0])
+            if i == 0:
+                return _NodeH(self.value(0), dict(children))
+            nodes[i] = _node_for(self.value(i), [k for k, c in children], [c for k, c in children])
+
 
 class ECHTBE(BEABC):
+    """
+    Encoded Component Hashed Trie. Each node picks the smallest layout that fits its fan-out: a bare leaf, a single
+    child node, a sorted-array node (up to NODE_N_MAX_CHILDREN children) or a hash node. The root is always a hash
+    node.
+
+    Nodes are keyed on the ids of the shared ComponentTable and hosting AS names are interned, so every distinct
+    component is stored once.
+
+    Once loaded, the trie can be frozen into a FrozenECHT snapshot. Mutations made afterwards go to a small overlay
+    trie holding the full value of every touched name, and are merged into the snapshot on the next freeze().
+    """
+
     def __init__(self):
         super().__init__(Algorithms.ECHT)
         self.description = 'Encoded Component Hashed Trie'
-        self._data = {}
+        self._root = _NodeH()
+        self._sealed = None
+        self._frozen = None
+        self._hosted = ReverseIndex(self._is_hosted)
+        # A snapshot opened with open_snapshot() whose names are not in the reverse index yet
+        self._unindexed = None
+        self.overlay_entries = 0
         self.total_nodes = 0
         self.processed_nodes = 0
         self.total_components = 0
+        # estimated_size covers the current trie (_root_size), the reverse index, plus the sealed overlay and the
+        # snapshot, if any
+        self._root_size = self._root.nbytes()
+        self.estimated_size = self._root_size + self._hosted.estimated_size
+        component_table.register(self)
 
-    def size(self):
-        return len(pickle.dumps(self._data))
+    # region Memory accounting
+    def _account(self, delta):
+        """Records a change of delta bytes in the current trie"""
+        self._root_size += delta
+        self.estimated_size += delta
 
-    def add(self, entry_key, entry_value):
-        i = 0
-        current_dict = self._data
-        for component_byte in entry_key:
-            self.total_components += 1
-            b = bytes(component_byte)
-            i += 1
-            if i == len(entry_key):
-                # is executed when we reach the last node
-                try:
-                    # poke the key, if it does not exist, create it under keyError
-                    current_dict[b]
-                    # the next statement will be reached only if the previous line didn't throw an error
-                    # in this case, this leaf node has already been created earlier, so set its value
-                    current_dict = current_dict[b]
-
-                    # TODO: to be checked !!
-                    # current_dict[''] = entry_value
-                    v = current_dict['']
-                    if v is not None:
-                        for e in entry_value:
-                            if e not in v:
-                                v.append(e)
-                    current_dict[''] = v
-
-                except KeyError:
-                    entry_dict = {'': entry_value}
-                    current_dict[b] = entry_dict
-                    current_dict = entry_dict
-                    self.total_nodes += 1
+    def get_data_structures(self):
+        return [self._root, self._sealed, self._frozen, self._hosted]
+
+    def get_shared_structures(self):
+        return component_table
+
+    def mark_components(self, ids, names):
+        """
+        Adds the ComponentTable ids the backend references to ids, and the id() of the hosting AS names it stores to
+        names, for ComponentTable.collect()
+        """
+        stack = [root for root in (self._root, self._sealed) if root is not None]
+        while stack:
+            node = stack.pop()
+            if node.value is not None:
+                names.update(map(id, node.value))
+            for b, child in node.items():
+                ids.add(b)
+                stack.append(child)
+        if self._frozen is not None:
+            self._frozen.mark_components(ids, names)
+        # Stale publishers are only dropped when their list is compacted, their ids must not be reused meanwhile
+        for key_ids in self._hosted.publisher_keys():
+            ids.update(key_ids)
+    # endregion Memory accounting
+
+    # region Snapshot
+    def is_frozen(self):
+        return self._frozen is not None
+
+    def freeze(self) -> FrozenECHT:
+        """
+        Builds a new read-only snapshot from the current snapshot and overlay, then swaps it in. Lookups keep being
+        answered while the snapshot is built: the overlay is sealed first and new mutations go to a fresh overlay.
+        The accounting of the mutations made meanwhile, i.e. when freeze() runs in a worker thread, is kept: the
+        replaced snapshot and sealed overlay are swapped for the new snapshot as deltas.
+        :return: the new snapshot
+        """
+        replaced_size = self._root_size + (self._frozen.estimated_size if self._frozen is not None else 0)
+        replaced_nodes = self.total_nodes
+        self._sealed = self._root
+        self._root = _NodeH()
+        self._root_size = self._root.nbytes()
+        self.estimated_size += self._root_size
+        self.overlay_entries = 0
+        if self._frozen is None:
+            root = self._sealed
+        else:
+            root = self._merge(self._frozen.thaw(), self._sealed)
+        frozen = FrozenECHT(root)
+        self._frozen = frozen
+        self._sealed = None
+        self.total_nodes += len(frozen) - 1 - replaced_nodes
+        self.estimated_size += frozen.estimated_size - replaced_size
+        return frozen
+
+    def save_snapshot(self, path):
+        """Freezes the backend and writes the snapshot to path, to be opened with open_snapshot()"""
+        self.freeze().save(path)
+
+    def open_snapshot(self, path):
+        """
+        Replaces the content of the backend with a snapshot written by save_snapshot(), mapped in memory rather than
+        loaded. Mutations go to an overlay as after freeze(). The reverse index is only built from the snapshot on
+        the first withdraw() or get_publishers().
+        """
+        self._frozen = MappedECHT(path)
+        self._unindexed = self._frozen
+        self._sealed = None
+        self._root = _NodeH()
+        self._root_size = self._root.nbytes()
+        self._hosted = ReverseIndex(self._is_hosted)
+        self.overlay_entries = 0
+        self.total_nodes = len(self._frozen) - 1
+        self.estimated_size = self._frozen.estimated_size + self._root_size + self._hosted.estimated_size
+
+    def _index_snapshot(self):
+        """Adds the names of an opened snapshot to the reverse index, entries removed since are filtered on read"""
+        if self._unindexed is None:
+            return
+        snapshot, self._unindexed = self._unindexed, None
+        for key_ids, value in snapshot.iter_values():
+            self.estimated_size += self._hosted.add(key_ids, value)
+
+    @staticmethod
+    def _merge(root, overlay):
+        """
+        Writes every value of the overlay over the nodes of root. Names removed in the overlay, whose value is an empty
+        list, are deleted from root.
+        """
+        for key, node in _iter_values(overlay):
+            target = _make_path(root, key)[0]
+            if node.value:
+                target.value = node.value
             else:
-                try:
-                    current_dict[b]
-                    # the next statement will be reached only if the previous line didn't throw an error
-                    # in this case, this intermediary node has already been created earlier
-                    current_dict = current_dict[b]
-                except KeyError:
-                    # this is where we handle intermediary non-existent nodes
-                    intermediary_dict = {'': None}
-                    current_dict[b] = intermediary_dict
-                    current_dict = intermediary_dict
-                    self.total_nodes += 1
-        i += 1
+                target.value = None
+                _prune(root, key)
+        return root
+
+    def _base_value(self, entry_key):
+        """Returns the value of entry_key in the sealed overlay or the snapshot, ignoring the current overlay"""
+        if self._sealed is not None:
+            node = _find_node(self._sealed, entry_key)
+            if node is not None and node.value is not None:
+                return node.value
+        if self._frozen is not None:
+            return self._frozen.get(entry_key)
+        return None
+
+    def _overlay_node(self, entry_key):
+        """
+        Returns the node of entry_key in the current trie. Once frozen, the value found in the snapshot is copied into
+        the overlay first, so it can be changed in place.
+        """
+        node = _find_node(self._root, entry_key)
+        if self._frozen is None and self._sealed is None:
+            return node
+        self.overlay_entries += 1
+        if node is None or node.value is None:
+            base = self._base_value(entry_key)
+            if base is not None:
+                node, created, grown_bytes = _make_path(self._root, [component_table.intern(c) for c in entry_key])
+                self.total_nodes += created
+                node.value = list(base)
+                self._account(grown_bytes + sys.getsizeof(node.value))
+        return node
+    # endregion Snapshot
+
+    def _merge_value(self, key_ids, node, entry_value):
+        """
+        Appends the interned hosting ASes of entry_value that the node does not have yet, and indexes them under the
+        key_ids tuple.
+        :return: the number of bytes the value grew by
+        """
+        v = node.value
+        if v is None:
+            node.value = added = entry_value
+            grown_bytes = sys.getsizeof(entry_value)
+        else:
+            added = []
+            before = sys.getsizeof(v)
+            for e in entry_value:
+                if e not in v:
+                    v.append(e)
+                    added.append(e)
+            grown_bytes = sys.getsizeof(v) - before
+        self.estimated_size += self._hosted.add(key_ids, added)
+        return grown_bytes
+
+    @staticmethod
+    def _key_ids(entry_key) -> tuple:
+        """Returns the component ids of an existing name, as the key of the reverse index"""
+        get_id = component_table.ids.get
+        return tuple(get_id(bytes(c)) for c in entry_key)
+
+    def add(self, entry_key, entry_value):
+        if self._frozen is not None or self._sealed is not None:
+            self._overlay_node(entry_key)
+        ids = [component_table.intern(c) for c in entry_key]
+        node, created, grown_bytes = _make_path(self._root, ids)
+        self.total_nodes += created
+        self.total_components += len(entry_key)
+        if entry_key:
+            grown_bytes += self._merge_value(tuple(ids), node,
+                                             [component_table.intern_name(n) for n in entry_value])
+        self._account(grown_bytes)
         self.processed_nodes += 1
 
+    def add_many(self, entries):
+        """
+        Adds a batch of key/values. A cursor stack holds the path of the previous name, so the prefix a name shares with
+        the previous one is not walked again, and the per-entry overhead of add() is paid once per batch.
+        The batch is not sorted: sorting costs more in memory locality than it saves on these short names.
+        """
+        if self._frozen is not None or self._sealed is not None:
+            # Once frozen, every name has to be copied into the overlay first
+            super().add_many(entries)
+            return
+        intern = component_table.intern
+        intern_name = component_table.intern_name
+        path_ids = []
+        path_nodes = [self._root]
+        created = 0
+        grown_bytes = 0
+        components = 0
+        count = 0
+        for entry_key, entry_value in entries:
+            ids = [intern(c) for c in entry_key]
+            # Keep the common prefix with the previous name on the stack
+            depth = 0
+            for b, p in zip(ids, path_ids):
+                if b != p:
+                    break
+                depth += 1
+            if depth < len(path_ids):
+                del path_ids[depth:]
+                del path_nodes[depth + 1:]
+            node = path_nodes[depth]
+            for b in ids[depth:]:
+                child = node.find(b)
+                if child is None:
+                    child = _Leaf()
+                    before = node.nbytes()
+                    grown = node.insert(b, child)
+                    if grown is not node:
+                        path_nodes[-2].replace(path_ids[-1], grown)
+                        path_nodes[-1] = grown
+                    created += 1
+                    grown_bytes += grown.nbytes() - before + child.nbytes()
+                path_ids.append(b)
+                path_nodes.append(child)
+                node = child
+            if ids:
+                grown_bytes += self._merge_value(tuple(ids), node, [intern_name(n) for n in entry_value])
+            components += len(ids)
+            count += 1
+        self.total_nodes += created
+        self.total_components += components
+        self.processed_nodes += count
+        self._account(grown_bytes)
+
     def manual_add(self, entry_key, entry_value):
         self.add(entry_key, entry_value)
 
+    def _value(self, entry_key):
+        node = _find_node(self._root, entry_key)
+        if node is not None and node.value is not None:
+            return node.value
+        return self._base_value(entry_key)
+
     def get(self, entry_key):
-        d = self._data
-        i = 1
-        for component_byte in entry_key:
-            b = bytes(component_byte)
-            try:
-                d[b]
-                d = d[b]
-                if i == len(entry_key):
-                    r = d['']
-                    # Manar try to fix
-                    if r is not None:
-                        if len(r) == 1:
-                            return d[''][0]
-                        else:
-                            return d['']
-                i += 1
-            except KeyError:
-                return []
-        return []
+        if not entry_key:
+            return []
+        r = self._value(entry_key)
+        if r is None:
+            return []
+        return r[0] if len(r) == 1 else r
+
+    def _lpm_layers(self, entry_key):
+        """Returns (depth, value) of the longest match across the overlay, the sealed overlay and the snapshot"""
+        depth, value = _lpm_node(self._root, entry_key)
+        # Layers beneath the overlay only win with a strictly longer match
+        if self._sealed is not None:
+            d, v = _lpm_node(self._sealed, entry_key)
+            if d > depth:
+                depth, value = d, v
+        if self._frozen is not None:
+            d, v = self._frozen.lpm(entry_key)
+            if d > depth:
+                depth, value = d, v
+        return depth, value
 
     def lpm(self, entry_key):
-        current_key = []
-        last_good_node_key = None
-        last_good_node_value = None
-        d = self._data
-        i = 1
-        for component_byte in entry_key:
-            b = bytes(component_byte)
-            try:
-                d[b]
-                current_key.append(component_byte)
-                if d[b][''] != '':
-                    last_good_node_key = current_key
-                    last_good_node_value = d[b]['']
-                d = d[b]
-                if i == len(entry_key):
-                    r = d['']
-                    # Manar try to fix
-                    if r is not None:
-                        if len(r) == 1:
-                            return last_good_node_key, d[''][0]
-                        else:
-                            return last_good_node_key, d['']
-                i += 1
-            except KeyError:
-                return last_good_node_key, last_good_node_value
-        return last_good_node_key, last_good_node_value
+        depth, value = self._lpm_layers(entry_key)
+        # An empty value is a name removed from an overlay, hiding the snapshot: the match is searched above it
+        while value is not None and not value:
+            depth, value = self._lpm_layers(entry_key[:depth - 1])
+        if value is None:
+            return None, None
+        if depth == len(entry_key) and len(value) == 1:
+            return entry_key[:depth], value[0]
+        return entry_key[:depth], value
 
     def bcm(self, entry_key):
         return self.lpm(entry_key)
 
     def set(self, entry_key, entry_value):
-        # ToDo: implement method
-        raise NotImplementedError
+        """
+        Replaces the hosting ASes of a name, creating the name if needed. An empty list removes the name.
+        """
+        if not entry_key:
+            return
+        if not entry_value:
+            self.remove(entry_key)
+            return
+        if self._frozen is not None or self._sealed is not None:
+            self._overlay_node(entry_key)
+        ids = [component_table.intern(c) for c in entry_key]
+        node, created, grown_bytes = _make_path(self._root, ids)
+        self.total_nodes += created
+        new = []
+        for n in entry_value:
+            e = component_table.intern_name(n)
+            if e not in new:
+                new.append(e)
+        old = node.value or []
+        if node.value is not None:
+            grown_bytes -= sys.getsizeof(node.value)
+        node.value = new
+        self._account(grown_bytes + sys.getsizeof(new))
+        key_ids = tuple(ids)
+        self.estimated_size += self._hosted.add(key_ids, [e for e in new if e not in old])
+        self.estimated_size += self._hosted.discard(key_ids, [e for e in old if e not in new])
 
     def remove(self, entry_key, entry_values='all'):
-        d = self._data
-        i = 1
-        for c in entry_key:
-            b = bytes(c)
-            try:
-                d[b]
-                d = d[b]
-                if i == len(entry_key):
-                    r = d['']
-                    if len(entry_values) == 1:
-                        r.remove(entry_values)
-                    else:
-                        for v in entry_values:
-                            r.remove(v)
-                    return d['']
-                i += 1
-            except KeyError:
-                return []
-        return []
+        """
+        Removes hosting ASes from a name, or the name itself with 'all'. A name left without hosting ASes is deleted,
+        and the intermediary nodes left without children are pruned. Once frozen, the name is hidden by an empty value
+        in the overlay instead.
+        :return: the remaining hosting ASes, an empty list if the name was deleted or does not exist
+        """
+        if not entry_key:
+            return []
+        node = self._overlay_node(entry_key)
+        if node is None or not node.value:
+            return []
+        r = node.value
+        before = sys.getsizeof(r)
+        if entry_values == 'all':
+            removed = list(r)
+            r.clear()
+        else:
+            removed = []
+            for v in entry_values:
+                if v in r:
+                    r.remove(v)
+                    removed.append(v)
+        key_ids = self._key_ids(entry_key)
+        if r:
+            self._account(sys.getsizeof(r) - before)
+        elif self._base_value(entry_key):
+            self._account(sys.getsizeof(r) - before)
+        else:
+            node.value = None
+            deleted, grown_bytes = _prune(self._root, key_ids)
+            self.total_nodes -= deleted
+            self._account(grown_bytes - before)
+        self.estimated_size += self._hosted.discard(key_ids, removed)
+        return r
+
+    def withdraw(self, hosting_as):
+        self._index_snapshot()
+        hosting_as = list(hosting_as)
+        index_size = self._hosted.estimated_size
+        publishers = [[component_table.component(b) for b in ids] for ids in self._hosted.pop(hosting_as)]
+        self.estimated_size += self._hosted.estimated_size - index_size
+        for entry_key in publishers:
+            self.remove(entry_key, [hosting_as])
+        return publishers
+
+    def _is_hosted(self, key_ids, hosting_as):
+        if self._frozen is None and self._sealed is None:
+            # Walk the ids directly, this is called for every publisher of an AS when its index is compacted
+            node = self._root
+            for b in key_ids:
+                node = node.find(b)
+                if node is None:
+                    return False
+            r = node.value
+        else:
+            r = self._value([component_table.component(b) for b in key_ids])
+        return r is not None and hosting_as in r
+
+    def get_publishers(self, hosting_as):
+        self._index_snapshot()
+        return [[component_table.component(b) for b in ids] for ids in self._hosted.publishers(hosting_as)]
 
     def is_entry(self, entry_key):
-        d = self._data
-        i = 1
-        for c in entry_key:
-            b = bytes(c)
-            try:
-                d[b]
-                d = d[b]
-                if i == len(entry_key):
-                    r = d['']
-                    return True, None
-                i += 1
-            except KeyError:
-                return False, None
+        if entry_key:
+            if _find_node(self._root, entry_key) is not None:
+                return True, None
+            if self._sealed is not None and _find_node(self._sealed, entry_key) is not None:
+                return True, None
+            if self._frozen is not None and self._frozen.find(entry_key) >= 0:
+                return True, None
         return False, None
 
     def to_dict(self):
-        return self._data
+        """Returns the trie in the nested dictionary layout, i.e. {component: {'': value, component: {...}}}"""
+        root = self._root
+        if self._frozen is not None:
+            root = self._frozen.thaw()
+            if self._sealed is not None:
+                self._merge(root, self._sealed)
+            self._merge(root, self._root)
+        return {component_table.component(b): self._node_to_dict(child) for b, child in root.items()}
+
+    def _node_to_dict(self, node):
+        d = {'': node.value}
+        for b, child in node.items():
+            d[component_table.component(b)] = self._node_to_dict(child)
+        return d
 
     def get_total_nodes(self):
         return self.total_nodes
@@ -165,6 +1088,11 @@ class ECHTBE(BEABC):
     def get_total_components(self):
         return self.total_components
 
+    @staticmethod
+    def get_distinct_components():
+        """Returns the number of distinct components in the shared ComponentTable"""
+        return len(component_table)
+
     def get_depth(self):
         # ToDo : implement method
         raise NotImplementedError
@@ -0,0 +1,374 @@
+import sys
+
+from ndn import encoding as enc
+
+from BEABC import BEABC
+from ReverseIndex import ReverseIndex
+from Selector import Algorithms, BackEndType
+
+
+class MappingBE(BEABC):
+    """
+    Base of the backends storing every name as one key of a mapping, a dict or a trie, with the list of its hosting
+    ASes as the value. Text backends take names and hosting ASes as text, i.e. '/com/google' and '/AS1', named backends
+    take them as lists of NDN-encoded components, like ECHTBE. get(), lpm(), set() and remove() answer like ECHTBE.
+
+    Subclasses pass their mapping to __init__ and implement _key(), _name() and _lpm(). The mapping needs get(),
+    __setitem__(), __delitem__(), __contains__() and items(), and may count its nodes in a nodes attribute. Hosting ASes
+    are indexed by a ReverseIndex keyed on the mapping keys, which must be sortable.
+    """
+
+    # Bytes the mapping spends per name and per node it counts besides the key, the value and the growth of the mapping
+    # object itself, for estimated_size. Calibrated against size(exact=True), which walks the mapping, on the first 100k
+    # names of the 1m dataset and on the 1k dataset
+    ENTRY_BYTES = 0
+    NODE_BYTES = 0
+
+    def __init__(self, algorithm, mapping):
+        super().__init__(algorithm)
+        self.text = algorithm.value is BackEndType.utf
+        self._map = mapping
+        self._hosted = ReverseIndex(self._is_hosted)
+        self.entries = 0
+        self.processed_nodes = 0
+        self.total_components = 0
+        self.estimated_size = sys.getsizeof(mapping) + self._hosted.estimated_size
+
+    # region Mapping
+    def _key(self, entry_key):
+        """Returns the key of a name in the mapping"""
+        raise NotImplementedError
+
+    def _name(self, key):
+        """Returns the name of a key of the mapping, in the format of the backend"""
+        raise NotImplementedError
+
+    def _lpm(self, entry_key) -> (int, list):
+        """Returns (depth, value) of the longest stored name that prefixes entry_key, (0, None) if there is none"""
+        raise NotImplementedError
+
+    def _components(self, entry_key) -> list:
+        return entry_key.split('/')[1:] if self.text else list(entry_key)
+
+    def _prefix(self, entry_key, depth):
+        """Returns the first depth components of a name, as a name"""
+        if self.text:
+            return '/' + '/'.join(entry_key.split('/')[1:depth + 1])
+        return list(entry_key[:depth])
+
+    def _hosting_as(self, hosting_as):
+        """Returns a hosting AS in the format stored in the values"""
+        return str(hosting_as) if self.text else [bytes(c) for c in hosting_as]
+
+    @staticmethod
+    def _sizeof(obj) -> int:
+        """Returns the size of a text name, or of a name or key made of components"""
+        if isinstance(obj, str):
+            return sys.getsizeof(obj)
+        return sys.getsizeof(obj) + sum(sys.getsizeof(c) for c in obj)
+
+    def _key_size(self, key) -> int:
+        """Returns the size of a key, except the key object itself, which is counted by the reverse index"""
+        return self._sizeof(key) - sys.getsizeof(key)
+
+    def _value_size(self, value) -> int:
+        # Text hosting ASes are shared by the names that list them, only the lists are counted. _hosting_as() builds a
+        # list for every named one, its components are usually shared with the dataset
+        if self.text:
+            return sys.getsizeof(value)
+        return sys.getsizeof(value) + sum(sys.getsizeof(n) for n in value)
+
+    def _map_state(self) -> (int, int):
+        return sys.getsizeof(self._map), getattr(self._map, 'nodes', 0)
+
+    def _map_growth(self, state) -> int:
+        """Returns the bytes the mapping object and its nodes grew by since _map_state() returned state"""
+        map_size, nodes = state
+        return sys.getsizeof(self._map) - map_size + self.NODE_BYTES * (getattr(self._map, 'nodes', 0) - nodes)
+    # endregion Mapping
+
+    # region Memory accounting
+    def get_data_structures(self):
+        return [self._map, self._hosted]
+    # endregion Memory accounting
+
+    def _new_entry(self, entry_key, key) -> int:
+        """Counts a name about to be stored, returns the bytes it costs besides its value"""
+        self.entries += 1
+        self.total_components += len(self._components(entry_key))
+        return self.ENTRY_BYTES + self._key_size(key)
+
+    def add(self, entry_key, entry_value):
+        key = self._key(entry_key)
+        r = self._map.get(key)
+        if r is None:
+            state = self._map_state()
+            r = []
+            self._map[key] = r
+            grown_bytes = self._new_entry(entry_key, key) + self._map_growth(state)
+            before = 0
+        else:
+            grown_bytes = 0
+            before = self._value_size(r)
+        added = []
+        for n in entry_value:
+            n = self._hosting_as(n)
+            if n not in r:
+                r.append(n)
+                added.append(n)
+        grown_bytes += self._value_size(r) - before
+        self.estimated_size += grown_bytes + self._hosted.add(key, added)
+        self.processed_nodes += 1
+
+    def manual_add(self, entry_key, entry_value):
+        self.add(entry_key, entry_value)
+
+    def get(self, entry_key):
+        if not entry_key:
+            return []
+        r = self._map.get(self._key(entry_key))
+        if not r:
+            return []
+        return r[0] if len(r) == 1 else r
+
+    def lpm(self, entry_key):
+        if not entry_key:
+            return None, None
+        depth, value = self._lpm(entry_key)
+        if not value:
+            return None, None
+        if depth == len(self._components(entry_key)) and len(value) == 1:
+            return self._prefix(entry_key, depth), value[0]
+        return self._prefix(entry_key, depth), value
+
+    def bcm(self, entry_key):
+        return self.lpm(entry_key)
+
+    def set(self, entry_key, entry_value):
+        """
+        Replaces the hosting ASes of a name, creating the name if needed. An empty list removes the name.
+        """
+        if not entry_key:
+            return
+        if not entry_value:
+            self.remove(entry_key)
+            return
+        new = []
+        for n in entry_value:
+            n = self._hosting_as(n)
+            if n not in new:
+                new.append(n)
+        key = self._key(entry_key)
+        old = self._map.get(key)
+        state = self._map_state()
+        if old is None:
+            grown_bytes = self._new_entry(entry_key, key)
+            old = []
+        else:
+            grown_bytes = -self._value_size(old)
+        self._map[key] = new
+        self.estimated_size += grown_bytes + self._map_growth(state) + self._value_size(new)
+        self.estimated_size += self._hosted.add(key, [e for e in new if e not in old])
+        self.estimated_size += self._hosted.discard(key, [e for e in old if e not in new])
+
+    def remove(self, entry_key, entry_values='all'):
+        """
+        Removes hosting ASes from a name, or the name itself with 'all'. A name left without hosting ASes is deleted.
+        :return: the remaining hosting ASes, an empty list if the name was deleted or does not exist
+        """
+        if not entry_key:
+            return []
+        key = self._key(entry_key)
+        r = self._map.get(key)
+        if not r:
+            return []
+        before = self._value_size(r)
+        if entry_values == 'all':
+            removed = list(r)
+            r.clear()
+        else:
+            removed = []
+            for v in entry_values:
+                v = self._hosting_as(v)
+                if v in r:
+                    r.remove(v)
+                    removed.append(v)
+        if r:
+            self.estimated_size += self._value_size(r) - before
+        else:
+            state = self._map_state()
+            del self._map[key]
+            self.entries -= 1
+            self.estimated_size += self._map_growth(state) - before - self.ENTRY_BYTES - self._key_size(key)
+        self.estimated_size += self._hosted.discard(key, removed)
+        return r
+
+    def withdraw(self, hosting_as):
+        hosting_as = self._hosting_as(hosting_as)
+        index_size = self._hosted.estimated_size
+        publishers = [self._name(key) for key in self._hosted.pop(hosting_as)]
+        self.estimated_size += self._hosted.estimated_size - index_size
+        for entry_key in publishers:
+            self.remove(entry_key, [hosting_as])
+        return publishers
+
+    def _is_hosted(self, key, hosting_as):
+        r = self._map.get(key)
+        return r is not None and hosting_as in r
+
+    def get_publishers(self, hosting_as):
+        return [self._name(key) for key in self._hosted.publishers(self._hosting_as(hosting_as))]
+
+    def is_entry(self, entry_key):
+        return bool(entry_key) and self._key(entry_key) in self._map, None
+
+    def dump(self):
+        for key, value in self._map.items():
+            print(self._name(key), value)
+
+    def to_dict(self):
+        """Returns the names in a flat dictionary, {key: hosting ASes} with the keys of the mapping"""
+        return {key: list(value) for key, value in self._map.items()}
+
+    @property
+    def total_nodes(self):
+        """The number of nodes of the mapping, the number of names if it does not count them"""
+        return getattr(self._map, 'nodes', self.entries)
+
+    def get_total_nodes(self):
+        return self.total_nodes
+
+    def get_total_components(self):
+        return self.total_components
+
+    def get_distinct_components(self):
+        """Returns the number of distinct components of the names, counted by walking them"""
+        return len({c for key, _ in self._map.items() for c in self._components(self._name(key))})
+
+
+class SimpleDictionaryBE(MappingBE):
+    """
+    A Python dictionary of text names. LPM looks up every prefix of the name, from the longest.
+    """
+
+    def __init__(self):
+        super().__init__(Algorithms.SimpleDictionary, {})
+        self.description = 'Simple Dictionary'
+
+    def _key(self, entry_key):
+        return entry_key
+
+    def _name(self, key):
+        return key
+
+    def _lpm(self, entry_key):
+        parts = entry_key.split('/')
+        get = self._map.get
+        for depth in range(len(parts) - 1, 0, -1):
+            r = get('/'.join(parts[:depth + 1]))
+            if r:
+                return depth, r
+        return 0, None
+
+
+class _ScanBE(MappingBE):
+    """
+    A reference backend for the tests: a dictionary whose LPM compares the name with every key. Slow but obviously
+    right, the other backends are checked against it.
+    """
+
+    def _lpm(self, entry_key):
+        components = self._components(entry_key)
+        best = 0, None
+        for key, value in self._map.items():
+            key_components = self._components(self._name(key))
+            depth = len(key_components)
+            if best[0] < depth <= len(components) and components[:depth] == key_components:
+                best = depth, value
+        return best
+
+
+class UTFTestBE(_ScanBE):
+    def __init__(self):
+        super().__init__(Algorithms.UTFTest, {})
+        self.description = 'Text reference backend for the tests'
+
+    def _key(self, entry_key):
+        return entry_key
+
+    def _name(self, key):
+        return key
+
+
+class NamedTestBE(_ScanBE):
+    def __init__(self):
+        super().__init__(Algorithms.NamedTest, {})
+        self.description = 'Named reference backend for the tests'
+
+    def _key(self, entry_key):
+        return tuple(bytes(c) for c in entry_key)
+
+    def _name(self, key):
+        return list(key)
+
+
+class NamedAdapter:
+    """
+    Serves a text backend to NDN-encoded requests, i.e. in pnps: names and hosting ASes are converted to text on the
+    way in and back to NDN-encoded names on the way out. Other attributes are the backend's.
+    """
+
+    def __init__(self, backend: MappingBE):
+        self.backend = backend
+
+    def __getattr__(self, name):
+        return getattr(self.backend, name)
+
+    @staticmethod
+    def _text(name) -> str:
+        return enc.Name.to_str(name)
+
+    @staticmethod
+    def _named(name) -> list:
+        return [bytes(c) for c in enc.Name.from_str(name)]
+
+    def _reply(self, r):
+        """Converts the result of get() or remove(): a hosting AS, or a list of them"""
+        if isinstance(r, str):
+            return self._named(r)
+        return [self._named(n) for n in r]
+
+    def add(self, entry_key, entry_value):
+        self.backend.add(self._text(entry_key), [self._text(n) for n in entry_value])
+
+    def set(self, entry_key, entry_value):
+        self.backend.set(self._text(entry_key), [self._text(n) for n in entry_value])
+
+    def remove(self, entry_key, entry_values='all'):
+        if entry_values != 'all':
+            entry_values = [self._text(n) for n in entry_values]
+        return self._reply(self.backend.remove(self._text(entry_key), entry_values))
+
+    def get(self, entry_key):
+        return self._reply(self.backend.get(self._text(entry_key)))
+
+    def get_many(self, entry_keys) -> list:
+        return [self.get(k) for k in entry_keys]
+
+    def lpm(self, entry_key):
+        prefix, value = self.backend.lpm(self._text(entry_key))
+        if prefix is None:
+            return None, None
+        return self._named(prefix), self._reply(value)
+
+    def lpm_many(self, entry_keys) -> list:
+        return [self.lpm(k) for k in entry_keys]
+
+    def withdraw(self, hosting_as):
+        return [self._named(n) for n in self.backend.withdraw(self._text(hosting_as))]
+
+    def get_publishers(self, hosting_as):
+        return [self._named(n) for n in self.backend.get_publishers(self._text(hosting_as))]
+
+    def is_entry(self, entry_key):
+        return self.backend.is_entry(self._text(entry_key))
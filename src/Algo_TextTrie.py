@@ -0,0 +1,144 @@
+from Algo_Mapping import MappingBE
+from Selector import Algorithms
+
+
+class _Node:
+    __slots__ = ('children', 'value')
+
+    def __init__(self):
+        self.children = {}
+        self.value = None
+
+
+class _TextTrie:
+    """
+    A trie of text names, one node per component or, with characters, one node per character. Implements the part of
+    the mapping interface MappingBE uses, and counts its nodes.
+    """
+
+    def __init__(self, characters=False):
+        self.characters = characters
+        self.root = _Node()
+        self.nodes = 1
+
+    def _path(self, key):
+        return key if self.characters else key.split('/')[1:]
+
+    def _find(self, key):
+        node = self.root
+        for p in self._path(key):
+            node = node.children.get(p)
+            if node is None:
+                return None
+        return node
+
+    def get(self, key, default=None):
+        node = self._find(key)
+        return default if node is None or node.value is None else node.value
+
+    def __contains__(self, key):
+        node = self._find(key)
+        return node is not None and node.value is not None
+
+    def __setitem__(self, key, value):
+        node = self.root
+        for p in self._path(key):
+            child = node.children.get(p)
+            if child is None:
+                child = node.children[p] = _Node()
+                self.nodes += 1
+            node = child
+        node.value = value
+
+    def __delitem__(self, key):
+        """Removes the value of key and the nodes left without value nor children"""
+        trail = [self.root]
+        path = self._path(key)
+        for p in path:
+            node = trail[-1].children.get(p)
+            if node is None:
+                raise KeyError(key)
+            trail.append(node)
+        if trail[-1].value is None:
+            raise KeyError(key)
+        trail[-1].value = None
+        for depth in range(len(path), 0, -1):
+            node = trail[depth]
+            if node.value is not None or node.children:
+                break
+            del trail[depth - 1].children[path[depth - 1]]
+            self.nodes -= 1
+
+    def items(self):
+        stack = [('' if self.characters else (), self.root)]
+        while stack:
+            path, node = stack.pop()
+            if node.value is not None:
+                yield (path if self.characters else '/' + '/'.join(path)), node.value
+            for p, child in node.children.items():
+                stack.append((path + p if self.characters else path + (p,), child))
+
+    def lpm(self, key):
+        """Returns (depth, value) of the longest prefix of key holding a value, on component boundaries"""
+        best = 0, None
+        node = self.root
+        if self.characters:
+            length = len(key)
+            for i, ch in enumerate(key):
+                node = node.children.get(ch)
+                if node is None:
+                    break
+                if node.value is not None and (i + 1 == length or key[i + 1] == '/'):
+                    best = key.count('/', 0, i + 1), node.value
+            return best
+        for depth, p in enumerate(key.split('/')[1:], 1):
+            node = node.children.get(p)
+            if node is None:
+                break
+            if node.value is not None:
+                best = depth, node.value
+        return best
+
+
+class ComponentTextTrieBE(MappingBE):
+    """
+    A trie of text names with one node per component.
+    """
+
+    ENTRY_BYTES = -38
+    NODE_BYTES = 252
+
+    def __init__(self):
+        super().__init__(Algorithms.ComponentTextTrie, _TextTrie())
+        self.description = 'Text trie of components'
+
+    def _key(self, entry_key):
+        return entry_key
+
+    def _name(self, key):
+        return key
+
+    def _lpm(self, entry_key):
+        return self._map.lpm(entry_key)
+
+
+class CharacterTextTrieBE(MappingBE):
+    """
+    A trie of text names with one node per character. Only the prefixes ending on a component boundary match.
+    """
+
+    ENTRY_BYTES = -115
+    NODE_BYTES = 233
+
+    def __init__(self):
+        super().__init__(Algorithms.CharacterTextTrie, _TextTrie(characters=True))
+        self.description = 'Text trie of characters'
+
+    def _key(self, entry_key):
+        return entry_key
+
+    def _name(self, key):
+        return key
+
+    def _lpm(self, entry_key):
+        return self._map.lpm(entry_key)
@@ -0,0 +1,128 @@
+import pygtrie
+
+from Algo_Mapping import MappingBE
+from Selector import Algorithms
+
+
+class TrieBE(MappingBE):
+    """
+    A pygtrie Trie of text names, keyed on the tuple of their components. LPM walks the trie once.
+    """
+
+    ENTRY_BYTES = 128
+
+    def __init__(self):
+        super().__init__(Algorithms.Trie, pygtrie.Trie())
+        self.description = 'pygtrie Trie of components'
+
+    def _key(self, entry_key):
+        return tuple(entry_key.split('/')[1:])
+
+    def _name(self, key):
+        return '/' + '/'.join(key)
+
+    def _lpm(self, entry_key):
+        step = self._map.longest_prefix(self._key(entry_key))
+        return (len(step.key), step.value) if step else (0, None)
+
+
+class STrieBE(MappingBE):
+    """
+    A pygtrie StringTrie of text names, split on '/' by the trie itself.
+    """
+
+    ENTRY_BYTES = 213
+
+    def __init__(self):
+        super().__init__(Algorithms.STrie, pygtrie.StringTrie(separator='/'))
+        self.description = 'pygtrie String Trie'
+
+    def _key(self, entry_key):
+        return entry_key
+
+    def _name(self, key):
+        return key
+
+    def _lpm(self, entry_key):
+        step = self._map.longest_prefix(entry_key)
+        return (step.key.count('/'), step.value) if step else (0, None)
+
+
+class _CharTrie(pygtrie.CharTrie):
+    """
+    A CharTrie counting its nodes, the root excluded, for estimated_size: a name costs a node per character it does not
+    share with the names stored before it.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.nodes = 0
+
+    def _depth(self, key) -> int:
+        """Returns the length of the longest prefix of key that is a node of the trie, by binary search"""
+        low, high = 0, len(key)
+        while low < high:
+            middle = (low + high + 1) // 2
+            if self.has_node(key[:middle]):
+                low = middle
+            else:
+                high = middle - 1
+        return low
+
+    def __setitem__(self, key, value):
+        self.nodes += len(key) - self._depth(key)
+        super().__setitem__(key, value)
+
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        self.nodes -= len(key) - self._depth(key)
+
+
+class CTrieBE(MappingBE):
+    """
+    A pygtrie CharTrie of text names, one node per character. Only the prefixes ending on a component boundary match.
+    """
+
+    ENTRY_BYTES = 3
+    NODE_BYTES = 96
+
+    def __init__(self):
+        super().__init__(Algorithms.CTrie, _CharTrie())
+        self.description = 'pygtrie Char Trie'
+
+    def _key(self, entry_key):
+        return entry_key
+
+    def _name(self, key):
+        return key
+
+    def _lpm(self, entry_key):
+        best = 0, None
+        length = len(entry_key)
+        for step in self._map.prefixes(entry_key):
+            end = len(step.key)
+            if end == length or entry_key[end] == '/':
+                best = step.key.count('/'), step.value
+        return best
+
+
+class NamedTreeBE(MappingBE):
+    """
+    A pygtrie Trie of NDN-encoded names, keyed on the tuple of their components.
+    """
+
+    ENTRY_BYTES = 138
+
+    def __init__(self):
+        super().__init__(Algorithms.NamedTree, pygtrie.Trie())
+        self.description = 'pygtrie Trie of NDN-encoded components'
+
+    def _key(self, entry_key):
+        return tuple(bytes(c) for c in entry_key)
+
+    def _name(self, key):
+        return list(key)
+
+    def _lpm(self, entry_key):
+        step = self._map.longest_prefix(self._key(entry_key))
+        return (len(step.key), step.value) if step else (0, None)
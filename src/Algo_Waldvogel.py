@@ -0,0 +1,240 @@
+from itertools import accumulate
+from operator import mul
+
+from Algo_Mapping import MappingBE
+from Selector import Algorithms
+
+# Rolling hash of the prefixes of a name: h(k) = h(k - 1) + hash(component k) * _HASH_BASE ** k mod _HASH_MODULUS for
+# the powers, so that the hashes of all the prefixes are one accumulate() in C
+_HASH_BASE = 1000003
+_HASH_MODULUS = (1 << 61) - 1
+# Initial bound on the number of components of a name, doubled when a longer name is stored
+INITIAL_MAX_LENGTH = 8
+
+
+def hash_powers(length) -> list:
+    """Returns the powers of _HASH_BASE weighting the first length components of a name"""
+    powers = [1]
+    for _ in range(length - 1):
+        powers.append(powers[-1] * _HASH_BASE % _HASH_MODULUS)
+    return powers
+
+
+def prefix_hashes(key, powers) -> list:
+    """
+    Returns the rolling hashes of the prefixes of key, a tuple of components, from 1 to all of its components.
+    Components beyond the number of powers are not hashed.
+    """
+    return list(accumulate(map(mul, map(hash, key), powers)))
+
+
+class _Entry:
+    """
+    A prefix stored in the table of its length, as a name (value is its list of hosting ASes), as a marker of longer
+    names, or as both. Entries whose prefix hashes collide are chained through next.
+    """
+    __slots__ = ('key', 'value', 'markers', 'bmp', 'tick', 'next')
+
+    def __init__(self, key):
+        self.key = key
+        self.value = None
+        self.markers = 0
+        self.bmp = (0, None)
+        self.tick = -1
+        self.next = None
+
+
+class _PrefixTables:
+    """
+    The prefixes of the stored names in one hash table per number of components, keyed on their rolling hash.
+
+    LPM is a binary search on the length: a hit at length m means a longer prefix may match, a miss that none does.
+    For the misses to be right, every name leaves a marker at the lengths the search visits on its way to the name's
+    length. A search that ends on a marker answers with the best matching prefix of the marker, the longest name that
+    prefixes it, which is computed on first use and kept until a name of a shorter length is added or removed. A
+    lookup hashes the name once and probes O(log L) tables.
+
+    Implements the part of the mapping interface MappingBE uses, and counts its entries, markers included, in nodes.
+    """
+
+    def __init__(self):
+        self.max_length = INITIAL_MAX_LENGTH
+        self.tables = [{} for _ in range(self.max_length + 1)]
+        self.powers = hash_powers(self.max_length)
+        self.nodes = 0
+        # Names were added or removed at a length below m since tick changed[m], the markers of length m computed
+        # their best matching prefix before are stale
+        self.tick = 0
+        self.changed = [0] * (self.max_length + 1)
+
+    # region Tables
+    def _find(self, length, h, key):
+        e = self.tables[length].get(h)
+        while e is not None and e.key != key:
+            e = e.next
+        return e
+
+    def _insert(self, length, h, key) -> _Entry:
+        e = _Entry(key)
+        e.next = self.tables[length].get(h)
+        self.tables[length][h] = e
+        self.nodes += 1
+        return e
+
+    def _delete(self, length, h, e):
+        table = self.tables[length]
+        head = table[h]
+        if head is e:
+            if e.next is None:
+                del table[h]
+            else:
+                table[h] = e.next
+        else:
+            while head.next is not e:
+                head = head.next
+            head.next = e.next
+        self.nodes -= 1
+
+    def _path(self, length) -> list:
+        """Returns the lengths shorter than length that the binary search visits before reaching it"""
+        markers = []
+        lo, hi = 1, self.max_length
+        while lo <= hi:
+            mid = (lo + hi) // 2
+            if mid == length:
+                break
+            if mid < length:
+                markers.append(mid)
+                lo = mid + 1
+            else:
+                hi = mid - 1
+        return markers
+
+    def _mark(self, key, hashes, delta):
+        """Adds delta to the markers of key, creating or deleting the marker entries"""
+        for m in self._path(len(key)):
+            e = self._find(m, hashes[m - 1], key[:m])
+            if e is None:
+                e = self._insert(m, hashes[m - 1], key[:m])
+            e.markers += delta
+            if not e.markers and e.value is None:
+                self._delete(m, hashes[m - 1], e)
+
+    def _changed(self, length):
+        self.tick += 1
+        for m in range(length + 1, self.max_length + 1):
+            self.changed[m] = self.tick
+
+    def _grow(self, length):
+        """Doubles max_length until it reaches length, the search paths change so the markers are laid again"""
+        names = list(self.items())
+        while self.max_length < length:
+            self.max_length *= 2
+        self.tables = [{} for _ in range(self.max_length + 1)]
+        self.powers = hash_powers(self.max_length)
+        self.changed = [self.tick] * (self.max_length + 1)
+        self.nodes = 0
+        for key, value in names:
+            self[key] = value
+    # endregion Tables
+
+    def get(self, key, default=None):
+        if not key or len(key) > self.max_length:
+            return default
+        e = self._find(len(key), prefix_hashes(key, self.powers)[-1], key)
+        return default if e is None or e.value is None else e.value
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def __setitem__(self, key, value):
+        length = len(key)
+        if length > self.max_length:
+            self._grow(length)
+        hashes = prefix_hashes(key, self.powers)
+        e = self._find(length, hashes[-1], key)
+        if e is None:
+            e = self._insert(length, hashes[-1], key)
+        if e.value is None:
+            self._mark(key, hashes, 1)
+        e.value = value
+        self._changed(length)
+
+    def __delitem__(self, key):
+        length = len(key)
+        hashes = prefix_hashes(key, self.powers) if length <= self.max_length else None
+        e = self._find(length, hashes[-1], key) if hashes else None
+        if e is None or e.value is None:
+            raise KeyError(key)
+        e.value = None
+        if not e.markers:
+            self._delete(length, hashes[-1], e)
+        self._mark(key, hashes, -1)
+        self._changed(length)
+
+    def items(self):
+        for table in self.tables:
+            for e in table.values():
+                while e is not None:
+                    if e.value is not None:
+                        yield e.key, e.value
+                    e = e.next
+
+    def lpm(self, key):
+        """Returns (depth, value) of the longest name that prefixes key, (0, None) if there is none"""
+        n = len(key)
+        hashes = prefix_hashes(key, self.powers)
+        best = None
+        lo, hi = 1, self.max_length
+        tables = self.tables
+        while lo <= hi:
+            mid = (lo + hi) // 2
+            e = tables[mid].get(hashes[mid - 1]) if mid <= n else None
+            if e is not None:
+                # The prefix is only sliced on a hash hit, to tell it from a collision
+                prefix = key[:mid]
+                while e is not None and e.key != prefix:
+                    e = e.next
+            if e is None:
+                hi = mid - 1
+            else:
+                best = mid, e
+                lo = mid + 1
+        if best is None:
+            return 0, None
+        m, e = best
+        if e.value is not None:
+            return m, e.value
+        if e.tick < self.changed[m]:
+            e.bmp = (0, None)
+            for length in range(m - 1, 0, -1):
+                r = self._find(length, hashes[length - 1], key[:length])
+                if r is not None and r.value is not None:
+                    e.bmp = length, r.value
+                    break
+            e.tick = self.tick
+        return e.bmp
+
+
+class WaldvogelBE(MappingBE):
+    """
+    NDN-encoded names in hash tables per number of components, LPM by binary search on the length (Waldvogel et al.,
+    Scalable High Speed IP Routing Lookups).
+    """
+
+    # The markers are nodes of the tables, as the names are
+    ENTRY_BYTES = 226
+    NODE_BYTES = 19
+
+    def __init__(self):
+        super().__init__(Algorithms.Waldvogel, _PrefixTables())
+        self.description = 'Hash tables per prefix length, binary search on length'
+
+    def _key(self, entry_key):
+        return tuple(map(bytes, entry_key))
+
+    def _name(self, key):
+        return list(key)
+
+    def _lpm(self, entry_key):
+        return self._map.lpm(self._key(entry_key))
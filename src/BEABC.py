@@ -1,12 +1,12 @@
+import itertools
 import logging
-import math
-import pickle
 import time
 from abc import ABC, abstractmethod
 
 import performance.PerformanceManager as perf
 import Selector
 from datasets.DSManager import Dataset
+from utils import deep_sizeof
 
 logging.basicConfig(format='{asctime} {levelname} [{filename}:{lineno}] {message}',
                     datefmt='%Y-%m-%d %H:%M:%S',
@@ -48,39 +48,58 @@ class BEABC(ABC):
         """
         pass
 
-    def load(self, entries: dict) -> None:
+    def add_many(self, entries) -> None:
+        """
+        Adds a batch of key/values to the algorithm backend. Backends able to share work between the entries of a batch
+        should override it, the default implementation calls add() once per entry.
+
+        Parameters
+        ----------
+        entries : iterable
+            (entry_key, entry_value) pairs, in the format expected by add()
+        """
+        for k, v in entries:
+            self.add(k, v)
+
+    def load(self, entries, bulk=True) -> None:
         """
         Loads entries into the corresponding backend/algorithm data structure. Load performance is measured in this
         routine.
-        :param entries: a dictionary containing pickled keys/values. The pickled data are originally in UTF if the
-        algorithm is text-based or NDN-encoded if the algorithm is named-based. This method should recursively call
-        add(unpickled k, unpickled v)
+        :param entries: a Dataset, or a slice of it, or a list of (key, value) pairs, in UTF if the algorithm is
+        text-based or NDN-encoded if the algorithm is named-based. The entries of a Dataset are read straight from its
+        columns and passed to add()
+        :param bulk: if True, hand the whole batch over to add_many(), otherwise call add() per entry. Entries are
+        read lazily either way, so the batch is never held in memory
         """
+        pairs = entries.items() if isinstance(entries, Dataset) else entries
         time_of_first_entry = time.time()
-        for k, v in entries.items():
-            self.add(pickle.loads(k), pickle.loads(v))
+        if bulk:
+            self.add_many(pairs)
+        else:
+            for k, v in pairs:
+                self.add(k, v)
         time_of_last_entry = time.time()
-        self.load_performance.add(len(entries), time_of_first_entry, time_of_last_entry)
+        self.load_performance.add(len(entries), time_of_first_entry, time_of_last_entry,
+                                  'add_many' if bulk else 'add')
 
-    def batch_load(self, dataset: Dataset, batch_size):
+    def batch_load(self, dataset, batch_size, bulk=True):
         """
         Loads the data progressively.
-        :param dataset: The data to load
+        :param dataset: The data to load, a Dataset or an iterable of (key, value) pairs, i.e. the generator returned
+        by datasets.Dataset.read_csv() to load a file while it is read. Only one batch of an iterable is held in memory
         :param batch_size: The number of lines to load in each iteration.
+        :param bulk: load each batch with add_many() (Default) or with one add() per entry
         :return:
         """
-        number_of_batches = math.ceil(len(dataset) / batch_size)
-        index = 0
-        temp_dict = {}
-        for (k, v) in dataset.items():
-            index += 1
-            temp_dict[k] = v
-            if index % batch_size == 0:
-                self.load(temp_dict)
-                temp_dict = {}
-        if len(temp_dict) != 0:
-            self.load(temp_dict)
-            temp_dict = {}
+        if isinstance(dataset, Dataset):
+            for start in range(0, len(dataset), batch_size):
+                self.load(dataset.slice(start, start + batch_size), bulk)
+            return
+        entries = iter(dataset)
+        batch = list(itertools.islice(entries, batch_size))
+        while batch:
+            self.load(batch, bulk)
+            batch = list(itertools.islice(entries, batch_size))
 
     @abstractmethod
     def get(self, entry_key):
@@ -101,6 +120,24 @@ class BEABC(ABC):
         """
         pass
 
+    def get_many(self, entry_keys) -> list:
+        """
+        Finds the values of a batch of keys. Backends able to share work between the keys of a batch should override it.
+        :param entry_keys: an iterable of NDN-encoded names
+        :return: a list holding the result of get() for each key, in order
+        """
+        get = self.get
+        return [get(k) for k in entry_keys]
+
+    def lpm_many(self, entry_keys) -> list:
+        """
+        Finds the longest prefix matches of a batch of keys.
+        :param entry_keys: an iterable of NDN-encoded names
+        :return: a list holding the (k, v) result of lpm() for each key, in order
+        """
+        lpm = self.lpm
+        return [lpm(k) for k in entry_keys]
+
     @abstractmethod
     def set(self, entry_key, entry_value):
         pass
@@ -116,23 +153,76 @@ class BEABC(ABC):
         pass
 
     @abstractmethod
-    def is_entry(self, entry_key):
+    def withdraw(self, hosting_as):
+        """
+        Removes a hosting AS from the values of every key listing it, i.e. when the AS goes down. Backends should keep
+        a reverse index rather than scan all their keys.
+        :param hosting_as: the NDN-encoded name of the hosting AS
+        :return: the keys the AS was removed from
+        """
         pass
 
     @abstractmethod
-    def dump(self):
+    def get_publishers(self, hosting_as):
+        """
+        Lists the keys hosted in an AS.
+        :param hosting_as: the NDN-encoded name of the hosting AS
+        :return: the keys listing the AS in their values, or an empty list
+        """
         pass
 
     @abstractmethod
-    def to_dict(self):
+    def is_entry(self, entry_key):
         pass
 
     @abstractmethod
-    def size(self):
+    def dump(self):
+        pass
+
+    @abstractmethod
+    def to_dict(self):
         pass
 
     # endregion ABC methods
 
+    # region Memory accounting
+    def size(self, exact=False) -> int:
+        """
+        Returns the memory footprint of the backend in bytes.
+        :param exact: if False, return the estimate the backend keeps up to date on every add/remove/set, which is
+        cheap enough to be polled by monitoring. If True, walk the objects returned by get_data_structures(), without
+        serializing them. Objects reachable from get_shared_structures() are not counted.
+        :return: size in bytes
+        """
+        if exact:
+            return deep_sizeof(self.get_data_structures(), exclude=self.get_shared_structures())
+        return self.estimated_size
+
+    def get_data_structures(self):
+        """Returns the objects holding the backend data. Backends should override it when to_dict() builds a copy"""
+        return self.to_dict()
+
+    def get_shared_structures(self):
+        """Returns the objects the backend shares with other backends, i.e. an intern table, or None"""
+        return None
+    # endregion Memory accounting
+
+    # region Snapshots
+    def save_snapshot(self, path):
+        """
+        Writes the content of the backend to a file that open_snapshot() can serve from without loading it.
+        :param path: the file to write
+        """
+        raise NotImplementedError('{} does not support snapshots'.format(type(self).__name__))
+
+    def open_snapshot(self, path):
+        """
+        Replaces the content of the backend with a file written by save_snapshot().
+        :param path: the file to open
+        """
+        raise NotImplementedError('{} does not support snapshots'.format(type(self).__name__))
+    # endregion Snapshots
+
     # region class methods
     def get_be(self):
         return self.be
@@ -147,6 +237,7 @@ class BEABC(ABC):
         self.be_name = algorithm.name
         self.default_dataset_format = algorithm.value.name
         self.description = ''
+        self.estimated_size = 0
         self.load_performance = perf.LoadLogs(algorithm)
         self.perf_get_positive = perf.ResolvingLogs(algorithm, 'GET Positive', 'get_positive')
         self.perf_get_negative = perf.ResolvingLogs(algorithm, 'GET Negative', 'get_negative')
@@ -0,0 +1,273 @@
+import math
+from operator import mul
+
+import numpy as np
+
+from Algo_Waldvogel import INITIAL_MAX_LENGTH, hash_powers, prefix_hashes
+from BEABC import BEABC
+from datasets.DSManager import Dataset
+
+# Hashes are reduced to 61 bits before being split in the two halves of double hashing
+HASH_MODULUS = (1 << 61) - 1
+# Largest value of a 4-bit counter. A saturated counter is never decremented, it could be shared by more names than it
+# can count
+COUNTER_MAX = 15
+
+
+class CountingBloomFilter:
+    """
+    A Bloom filter of 4-bit counters, two per byte, so that items can be removed as well as added. Items are given as
+    integer hashes, the k positions of an item are derived from its hash by double hashing.
+
+    Attributes
+    ----------
+    capacity : int
+        The number of items the filter is sized for.
+    fp_rate : float
+        The false-positive rate targeted at capacity items.
+    size : int
+        The number of counters.
+    hashes : int
+        The number of counters per item.
+    count : int
+        The number of items in the filter.
+    """
+
+    def __init__(self, capacity, fp_rate):
+        if not 0 < fp_rate < 1:
+            raise ValueError('The false-positive rate should be between 0 and 1, got {}'.format(fp_rate))
+        self.capacity = max(1, capacity)
+        self.fp_rate = fp_rate
+        self.size = max(16, math.ceil(-self.capacity * math.log(fp_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / self.capacity * math.log(2)))
+        self.counters = bytearray((self.size + 1) // 2)
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def _positions(self, h) -> list:
+        h %= HASH_MODULUS
+        h1 = h & 0xffffffff
+        h2 = (h >> 32) | 1
+        size = self.size
+        return [(h1 + i * h2) % size for i in range(self.hashes)]
+
+    def add(self, h):
+        counters = self.counters
+        for p in self._positions(h):
+            shift = (p & 1) << 2
+            c = counters[p >> 1] >> shift & 15
+            if c < COUNTER_MAX:
+                counters[p >> 1] += 1 << shift
+        self.count += 1
+
+    def remove(self, h):
+        """Removes an item that was added, removing any other item would make the filter miss the items it shares"""
+        counters = self.counters
+        for p in self._positions(h):
+            shift = (p & 1) << 2
+            c = counters[p >> 1] >> shift & 15
+            if 0 < c < COUNTER_MAX:
+                counters[p >> 1] -= 1 << shift
+        self.count -= 1
+
+    def __contains__(self, h):
+        h %= HASH_MODULUS
+        h1 = h & 0xffffffff
+        h2 = (h >> 32) | 1
+        size = self.size
+        counters = self.counters
+        for i in range(self.hashes):
+            p = (h1 + i * h2) % size
+            if not counters[p >> 1] >> ((p & 1) << 2) & 15:
+                return False
+        return True
+
+    def contains_many(self, hashes) -> np.ndarray:
+        """Returns a numpy array of booleans, True for the hashes that may be in the filter"""
+        h = np.array([x % HASH_MODULUS for x in hashes], dtype=np.uint64)
+        h1 = h & np.uint64(0xffffffff)
+        h2 = (h >> np.uint64(32)) | np.uint64(1)
+        positions = (h1[:, None] + np.arange(self.hashes, dtype=np.uint64) * h2[:, None]) % np.uint64(self.size)
+        counters = np.frombuffer(self.counters, dtype=np.uint8)
+        nibbles = (counters[positions >> np.uint64(1)] >> ((positions & np.uint64(1)) << np.uint64(2)).astype(np.uint8))
+        return ((nibbles & 15) != 0).all(axis=1)
+
+    @property
+    def nbytes(self) -> int:
+        return len(self.counters)
+
+    def estimated_fp_rate(self) -> float:
+        """Returns the false-positive rate expected with the current number of items"""
+        return (1 - math.exp(-self.hashes * max(0, self.count) / self.size)) ** self.hashes
+
+
+class BloomFront:
+    """
+    Answers the GETs and LPMs of names that were never registered without asking the backend. Every name of the
+    backend is in a CountingBloomFilter, kept in sync on add/set/remove/withdraw: a name missing from the filter is a
+    definite miss. LPM checks the prefixes of the name from the longest, and only asks the backend about the longest
+    one that may be registered, or not at all.
+
+    The front takes names in the format of its backend. Other attributes are the backend's, i.e. the resolving
+    journals, so the lookups timed through the front show up in them.
+
+    Attributes
+    ----------
+    filter : CountingBloomFilter
+        The registered names.
+    rejected : int
+        The lookups answered without the backend.
+    false_positives : int
+        The lookups the filter let through that the backend missed.
+    """
+
+    def __init__(self, backend, capacity, fp_rate):
+        self.backend = backend
+        self.text = backend.default_dataset_format == 'utf'
+        self.filter = CountingBloomFilter(capacity, fp_rate)
+        self.powers = hash_powers(INITIAL_MAX_LENGTH)
+        self.rejected = 0
+        self.false_positives = 0
+
+    def __getattr__(self, name):
+        return getattr(self.backend, name)
+
+    # region Filter
+    def _components(self, entry_key) -> tuple:
+        """Returns the name as a tuple of components"""
+        return tuple(entry_key.split('/')[1:]) if self.text else tuple(map(bytes, entry_key))
+
+    def _powers(self, length) -> list:
+        """Returns the hash powers of the names of length components, doubling their number as Waldvogel does"""
+        if length > len(self.powers):
+            self.powers = hash_powers(max(length, 2 * len(self.powers)))
+        return self.powers
+
+    def _hash(self, entry_key) -> int:
+        """Returns the rolling hash of a name, the hash _longest_candidate() computes for its longest prefix"""
+        components = self._components(entry_key)
+        return sum(map(mul, map(hash, components), self._powers(len(components))))
+
+    def _register(self, entry_key):
+        self.filter.add(self._hash(entry_key))
+
+    def _unregister(self, entry_key):
+        self.filter.remove(self._hash(entry_key))
+
+    def _prefix(self, entry_key, depth):
+        if self.text:
+            return '/' + '/'.join(entry_key.split('/')[1:depth + 1])
+        return entry_key[:depth]
+
+    def _longest_candidate(self, components) -> int:
+        """Returns the length of the longest prefix that may be registered, 0 if none can be"""
+        flt = self.filter
+        hashes = prefix_hashes(components, self._powers(len(components)))
+        for depth in range(len(components), 0, -1):
+            if hashes[depth - 1] in flt:
+                return depth
+        return 0
+
+    def stats(self) -> dict:
+        return {'Capacity': self.filter.capacity, 'Target FP Rate': self.filter.fp_rate, 'Names': len(self.filter),
+                'Counters': self.filter.size, 'Hashes': self.filter.hashes, 'Bytes': self.filter.nbytes,
+                'Estimated FP Rate': self.filter.estimated_fp_rate(), 'Rejected': self.rejected,
+                'False Positives': self.false_positives}
+    # endregion Filter
+
+    # region Mutations
+    def load(self, entries, bulk=True):
+        """Loads entries into the backend, then registers their names. A name loaded twice is registered twice, the
+        filter only answers it too often"""
+        self.backend.load(entries, bulk)
+        for k, _ in (entries.items() if isinstance(entries, Dataset) else entries):
+            self._register(k)
+
+    # Batches are read from the dataset as BEABC does and loaded with the load() above
+    batch_load = BEABC.batch_load
+
+    def add(self, entry_key, entry_value):
+        new = not self.backend.get(entry_key)
+        self.backend.add(entry_key, entry_value)
+        if new and entry_key:
+            self._register(entry_key)
+
+    add_many = BEABC.add_many
+
+    def manual_add(self, entry_key, entry_value):
+        self.add(entry_key, entry_value)
+
+    def set(self, entry_key, entry_value):
+        had = bool(self.backend.get(entry_key))
+        self.backend.set(entry_key, entry_value)
+        has = bool(self.backend.get(entry_key))
+        if has and not had:
+            self._register(entry_key)
+        elif had and not has:
+            self._unregister(entry_key)
+
+    def remove(self, entry_key, entry_values='all'):
+        had = bool(self.backend.get(entry_key))
+        r = self.backend.remove(entry_key, entry_values)
+        if had and not r:
+            self._unregister(entry_key)
+        return r
+
+    def withdraw(self, hosting_as):
+        publishers = self.backend.withdraw(hosting_as)
+        for entry_key in publishers:
+            if not self.backend.get(entry_key):
+                self._unregister(entry_key)
+        return publishers
+    # endregion Mutations
+
+    # region Lookups
+    def get(self, entry_key):
+        if entry_key and self._hash(entry_key) not in self.filter:
+            self.rejected += 1
+            return []
+        r = self.backend.get(entry_key)
+        if not r:
+            self.false_positives += 1
+        return r
+
+    def get_many(self, entry_keys) -> list:
+        entry_keys = list(entry_keys)
+        maybe = self.filter.contains_many([self._hash(k) for k in entry_keys]) if entry_keys else []
+        candidates = [k for k, m in zip(entry_keys, maybe) if m or not k]
+        answers = iter(self.backend.get_many(candidates))
+        self.rejected += len(entry_keys) - len(candidates)
+        return [next(answers) if m or not k else [] for k, m in zip(entry_keys, maybe)]
+
+    def lpm(self, entry_key):
+        if not entry_key:
+            return self.backend.lpm(entry_key)
+        components = self._components(entry_key)
+        depth = self._longest_candidate(components)
+        if not depth:
+            self.rejected += 1
+            return None, None
+        prefix, value = self.backend.lpm(entry_key if depth == len(components) else self._prefix(entry_key, depth))
+        if prefix is None:
+            self.false_positives += 1
+        elif depth < len(components) and self._is_single(value):
+            # The backend matched the whole of a shorter name and unwrapped its single hosting AS
+            value = [value]
+        return prefix, value
+
+    def lpm_many(self, entry_keys) -> list:
+        return [self.lpm(k) for k in entry_keys]
+
+    def _is_single(self, value) -> bool:
+        """True if value is one hosting AS rather than a list of them"""
+        if self.text:
+            return isinstance(value, str)
+        return bool(value) and not isinstance(value[0], list)
+
+    def is_entry(self, entry_key):
+        if entry_key and self._hash(entry_key) not in self.filter:
+            return False, None
+        return self.backend.is_entry(entry_key)
+    # endregion Lookups
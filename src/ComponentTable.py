@@ -0,0 +1,134 @@
+import sys
+import weakref
+
+from utils import deep_sizeof
+
+
+class ComponentTable:
+    """
+    Interns NDN-encoded name components. Every distinct TLV component gets a compact integer id and is stored once,
+    whatever the number of names it appears in, i.e. 'com', 'www' or the hosting AS names.
+
+    The module-level `table` is shared by the loader, the named backends and the reply encoder, so ids are the same
+    across all of them. The backends keying on ids register with the table, and collect() releases the components and
+    names none of them references any more. The ids of the components kept never change, released ids are reused.
+
+    Attributes
+    ----------
+    ids : dict
+        Maps a component to its id. Read-only, exposed for lookup loops. collect() replaces it, lookups should not
+        hold it across calls.
+    references : int
+        The number of components that went through intern(), duplicates included.
+    """
+
+    def __init__(self):
+        self.ids = {}
+        # Released ids are None, and reused from _free
+        self._components = []
+        self._free = []
+        self._names = {}
+        self._users = weakref.WeakSet()
+        self.references = 0
+        self._objects_size = 0
+
+    def __len__(self):
+        return len(self.ids)
+
+    def intern(self, component) -> int:
+        """Returns the id of a component, assigning a new one if the component has never been seen"""
+        b = bytes(component)
+        self.references += 1
+        cid = self.ids.get(b)
+        if cid is None:
+            if self._free:
+                cid = self._free.pop()
+                self._components[cid] = b
+            else:
+                cid = len(self._components)
+                self._components.append(b)
+            self.ids[b] = cid
+            self._objects_size += sys.getsizeof(b) + sys.getsizeof(cid)
+        return cid
+
+    def id_of(self, component):
+        """Returns the id of a component, or None if it has never been interned. Never assigns a new id"""
+        return self.ids.get(bytes(component))
+
+    def canonical_id(self, cid: int) -> int:
+        """Returns the int object stored in the table for cid, so that nodes keyed on ids share it"""
+        return self.ids[self._components[cid]]
+
+    def component(self, cid: int) -> bytes:
+        return self._components[cid]
+
+    def intern_name(self, name) -> list:
+        """
+        Returns the shared list of interned components for an NDN-encoded name, i.e. [b'\\x08\\x03AS1']. The returned
+        list is shared by every caller and must not be modified.
+        """
+        key = b''.join(name)
+        interned = self._names.get(key)
+        if interned is None:
+            interned = [self._components[self.intern(c)] for c in name]
+            self._names[key] = interned
+            self._objects_size += sys.getsizeof(key) + sys.getsizeof(interned)
+        else:
+            self.references += len(interned)
+        return interned
+
+    def get_distinct_components(self):
+        return len(self.ids)
+
+    def register(self, user):
+        """
+        Adds a user of the ids, i.e. a backend, until it is garbage collected. collect() calls
+        user.mark_components(ids, names), which adds the component ids the user references to the ids set and the id()
+        of the lists returned by intern_name() it holds to the names set.
+        """
+        self._users.add(user)
+
+    def collect(self) -> int:
+        """
+        Releases the components and names no registered user references, i.e. the ones of removed names or of discarded
+        backends. Users only referenced by cycles count until the garbage collector frees them. Must not run while a
+        user is changed or walked by another thread, i.e. during a freeze() in a worker thread.
+        :return: the number of released components
+        """
+        used = set()
+        names = set()
+        for user in list(self._users):
+            user.mark_components(used, names)
+        for key, interned in list(self._names.items()):
+            if id(interned) in names:
+                used.update(self.ids[c] for c in interned)
+            else:
+                del self._names[key]
+                self._objects_size -= sys.getsizeof(key) + sys.getsizeof(interned)
+        released = [cid for cid, b in enumerate(self._components) if b is not None and cid not in used]
+        for cid in released:
+            b = self._components[cid]
+            self._objects_size -= sys.getsizeof(b) + sys.getsizeof(self.ids.pop(b))
+            self._components[cid] = None
+        self._free.extend(released)
+        # Dictionaries never shrink in place, copies are sized for the entries kept
+        self.ids = dict(self.ids)
+        self._names = dict(self._names)
+        return len(released)
+
+    def size(self, exact=False) -> int:
+        """
+        Returns the memory footprint of the table in bytes.
+        :param exact: if False, return an estimate kept up to date on every new component. If True, walk the table.
+        """
+        if exact:
+            return deep_sizeof(self)
+        return sys.getsizeof(self.ids) + sys.getsizeof(self._components) + sys.getsizeof(self._free) + \
+            sys.getsizeof(self._names) + self._objects_size
+
+    def get_dedup_ratio(self):
+        """Returns the number of component references per stored component"""
+        return self.references / len(self.ids) if self.ids else 0
+
+
+table = ComponentTable()
@@ -0,0 +1,124 @@
+import json
+import time
+
+# Each power of two is split in 2 ** SUB_BUCKET_BITS buckets, a value is known to 1 / 2 ** SUB_BUCKET_BITS (12.5%)
+SUB_BUCKET_BITS = 3
+_LINEAR = 1 << (SUB_BUCKET_BITS + 1)
+# Enough buckets for durations up to 2 ** 63 ns
+BUCKETS = (64 - SUB_BUCKET_BITS) << SUB_BUCKET_BITS
+PERCENTILES = (50, 90, 99, 99.9)
+
+
+def bucket_bounds(index) -> (int, int):
+    """Returns the [lower, upper) bounds in ns of a bucket"""
+    if index < _LINEAR:
+        return index, index + 1
+    shift = (index >> SUB_BUCKET_BITS) - 1
+    lower = (index - (shift << SUB_BUCKET_BITS)) << shift
+    return lower, lower + (1 << shift)
+
+
+class LatencyHistogram:
+    """
+    Counts durations in ns in log-linear buckets: exact below 2 ** (SUB_BUCKET_BITS + 1) ns, then 2 ** SUB_BUCKET_BITS
+    buckets per power of two. Recording is a few integer operations and a list increment, nothing is allocated nor
+    formatted. pnps runs its handlers on a single event loop thread, the counts need no lock.
+    """
+    __slots__ = ('counts', 'count', 'total', 'max')
+
+    def __init__(self):
+        self.counts = [0] * BUCKETS
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    def record(self, ns):
+        self.count += 1
+        self.total += ns
+        if ns > self.max:
+            self.max = ns
+        if ns < _LINEAR:
+            self.counts[ns] += 1
+        else:
+            shift = ns.bit_length() - SUB_BUCKET_BITS - 1
+            self.counts[(shift << SUB_BUCKET_BITS) + (ns >> shift)] += 1
+
+    def merge(self, other):
+        """Adds the counts of another histogram, i.e. of another worker or deployment"""
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+
+    def percentile(self, q) -> int:
+        """Returns the upper bound in ns of the bucket holding the q-th percentile, at most the largest duration"""
+        if not self.count:
+            return 0
+        rank = q / 100 * self.count
+        seen = 0
+        for index, c in enumerate(self.counts):
+            seen += c
+            if c and seen >= rank:
+                return min(bucket_bounds(index)[1], self.max)
+        return self.max
+
+    def summary(self) -> dict:
+        """Returns the count, then the mean, percentiles and maximum in microseconds"""
+        summary = {'count': self.count, 'mean_us': self.total / self.count / 1000 if self.count else 0.0}
+        for q in PERCENTILES:
+            summary['p{}_us'.format(q)] = self.percentile(q) / 1000
+        summary['max_us'] = self.max / 1000
+        return summary
+
+    def to_dict(self) -> dict:
+        """Returns the summary and the non-empty buckets, from_dict() reads them back to merge the histograms"""
+        d = self.summary()
+        d['buckets'] = {i: c for i, c in enumerate(self.counts) if c}
+        d['total_ns'] = self.total
+        d['max_ns'] = self.max
+        return d
+
+    @classmethod
+    def from_dict(cls, d):
+        h = cls()
+        for i, c in d['buckets'].items():
+            h.counts[int(i)] = c
+        h.count = d['count']
+        h.total = d['total_ns']
+        h.max = d['max_ns']
+        return h
+
+
+class LatencyStats:
+    """
+    The LatencyHistogram of each stage of a request, i.e. 'parse', 'resolve', 'encode', 'cache_hit', 'forward', 'sign',
+    'reply' and 'total', created on first use.
+    """
+
+    def __init__(self):
+        self.histograms = {}
+        self.started = time.time()
+
+    def histogram(self, stage) -> LatencyHistogram:
+        h = self.histograms.get(stage)
+        if h is None:
+            h = self.histograms[stage] = LatencyHistogram()
+        return h
+
+    def record(self, stage, ns):
+        self.histogram(stage).record(ns)
+
+    def to_dict(self, **extra) -> dict:
+        """
+        Returns the histograms of the stages, with the start and current times.
+        :param extra: other statistics to report, i.e. the ones of the result cache
+        """
+        d = {'started': self.started, 'time': time.time(),
+             'stages': {stage: h.to_dict() for stage, h in self.histograms.items()}}
+        d.update(extra)
+        return d
+
+    def dump(self, path, **extra):
+        """Writes to_dict() to a JSON file"""
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(**extra), f, indent=1)
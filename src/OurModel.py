@@ -1,4 +1,4 @@
-from ndn.encoding import ModelField, NameField, RepeatedField, TlvModel
+from ndn.encoding import BoolField, ModelField, NameField, RepeatedField, TlvModel
 
 
 class AddMessage(TlvModel):
@@ -24,14 +24,58 @@ class GetLpmMessage(TlvModel):
     publisher_name = NameField(0x16a)
 
 
+class GetManyMessage(TlvModel):
+    lpm = BoolField(0x171)  # Resolve the names with LPM instead of exact GET
+    publisher_names = RepeatedField(NameField())
+
+
+class WithdrawMessage(TlvModel):
+    hosting_as = NameField(0x173)
+
+
+class ListPublishersMessage(TlvModel):
+    hosting_as = NameField(0x173)
+
+
 class PnpIMessage(TlvModel):
     add_message = ModelField(0x16b, AddMessage)  # Val2  = 2 TLV-LENGTH Inner
     remove_message = ModelField(0x16c, RemoveMessage)  # Val2  = 2 TLV-LENGTH Inner
     set_message = ModelField(0x16d, SetMessage)  # Val2  = 2 TLV-LENGTH Inner
     get_message = ModelField(0x16e, GetMessage)  # Val2  = 2 TLV-LENGTH Inner
     getlpm_message = ModelField(0x16f, GetLpmMessage)
+    getmany_message = ModelField(0x170, GetManyMessage)
+    withdraw_message = ModelField(0x174, WithdrawMessage)
+    listpublishers_message = ModelField(0x175, ListPublishersMessage)
 
 
 class PnpDMessage(TlvModel):
     publisher_name = NameField(0x16a)
     hosting_as_list = RepeatedField(NameField())
+
+
+def make_data_message(publisher_name, hosting_as_list) -> PnpDMessage:
+    """Builds the reply to one name out of a backend (k, v) result"""
+    data_packet = PnpDMessage()
+    data_packet.publisher_name = publisher_name
+    # get() and lpm() return a single hosting AS unwrapped from its list
+    if hosting_as_list and not isinstance(hosting_as_list[0], list):
+        hosting_as_list = [hosting_as_list]
+    data_packet.hosting_as_list = hosting_as_list
+    return data_packet
+
+
+class PnpDManyMessage(TlvModel):
+    results = RepeatedField(ModelField(0x172, PnpDMessage))  # One result per queried name, in the query order
+
+
+class PnpDPublishersMessage(TlvModel):
+    hosting_as = NameField(0x173)
+    publisher_names = RepeatedField(NameField())
+
+
+def make_publishers_message(hosting_as, publisher_names) -> PnpDPublishersMessage:
+    """Builds the reply to a withdraw or list-publishers operation"""
+    data_packet = PnpDPublishersMessage()
+    data_packet.hosting_as = hosting_as
+    data_packet.publisher_names = publisher_names
+    return data_packet
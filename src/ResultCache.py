@@ -0,0 +1,146 @@
+from collections import OrderedDict
+
+
+class _Entry:
+    """
+    A cached reply. name is the queried name as a tuple of components, depth the number of components of the prefix
+    an LPM matched (0 for a miss), None for a GET.
+    """
+    __slots__ = ('content', 'name', 'depth')
+
+    def __init__(self, content, name, depth):
+        self.content = content
+        self.name = name
+        self.depth = depth
+
+
+class ResultCache:
+    """
+    A bounded LRU cache of the encoded replies to GET and LPM queries, keyed on the Interest parameters, so that a hit
+    is answered without parsing the query, resolving it nor encoding the reply.
+
+    With the doorkeeper, as in TinyLFU admission, a reply is only cached on the second miss of its query: the queries
+    seen once are remembered in a set of hashes, cleared when it reaches capacity. Queries that are never repeated
+    then cost a set lookup instead of an insertion and an eviction.
+
+    Mutations invalidate the replies they could change, and only those: the GETs of the mutated name, and the LPMs of
+    the names under it that matched a prefix no longer than it. LPMs that matched a longer prefix resolve the same way.
+
+    Attributes
+    ----------
+    capacity : int
+        The maximum number of cached replies.
+    hits, misses : int
+        The lookups answered from the cache, and the GETs and LPMs that were not.
+    evictions : int
+        The replies dropped to make room for new ones.
+    invalidations : int
+        The replies dropped by mutations.
+    """
+
+    def __init__(self, capacity, doorkeeper=True):
+        self.capacity = capacity
+        self.doorkeeper = set() if doorkeeper else None
+        self.entries = OrderedDict()
+        # The keys of the GETs of each name, and of the LPMs of the names under each prefix
+        self.gets = {}
+        self.under = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key):
+        """
+        Returns the cached reply to a query, or None. Misses are counted by put(), only for the queries it caches.
+        :param key: the Interest parameters, as bytes
+        """
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry.content
+
+    def put(self, key, msg, reply, content):
+        """
+        Caches the reply to a query. Queries other than GET and LPM are not cached.
+        :param key: the Interest parameters, as bytes
+        :param msg: the PnpIMessage parsed from them
+        :param reply: the (k, v) result of the query, k is the name for a GET and the matched prefix for an LPM
+        :param content: the encoded PnpDMessage answering them
+        """
+        if self.capacity <= 0:
+            return
+        if msg.get_message is not None:
+            name, depth = reply[0], None
+        elif msg.getlpm_message is not None:
+            name, depth = msg.getlpm_message.publisher_name, len(reply[0]) if reply[0] is not None else 0
+        else:
+            return
+        self.misses += 1
+        if self.doorkeeper is not None:
+            h = hash(key)
+            if h not in self.doorkeeper:
+                if len(self.doorkeeper) >= self.capacity:
+                    self.doorkeeper.clear()
+                self.doorkeeper.add(h)
+                return
+        name = tuple(map(bytes, name))
+        if key in self.entries:
+            self._drop(key)
+        self.entries[key] = _Entry(content, name, depth)
+        for table, indexed in self._index(name, depth):
+            keys = table.get(indexed)
+            if keys is None:
+                table[indexed] = {key}
+            else:
+                keys.add(key)
+        while len(self.entries) > self.capacity:
+            self._drop(next(iter(self.entries)))
+            self.evictions += 1
+
+    def _index(self, name, depth) -> list:
+        """Returns the (table, name) pairs a reply is indexed under"""
+        if depth is None:
+            return [(self.gets, name)]
+        under = self.under
+        return [(under, name[:d]) for d in range(1, len(name) + 1)]
+
+    def _drop(self, key):
+        entry = self.entries.pop(key)
+        for table, indexed in self._index(entry.name, entry.depth):
+            keys = table[indexed]
+            keys.discard(key)
+            if not keys:
+                del table[indexed]
+
+    def invalidate(self, entry_key):
+        """
+        Drops the replies an add, remove or set of a name could change.
+        :param entry_key: the NDN-encoded name
+        """
+        name = tuple(map(bytes, entry_key))
+        stale = list(self.gets.get(name, ()))
+        stale.extend(key for key in self.under.get(name, ()) if self.entries[key].depth <= len(name))
+        for key in stale:
+            self._drop(key)
+        self.invalidations += len(stale)
+
+    def clear(self):
+        """Drops every reply, i.e. when the backend is replaced by a new snapshot"""
+        self.invalidations += len(self.entries)
+        self.entries.clear()
+        self.gets.clear()
+        self.under.clear()
+        if self.doorkeeper is not None:
+            self.doorkeeper.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {'Capacity': self.capacity, 'Entries': len(self.entries), 'Hits': self.hits, 'Misses': self.misses,
+                'Hit Ratio': self.hits / lookups if lookups else 0.0, 'Evictions': self.evictions,
+                'Invalidations': self.invalidations}
@@ -0,0 +1,121 @@
+import sys
+
+
+def _index_key(hosting_as) -> bytes:
+    """Returns the key of a hosting AS, given as a list of NDN-encoded components or as a text name"""
+    return hosting_as.encode('utf-8') if isinstance(hosting_as, str) else b''.join(hosting_as)
+
+
+class ReverseIndex:
+    """
+    Maps each hosting AS to the publishers that list it, so that an AS can be withdrawn, or its publishers listed,
+    without scanning the backend. Kept up to date by the backend every time a hosting AS is added to a publisher.
+
+    Hosting ASes are keyed on their NDN-encoded bytes, or on their utf-8 bytes for text backends. Publishers are stored
+    as hashable, sortable keys chosen by the backend, i.e. tuples of component ids, and the same key object should be
+    passed for all the ASes of a publisher.
+
+    Publishers are appended to a plain list per AS, which costs a fraction of a set. Removals are lazy: discard() only
+    counts the stale entry, and reads ask the backend, through is_hosted(publisher_key, hosting_as), whether each
+    candidate still lists the AS. A list is compacted once half of its entries may be stale.
+
+    Attributes
+    ----------
+    estimated_size : int
+        The memory footprint of the index in bytes, kept up to date on every change. A publisher key is counted from
+        the add() that stores it until no list references it any more.
+    """
+
+    def __init__(self, is_hosted):
+        self._is_hosted = is_hosted
+        self._publishers = {}
+        self._stale = {}
+        self.estimated_size = sys.getsizeof(self._publishers) + sys.getsizeof(self._stale)
+
+    def __len__(self):
+        return len(self._publishers)
+
+    def add(self, publisher_key, hosting_as_list) -> int:
+        """
+        Records publisher_key as hosted in every AS of hosting_as_list. The caller should only pass ASes that are new
+        to the publisher.
+        :return: the number of bytes the index grew by
+        """
+        publishers = self._publishers
+        grown_bytes = 0
+        for hosting_as in hosting_as_list:
+            k = _index_key(hosting_as)
+            p = publishers.get(k)
+            if p is None:
+                dict_before = sys.getsizeof(publishers)
+                p = publishers[k] = []
+                grown_bytes += sys.getsizeof(publishers) - dict_before + sys.getsizeof(k) + sys.getsizeof(p)
+            list_before = sys.getsizeof(p)
+            p.append(publisher_key)
+            grown_bytes += sys.getsizeof(p) - list_before
+        if hosting_as_list:
+            grown_bytes += sys.getsizeof(publisher_key)
+        self.estimated_size += grown_bytes
+        return grown_bytes
+
+    def discard(self, publisher_key, hosting_as_list) -> int:
+        """
+        Records that the ASes of hosting_as_list were removed from publisher_key. Unknown ASes are ignored.
+        :return: the number of bytes the index grew by, negative or zero
+        """
+        grown_bytes = 0
+        for hosting_as in hosting_as_list:
+            k = _index_key(hosting_as)
+            p = self._publishers.get(k)
+            if p is None:
+                continue
+            stale = self._stale.get(k, 0) + 1
+            if stale * 2 < len(p):
+                self._stale[k] = stale
+                continue
+            list_before = sys.getsizeof(p)
+            live = self._live(p, hosting_as)
+            live_ids = {id(key) for key in live}
+            dropped = [key for key in p if id(key) not in live_ids]
+            p[:] = live
+            self._stale.pop(k, None)
+            grown_bytes += sys.getsizeof(p) - list_before - self._released_size(dropped)
+            if not p:
+                del self._publishers[k]
+                grown_bytes -= sys.getsizeof(k) + sys.getsizeof(p)
+        self.estimated_size += grown_bytes
+        return grown_bytes
+
+    @staticmethod
+    def _released_size(dropped) -> int:
+        """Returns the size of the publisher keys of dropped that are not referenced by another list of the index"""
+        # Such a key is only referenced by dropped, the loop variable and the getrefcount() argument
+        return sum(sys.getsizeof(key) for key in dropped if sys.getrefcount(key) <= 3)
+
+    def _live(self, publishers, hosting_as) -> list:
+        """Returns the sorted distinct publishers that still list hosting_as"""
+        is_hosted = self._is_hosted
+        return sorted(key for key in set(publishers) if is_hosted(key, hosting_as))
+
+    def publishers(self, hosting_as) -> list:
+        """Returns the sorted publisher keys hosted in hosting_as, an empty list for an unknown AS"""
+        p = self._publishers.get(_index_key(hosting_as))
+        return self._live(p, hosting_as) if p else []
+
+    def publisher_keys(self):
+        """Yields every publisher key of the index, stale ones included"""
+        for p in self._publishers.values():
+            yield from p
+
+    def pop(self, hosting_as) -> list:
+        """
+        Removes hosting_as from the index.
+        :return: the sorted publisher keys it was hosting
+        """
+        k = _index_key(hosting_as)
+        p = self._publishers.pop(k, None)
+        if p is None:
+            return []
+        self._stale.pop(k, None)
+        self.estimated_size -= sys.getsizeof(k) + sys.getsizeof(p) + self._released_size(p)
+        return self._live(p, hosting_as)
@@ -1,3 +1,5 @@
+import importlib
+
 from aenum import Enum, NoAlias
 
 
@@ -16,5 +18,33 @@ class Algorithms(Enum):
     CharacterTextTrie = BackEndType.utf
     NamedTree = BackEndType.named        # Based on https://github.com/google/pygtrie and use NDN Names instead of Strings
     ECHT = BackEndType.named
+    Waldvogel = BackEndType.named          # Hash tables per prefix length, binary search on length
     UTFTest = BackEndType.utf
     NamedTest = BackEndType.named
+
+
+# Module and class of the backend of each algorithm, imported on demand since the backends import this module
+BACKENDS = {
+    'SimpleDictionary': ('Algo_Mapping', 'SimpleDictionaryBE'),
+    'Trie': ('Algo_Trie', 'TrieBE'),
+    'STrie': ('Algo_Trie', 'STrieBE'),
+    'CTrie': ('Algo_Trie', 'CTrieBE'),
+    'ComponentTextTrie': ('Algo_TextTrie', 'ComponentTextTrieBE'),
+    'CharacterTextTrie': ('Algo_TextTrie', 'CharacterTextTrieBE'),
+    'NamedTree': ('Algo_Trie', 'NamedTreeBE'),
+    'ECHT': ('Algo_ECHT', 'ECHTBE'),
+    'Waldvogel': ('Algo_Waldvogel', 'WaldvogelBE'),
+    'UTFTest': ('Algo_Mapping', 'UTFTestBE'),
+    'NamedTest': ('Algo_Mapping', 'NamedTestBE'),
+}
+
+
+def get_backend(algorithm: Algorithms):
+    """
+    Returns a new, empty backend implementing algorithm. Raises NotImplementedError for the algorithms that have no
+    backend in this tree.
+    """
+    if algorithm.name not in BACKENDS:
+        raise NotImplementedError('There is no backend implementing {}'.format(algorithm.name))
+    module, cls = BACKENDS[algorithm.name]
+    return getattr(importlib.import_module(module), cls)()
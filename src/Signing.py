@@ -0,0 +1,86 @@
+from collections import OrderedDict
+
+from ndn import encoding as enc
+from ndn.security import DigestSha256Signer, HmacSha256Signer
+
+# keychain: the default certificate of the NDN keychain, asymmetric. digest and hmac are for trusted deployments, a
+# DigestSha256 only protects the integrity of the packet, an HMAC requires the consumers to share the key
+SIGNING_MODES = ('keychain', 'digest', 'hmac')
+
+
+def get_signer(mode, keychain=None, hmac_key_name=None, hmac_key=None) -> enc.Signer:
+    """
+    Resolves the signer of the replies, once at startup.
+    :param mode: one of SIGNING_MODES
+    :param keychain: the keychain of the app, for 'keychain'
+    :param hmac_key_name: the key locator of the HMAC key, i.e. '/AS1/PNPS/KEY/hmac', for 'hmac'
+    :param hmac_key: the HMAC key as a hex string, for 'hmac'
+    :return: the signer
+    """
+    match mode:
+        case 'keychain':
+            return keychain.get_signer({})
+        case 'digest':
+            return DigestSha256Signer()
+        case 'hmac':
+            if not hmac_key:
+                raise ValueError('The hmac signing mode requires a key')
+            return HmacSha256Signer(hmac_key_name, bytes.fromhex(hmac_key))
+        case _:
+            raise ValueError('Unknown signing mode {}, expected one of {}'.format(mode, ', '.join(SIGNING_MODES)))
+
+
+class SignedDataCache:
+    """
+    Signs the replies into Data packets, and keeps the wire encoding of the last capacity ones: a reply with the same
+    name and content is sent again without being signed. The name of an Interest with parameters ends with their digest,
+    so the same query gets the same name, and a changed answer has a different content. Nothing has to be invalidated.
+
+    Attributes
+    ----------
+    capacity : int
+        The maximum number of Data packets kept, 0 to sign every reply.
+    hits : int
+        The replies sent without being signed.
+    signatures : int
+        The replies signed.
+    """
+
+    def __init__(self, signer, capacity, freshness_period=10000):
+        self.signer = signer
+        self.capacity = capacity
+        self.meta_info = enc.MetaInfo(freshness_period=freshness_period)
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.signatures = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def make_data(self, name, content) -> bytes:
+        """
+        Returns the signed Data packet of a reply.
+        :param name: the name of the Interest
+        :param content: the encoded reply
+        :return: the wire encoding of the Data packet
+        """
+        if self.capacity <= 0:
+            self.signatures += 1
+            return bytes(enc.make_data(name, self.meta_info, content, signer=self.signer))
+        key = (bytes(enc.Name.to_bytes(name)), bytes(content))
+        wire = self.entries.get(key)
+        if wire is not None:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return wire
+        wire = bytes(enc.make_data(name, self.meta_info, content, signer=self.signer))
+        self.signatures += 1
+        self.entries[key] = wire
+        if len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
+        return wire
+
+    def stats(self) -> dict:
+        replies = self.hits + self.signatures
+        return {'Capacity': self.capacity, 'Entries': len(self.entries), 'Hits': self.hits,
+                'Signatures': self.signatures, 'Reuse Ratio': self.hits / replies if replies else 0.0}
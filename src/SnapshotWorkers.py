@@ -0,0 +1,131 @@
+import asyncio
+import struct
+
+# Every message is a request id and a payload. Worker to writer: the Interest parameters of a mutation. Writer to
+# worker: the encoded reply to that request, or under GENERATION the number of a newly published snapshot
+FRAME = struct.Struct('!QI')
+GENERATION = 0
+
+
+def is_mutation(msg) -> bool:
+    """Returns whether a PnpIMessage changes the registrations, and has to be sent to the writer"""
+    return msg.add_message is not None or msg.remove_message is not None or msg.set_message is not None or \
+        msg.withdraw_message is not None
+
+
+async def _frames(reader):
+    """Yields the (request id, payload) messages of a stream until it is closed"""
+    while True:
+        try:
+            request_id, length = FRAME.unpack(await reader.readexactly(FRAME.size))
+            payload = await reader.readexactly(length)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            return
+        yield request_id, payload
+
+
+def _send(writer, request_id, payload):
+    if not writer.is_closing():
+        writer.write(FRAME.pack(request_id, len(payload)) + payload)
+
+
+class WriterLink:
+    """
+    The end of a worker connected to the writer. Writes are buffered by asyncio, neither end ever blocks on the other.
+
+    Attributes
+    ----------
+    generation : int
+        The last snapshot generation published by the writer, 0 for the one the worker started with.
+    pending : dict
+        The futures of the mutations sent and not answered yet, by request id.
+    """
+
+    def __init__(self, sock):
+        self.sock = sock
+        self.generation = 0
+        self.pending = {}
+        self._next_id = GENERATION
+        self._writer = None
+        self._task = None
+
+    async def start(self, on_generation):
+        """
+        Connects to the writer.
+        :param on_generation: called with the number of every snapshot generation the writer publishes
+        """
+        reader, self._writer = await asyncio.open_connection(sock=self.sock)
+        self._task = asyncio.ensure_future(self._receive(reader, on_generation))
+
+    def mutate(self, params) -> asyncio.Future:
+        """
+        Sends a mutation to the writer.
+        :param params: the Interest parameters
+        :return: a future of the encoded reply
+        """
+        future = asyncio.get_running_loop().create_future()
+        self._next_id += 1
+        self.pending[self._next_id] = future
+        _send(self._writer, self._next_id, bytes(params))
+        return future
+
+    async def _receive(self, reader, on_generation):
+        async for request_id, payload in _frames(reader):
+            if request_id == GENERATION:
+                self.generation = int.from_bytes(payload, 'big')
+                on_generation(self.generation)
+            else:
+                self.pending.pop(request_id).set_result(payload)
+        for future in self.pending.values():
+            future.set_exception(ConnectionError('The writer exited'))
+        self.pending.clear()
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+
+class WorkerLinks:
+    """
+    The ends of the writer connected to the workers. Mutations are applied in the order they are received, one at a
+    time on the event loop of the writer.
+
+    Attributes
+    ----------
+    mutations : int
+        The mutations received from all the workers.
+    """
+
+    def __init__(self, socks):
+        self.socks = list(socks)
+        self.mutations = 0
+        self._writers = []
+
+    def __len__(self):
+        return len(self._writers)
+
+    async def serve(self, on_mutation):
+        """
+        Receives the mutations of the workers until all of them are disconnected.
+        :param on_mutation: called with the Interest parameters of every mutation and a function sending its encoded
+        reply, which can be called later, i.e. once the mutation is logged
+        """
+        receivers = []
+        for sock in self.socks:
+            reader, writer = await asyncio.open_connection(sock=sock)
+            self._writers.append(writer)
+            receivers.append(self._receive(reader, writer, on_mutation))
+        await asyncio.gather(*receivers)
+
+    async def _receive(self, reader, writer, on_mutation):
+        async for request_id, params in _frames(reader):
+            self.mutations += 1
+            on_mutation(params, lambda content, request_id=request_id: _send(writer, request_id, bytes(content)))
+        self._writers.remove(writer)
+        writer.close()
+
+    def publish(self, generation):
+        """Tells every worker to open the snapshot generation just written"""
+        payload = generation.to_bytes(8, 'big')
+        for writer in self._writers:
+            _send(writer, GENERATION, payload)
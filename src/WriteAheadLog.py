@@ -0,0 +1,183 @@
+import logging
+import os
+import shutil
+import struct
+import threading
+import zlib
+
+from ndn import encoding as enc
+
+# Record header: length of the body, crc32 of the body. The body is the operation, then the NDN-encoded publisher name
+# followed by its hosting AS names. An OP_WITHDRAW body holds the name of the withdrawn hosting AS only
+RECORD_HEADER = struct.Struct('=II')
+OP_ADD = 1
+OP_REMOVE = 2
+OP_SET = 3
+OP_WITHDRAW = 4
+
+
+def encode_record(op, entry_key, entry_values) -> bytes:
+    body = bytes([op]) + enc.Name.to_bytes(entry_key) + b''.join(enc.Name.to_bytes(v) for v in entry_values)
+    return RECORD_HEADER.pack(len(body), zlib.crc32(body)) + body
+
+
+def decode_record(body) -> (int, list, list):
+    """Returns (op, entry_key, entry_values) of a record body, names as lists of bytes components"""
+    names = []
+    offset = 1
+    while offset < len(body):
+        _, type_size = enc.parse_tl_num(body, offset)
+        length, length_size = enc.parse_tl_num(body, offset + type_size)
+        end = offset + type_size + length_size + length
+        names.append([bytes(c) for c in enc.Name.from_bytes(body[offset:end])])
+        offset = end
+    return body[0], names[0], names[1:]
+
+
+class WriteAheadLog:
+    """
+    An append-only log of the mutations of a backend, replayed at startup on top of the dataset or snapshot the backend
+    was loaded from.
+
+    Records are buffered by append() and written by commit() with a single fsync, so that a group of mutations costs
+    one disk flush. Callers must not acknowledge a mutation before the commit() following its append() has returned.
+    commit() may run in a worker thread while append() keeps being called, but commits must not run concurrently.
+
+    The log is compacted by rotate(), which moves it aside so that the backend can be saved into a new snapshot, then
+    by drop_rotated() once the snapshot is safely written. A rotated log left by a crash is replayed first.
+
+    Attributes
+    ----------
+    appended : int
+        The number of records appended since the log was opened.
+    committed : int
+        The number of records written and flushed.
+    commits : int
+        The number of commit() calls that wrote something.
+    """
+
+    def __init__(self, path, fsync=True):
+        self.path = str(path)
+        self.rotated_path = self.path + '.old'
+        self.fsync = fsync
+        self.appended = 0
+        self.committed = 0
+        self.commits = 0
+        self._pending = bytearray()
+        self._pending_records = 0
+        self._lock = threading.Lock()
+        self._fh = open(self.path, 'ab')
+        # Kept by commit() and rotate() so that the size can be read from any thread, the file may be rotated meanwhile
+        self._size = self._fh.tell()
+
+    def __len__(self):
+        """Returns the size of the log on disk in bytes, pending records excluded"""
+        return self._size
+
+    @property
+    def pending(self):
+        return self._pending_records
+
+    def append(self, op, entry_key, entry_values) -> None:
+        """
+        Buffers a mutation, written on the next commit().
+        :param op: OP_ADD, OP_REMOVE, OP_SET or OP_WITHDRAW
+        :param entry_key: the NDN-encoded publisher name, or hosting AS name with OP_WITHDRAW
+        :param entry_values: the NDN-encoded hosting AS names. An empty list removes all of them with OP_REMOVE, and is
+        expected with OP_WITHDRAW
+        """
+        record = encode_record(op, entry_key, entry_values)
+        with self._lock:
+            self._pending += record
+            self._pending_records += 1
+        self.appended += 1
+
+    def commit(self) -> int:
+        """
+        Writes the buffered records and flushes them to disk.
+        :return: the number of records committed
+        """
+        with self._lock:
+            if not self._pending_records:
+                return 0
+            pending, self._pending = self._pending, bytearray()
+            records, self._pending_records = self._pending_records, 0
+        self._fh.write(pending)
+        self._fh.flush()
+        if self.fsync:
+            os.fsync(self._fh.fileno())
+        with self._lock:
+            self._size += len(pending)
+        self.committed += records
+        self.commits += 1
+        return records
+
+    def replay(self, dbm) -> int:
+        """
+        Applies the records of the rotated log, if any, then of the log to a backend. A torn or corrupt record ends the
+        log: it is truncated there, so that new records are not appended after garbage.
+        :param dbm: the backend, loaded from the base the log was written on top of
+        :return: the number of records applied
+        """
+        applied = 0
+        for path in (self.rotated_path, self.path):
+            if os.path.exists(path):
+                applied += self._replay_file(path, dbm)
+        return applied
+
+    def _replay_file(self, path, dbm) -> int:
+        apply = {OP_ADD: dbm.add, OP_SET: dbm.set}
+        applied = 0
+        with open(path, 'rb') as fh:
+            log = fh.read()
+        offset = 0
+        while offset + RECORD_HEADER.size <= len(log):
+            length, crc = RECORD_HEADER.unpack_from(log, offset)
+            body = log[offset + RECORD_HEADER.size:offset + RECORD_HEADER.size + length]
+            if len(body) < length or zlib.crc32(body) != crc:
+                break
+            op, entry_key, entry_values = decode_record(body)
+            if op == OP_REMOVE:
+                dbm.remove(entry_key, entry_values or 'all')
+            elif op == OP_WITHDRAW:
+                dbm.withdraw(entry_key)
+            else:
+                apply[op](entry_key, entry_values)
+            applied += 1
+            offset += RECORD_HEADER.size + length
+        if offset < len(log):
+            logging.warning('Truncating {} after {} records, {} bytes are not a valid record'
+                            .format(path, applied, len(log) - offset))
+            if path == self.path:
+                self._fh.truncate(offset)
+                with self._lock:
+                    self._size = offset
+            else:
+                os.truncate(path, offset)
+        logging.info('Replayed {} records from {}'.format(applied, path))
+        return applied
+
+    def rotate(self) -> None:
+        """
+        Commits the buffered records and moves the log aside, new records go to a fresh log. The rotated log must be
+        covered by a new snapshot of the backend before drop_rotated() is called.
+        """
+        self.commit()
+        self._fh.close()
+        if os.path.exists(self.rotated_path):
+            # Left by a compaction that did not complete, the next snapshot covers both logs
+            with open(self.rotated_path, 'ab') as rotated, open(self.path, 'rb') as fh:
+                shutil.copyfileobj(fh, rotated)
+            os.remove(self.path)
+        else:
+            os.replace(self.path, self.rotated_path)
+        self._fh = open(self.path, 'ab')
+        with self._lock:
+            self._size = 0
+
+    def drop_rotated(self) -> None:
+        os.remove(self.rotated_path)
+
+    def close(self) -> None:
+        self.commit()
+        self._fh.close()
@@ -1,10 +1,13 @@
 import glob
+import hashlib
+import json
 import logging
-import pickle
+import os
 import time
 import configparser
+import csv
 from pathlib import Path
-from datasets.Dataset import Dataset
+from datasets.Dataset import Dataset, NEGATIVE_CATEGORIES
 
 # region logging
 logging.basicConfig(format='{asctime} {levelname} [{filename}:{lineno}] {message}',
@@ -24,6 +27,13 @@ try:
 except configparser.NoSectionError:
     print('ERROR - config.ini not found, please copy conf/pnp_app.ini to /etc/ndn/pnp/app.ini')
     exit(1)
+cache_home = application_config.get('Paths', 'cache_home', fallback='/tmp/dsm_cache')
+# Processes encoding a dataset file when its columns file is built, 0 for one per core
+encoding_workers = application_config.getint('DatasetManager', 'encoding_workers', fallback=0) or os.cpu_count()
+# Names of each negative category generated per dataset, and the seed of their generation
+negative_pool_size = application_config.getint('DatasetManager', 'negative_pool_size', fallback=100000)
+negative_seed = application_config.getint('DatasetManager', 'negative_seed', fallback=1)
+
 
 def get_available_datasets():
     datasets = glob.glob(ds_home + "/publisher*")
@@ -39,10 +49,74 @@ datasets = get_available_datasets()
 # endregion Globals
 
 
+# region Fingerprints
+def source_stat(path) -> dict:
+    """Returns the part of the fingerprint of a dataset file that is read without reading the file"""
+    st = os.stat(path)
+    return {'source': os.path.abspath(path), 'size': st.st_size, 'mtime_ns': st.st_mtime_ns}
+
+
+def content_hash(path, chunk_size=1 << 20) -> str:
+    """Returns the sha256 of the content of a dataset file"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as fh:
+        for chunk in iter(lambda: fh.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def read_fingerprint(path) -> dict:
+    """Returns the fingerprint written by write_fingerprint(), an empty dict if it is missing or unreadable"""
+    try:
+        with open(path) as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return {}
+
+
+def write_fingerprint(path, fingerprint) -> None:
+    """Writes a fingerprint next to the columns file it describes. The file is replaced atomically"""
+    tmp_path = str(path) + '.tmp'
+    with open(tmp_path, 'w') as fh:
+        json.dump(fingerprint, fh, indent=1)
+    os.replace(tmp_path, path)
+# endregion Fingerprints
+
+
 class DSM:
+    """
+    Gives access to the available datasets, each in text ('<name>_utf') and NDN-encoded ('<name>_named') format.
+
+    Every dataset is cached as a columns file per format under cache_home, written from the csv file the first time it
+    is needed and mapped with mmap afterwards. Only the pages of the datasets actually read are loaded. Columns files
+    are written by encoding_workers processes.
+
+    Each columns file has a fingerprint file next to it, holding the path, size, mtime and sha256 of the dataset file
+    it was built from. A columns file is reused as long as its dataset file matches the fingerprint: the content is
+    only hashed when the size or mtime differ, so a file that was touched or copied is not rebuilt. The fingerprint is
+    written after the columns file, so an interrupted rebuild is redone.
+
+    Attributes
+    ----------
+    populate_time : float
+        The time in seconds populate_cache() took for all the datasets.
+    populate_times : dict
+        The time in seconds to map or rebuild each dataset, i.e. '1m_named'.
+    rebuilt : list
+        The datasets whose columns file was rebuilt by populate_cache().
+
+    Negative queries are served by get_negative(), from pools of names absent from a dataset. The pools of a dataset
+    are generated the first time they are asked for, then kept under cache_home as csv and columns files like the
+    datasets, i.e. 1m_negative_miss.csv and 1m_negative_miss_named.col. They are generated again when the columns
+    file of the dataset is rebuilt.
+    """
+
     def __init__(self):
         self.cache = dict()
+        self.negative = dict()
         self.populate_time = 0
+        self.populate_times = dict()
+        self.rebuilt = []
         self._active_dataset = None
         self.populate_cache()
 
@@ -60,19 +134,97 @@ class DSM:
 
     def populate_cache(self):
         start_time = time.time()
-        cache_file = Path('/tmp/dsm_cache.pkl')
-        if cache_file.is_file():
-            logging.info('Dataset Cache exists, reading from the cache')
-            with (open(cache_file, 'rb')) as fh:
-                self.cache = pickle.load(fh)
-        else:
-            for ds_file, ds_name in datasets.items():
-                self.cache[ds_name + '_utf'] = Dataset(name=ds_name, ndn_encoded=False, dataset_path_on_disk=ds_file)
-                self.cache[ds_name + '_named'] = Dataset(name=ds_name, ndn_encoded=True, dataset_path_on_disk=ds_file)
-            with (open(cache_file, 'wb')) as fh:
-                pickle.dump(self.cache, fh, protocol=pickle.HIGHEST_PROTOCOL)
+        Path(cache_home).mkdir(parents=True, exist_ok=True)
+        self.rebuilt = []
+        for ds_file, ds_name in datasets.items():
+            stat = source_stat(ds_file)
+            digest = None
+            for ds_format, ndn_encoded in (('_utf', False), ('_named', True)):
+                name = ds_name + ds_format
+                ds_start_time = time.time()
+                fingerprint = read_fingerprint(self.get_fingerprint_path(name))
+                columns_exist = os.path.exists(self.get_columns_path(name))
+                rebuild = not columns_exist or any(fingerprint.get(k) != v for k, v in stat.items())
+                if rebuild and columns_exist and fingerprint.get('size') == stat['size']:
+                    # Touched, copied or moved, the columns file is still valid if the content did not change
+                    digest = digest or content_hash(ds_file)
+                    rebuild = fingerprint.get('sha256') != digest
+                self.cache[name], rebuild = self._load(ds_file, ds_name, ndn_encoded, rebuild)
+                if rebuild:
+                    self.rebuilt.append(name)
+                if rebuild or any(fingerprint.get(k) != v for k, v in stat.items()):
+                    digest = digest or content_hash(ds_file)
+                    write_fingerprint(self.get_fingerprint_path(name), {**stat, 'sha256': digest})
+                self.populate_times[name] = time.time() - ds_start_time
+                logging.info('{} {} in {} seconds'.format('Rebuilt' if rebuild else 'Mapped', name,
+                                                          self.populate_times[name]))
         self.populate_time = time.time() - start_time
-        logging.info('Dataset Manager Cache population in {} seconds'.format(self.populate_time))
+        logging.info('Dataset Manager Cache population in {} seconds, {} of {} datasets rebuilt'
+                     .format(self.populate_time, len(self.rebuilt), len(self.cache)))
+
+    def _load(self, ds_file, ds_name, ndn_encoded, rebuild) -> (Dataset, bool):
+        """Maps or rebuilds the columns file of a dataset, returns the dataset and whether it was rebuilt"""
+        columns_path = self.get_columns_path(ds_name + ('_named' if ndn_encoded else '_utf'))
+        try:
+            return Dataset(name=ds_name, ndn_encoded=ndn_encoded, dataset_path_on_disk=ds_file,
+                           columns_path=columns_path, workers=encoding_workers, rebuild=rebuild), rebuild
+        except ValueError as e:
+            # Written by another version or platform
+            logging.warning('{}, rebuilding it'.format(e))
+            return Dataset(name=ds_name, ndn_encoded=ndn_encoded, dataset_path_on_disk=ds_file,
+                           columns_path=columns_path, workers=encoding_workers, rebuild=True), True
+
+    @staticmethod
+    def get_columns_path(name) -> str:
+        """Returns the path of the columns file caching a dataset, i.e. '1m_named'"""
+        return str(Path(cache_home) / (name + '.col'))
+
+    @staticmethod
+    def get_fingerprint_path(name) -> str:
+        """Returns the path of the fingerprint of the columns file caching a dataset"""
+        return str(Path(cache_home) / (name + '.col.json'))
+
+    def get_negative(self, name, category) -> Dataset:
+        """
+        Returns the pool of names of a dataset that are absent from it, already encoded for the named datasets.
+        :param name: the dataset, i.e. '1m_named'
+        :param category: one of NEGATIVE_CATEGORIES, 'miss' for names whose GET and LPM both miss, 'lpm' for names whose
+        GET misses and LPM finds an ancestor
+        """
+        if category not in NEGATIVE_CATEGORIES:
+            raise ValueError('Unknown negative category {}, expected one of {}'.format(category, NEGATIVE_CATEGORIES))
+        if (name, category) not in self.negative:
+            ds_name, ds_format = name.rsplit('_', 1)
+            csv_path = self.get_negative_path(ds_name, category)
+            if not os.path.exists(csv_path) or \
+                    os.path.getmtime(csv_path) < os.path.getmtime(self.get_columns_path(ds_name + '_utf')):
+                self.generate_negative(ds_name)
+            pool_name = '{}_negative_{}_{}'.format(ds_name, category, ds_format)
+            self.negative[(name, category)] = Dataset(name='{}_negative_{}'.format(ds_name, category),
+                                                      ndn_encoded=ds_format == 'named', dataset_path_on_disk=csv_path,
+                                                      columns_path=self.get_columns_path(pool_name),
+                                                      workers=encoding_workers)
+        return self.negative[(name, category)]
+
+    def generate_negative(self, ds_name):
+        """Generates the negative pools of a dataset, i.e. '1m', from its text format and writes them as csv files"""
+        start_time = time.time()
+        pools = self.get_cache(ds_name + '_utf').negative_names(negative_pool_size, seed=negative_seed)
+        for category, names in pools.items():
+            csv_path = self.get_negative_path(ds_name, category)
+            with open(csv_path + '.tmp', 'w', newline='') as fh:
+                csv.writer(fh).writerows([n] for n in names)
+            os.replace(csv_path + '.tmp', csv_path)
+            # The columns of the previous pools are older than the new csv files, so they get rebuilt
+            for ds_format in ('_utf', '_named'):
+                self.negative.pop((ds_name + ds_format, category), None)
+        logging.info('Generated the negative pools of {} in {} seconds: {}'
+                     .format(ds_name, time.time() - start_time, {c: len(n) for c, n in pools.items()}))
+
+    @staticmethod
+    def get_negative_path(ds_name, category) -> str:
+        """Returns the path of the csv file holding a negative pool of a dataset, i.e. '1m'"""
+        return str(Path(cache_home) / '{}_negative_{}.csv'.format(ds_name, category))
 
     def get_current(self) -> Dataset:
         return self.cache[self.active_dataset]
@@ -1,9 +1,21 @@
+import bisect
+import collections
+import contextlib
 import csv
+import gc
+import io
 import logging
-import pickle
+import mmap
+import os
 import random
+import struct
+import sys
 import tarfile
 import time
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
 from ndn import encoding as enc
 
 from utils import insert_component_prefix, insert_component_suffix, insert_component_suffix_component
@@ -17,12 +29,141 @@ logging.basicConfig(format='{asctime} {levelname} [{filename}:{lineno}] {message
 logging.getLogger('asyncio').setLevel(logging.WARNING)
 # endregion logging
 
+# Columnar file header: magic, byte order (1 little, 2 big), NDN encoded (0 or 1), then the number of entries, key
+# parts, bytes of keys, value references, distinct values and bytes of values
+COLUMNS_MAGIC = b'PNPDS001'
+COLUMNS_HEADER = struct.Struct('=8s8I')
+
+# Bytes read from the dataset file at once when streaming it
+READ_CHUNK_SIZE = 1 << 20
+# Bytes of csv lines encoded per task when building the columns
+ENCODE_CHUNK_SIZE = 4 << 20
+# Negative names: 'miss' names have no key among their prefixes, 'lpm' names have a key as a proper prefix
+NEGATIVE_CATEGORIES = ('miss', 'lpm')
+
+
+@contextlib.contextmanager
+def _open_text(path, chunk_size):
+    """Opens a csv file, or the first csv member of a tar.gz, as a text stream read chunk_size bytes at a time"""
+    with contextlib.ExitStack() as stack:
+        if str(path).endswith('gz'):
+            # Members are iterated lazily, only the headers up to the csv member are read
+            tar = stack.enter_context(tarfile.open(name=path, mode='r:gz'))
+            member = next(m for m in tar if m.name.endswith('.csv'))
+            raw = io.BufferedReader(tar.extractfile(member), chunk_size)
+        else:
+            raw = stack.enter_context(open(path, 'rb', buffering=chunk_size))
+        yield io.TextIOWrapper(raw, encoding='utf-8', newline='')
+
+
+def read_csv(path, ndn_encoded: bool, chunk_size=READ_CHUNK_SIZE):
+    """
+    Streams the entries of a dataset file, a csv or the first csv member of a tar.gz, without reading it whole: the file
+    is read and decompressed chunk_size bytes at a time and parsed row by row.
+    :param path: the dataset file
+    :param ndn_encoded: if True, yield NDN-encoded names, otherwise the lower-cased text
+    :param chunk_size: number of bytes read from the file at once
+    :return: a generator of (key, value) pairs, as expected by the backends. The hosting AS names are shared between
+    entries and must not be modified
+    """
+    with _open_text(path, chunk_size) as fh:
+        hosting_ases = {}
+        for line in csv.reader(fh):
+            k = str(line[0]).lower()
+            logging.debug('[READ] {} -> {}'.format(k, line[1:]))
+            if not ndn_encoded:
+                yield k, line[1:]
+                continue
+            v = []
+            for i in line[1:]:
+                name = hosting_ases.get(i)
+                if name is None:
+                    name = hosting_ases[i] = enc.Name.from_str(i)
+                v.append(name)
+            yield enc.Name.from_str(k), v
+
+
+@contextlib.contextmanager
+def _gc_paused():
+    """Pauses the cyclic garbage collector while building many acyclic objects, its passes would find nothing"""
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def encode_lines(lines, ndn_encoded: bool) -> tuple:
+    """
+    Encodes csv lines into a fragment of dataset columns. Runs in the encoding workers, so it only returns flat
+    buffers, cheap to send back to the main process.
+    :param lines: csv lines, rows must not span two chunks of lines
+    :param ndn_encoded: if True, the key parts are NDN-encoded components, otherwise the lower-cased utf-8 names
+    :return: (keys, key_offsets, key_start, value_names, value_refs, value_start) where keys holds the key parts,
+    key_offsets where each part ends, key_start where each entry ends in key_offsets, value_names the distinct hosting
+    ASes of the fragment as text, value_refs the indexes of the hosting ASes of the entries in value_names, and
+    value_start where each entry ends in value_refs
+    """
+    keys = bytearray()
+    key_offsets = array('I')
+    key_start = array('I')
+    value_ids = {}
+    value_refs = array('I')
+    value_start = array('I')
+    for line in csv.reader(lines):
+        k = str(line[0]).lower()
+        if ndn_encoded:
+            for c in enc.Name.from_str(k):
+                keys += c
+                key_offsets.append(len(keys))
+        else:
+            keys += k.encode('utf-8')
+            key_offsets.append(len(keys))
+        key_start.append(len(key_offsets))
+        for i in line[1:]:
+            value_refs.append(value_ids.setdefault(i, len(value_ids)))
+        value_start.append(len(value_refs))
+    return bytes(keys), key_offsets, key_start, list(value_ids), value_refs, value_start
+
+
+def encode_csv(path, ndn_encoded: bool, workers=1, chunk_size=ENCODE_CHUNK_SIZE):
+    """
+    Splits a dataset file into chunks of lines and encodes them with encode_lines(), across a pool of worker processes
+    if workers is more than 1. At most two chunks per worker are in flight, so the file is never held whole.
+    :param path: the dataset file, a csv or a tar.gz
+    :param ndn_encoded: if True, NDN-encode the keys
+    :param workers: number of worker processes, 1 encodes in the calling process
+    :param chunk_size: bytes of csv lines per chunk
+    :return: a generator of the fragments returned by encode_lines(), in the order of the file
+    """
+    with _open_text(path, READ_CHUNK_SIZE) as fh:
+        chunks = iter(lambda: fh.readlines(chunk_size), [])
+        if workers <= 1:
+            for chunk in chunks:
+                yield encode_lines(chunk, ndn_encoded)
+            return
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            pending = collections.deque()
+            for chunk in chunks:
+                pending.append(executor.submit(encode_lines, chunk, ndn_encoded))
+                if len(pending) >= 2 * workers:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+
 
 class Dataset:
     """
     A class used to represent a dataset. A dataset is a two column dictionary where the key is the publisher's name and
     the value is the corresponding autonomous numbers, i.e. k:'/om/edu/squ', v:'/AS1,/AS2,/AS9'.
 
+    Entries are stored in columns rather than as Python objects. The keys are one bytes buffer with one offsets array
+    per key part: a part is an NDN-encoded component for named datasets, or the whole utf-8 name for text datasets.
+    Values are dictionary encoded, each entry references the distinct hosting AS names, which are decoded once. The
+    columns can be saved to a file and mapped back with open(), in which case nothing is read before it is accessed.
+
     Attributes
     ----------
     name : str
@@ -35,33 +176,133 @@ class Dataset:
     path : str
         The path to a dataset file on disk.
 
+    workers : int
+        The number of processes encoding the dataset file when it is read, see encode_csv().
+
+    The dataset is mapped from columns_path if given, unless rebuild is True, or rebuild is None and the file is older
+    than the dataset file. Otherwise it is read from the dataset file and saved to columns_path.
+
     Methods
     -------
+    items()
+        Returns a generator for the key-value pairs, NDN-encoded or text, as expected by the backends
     get()
-        Returns the dataset in dictionary format
+        Returns a generator for the decoded key-value pairs
     """
 
-    def __init__(self, name: str, ndn_encoded: bool, dataset_path_on_disk: str):
-        self.content = dict()
+    def __init__(self, name: str, ndn_encoded: bool, dataset_path_on_disk: str, columns_path=None, workers=1,
+                 rebuild=None):
         self.name = name + '_named' if ndn_encoded else name + '_text'
+        self.workers = workers
         self.ndn_encoded = ndn_encoded
         self.path = dataset_path_on_disk
         self.gz = True if str(self.path).endswith('gz') else False
         self.open_mode = 'r:gz' if self.gz else 'r'
-        self.read_from_disk()
+        self._mm = None
+        self._start = 0
+        if rebuild is None:
+            rebuild = columns_path is None or not os.path.exists(columns_path) or \
+                os.path.getmtime(columns_path) < os.path.getmtime(self.path)
+        if not rebuild:
+            self.open(columns_path)
+        else:
+            self.read_from_disk()
+            if columns_path is not None:
+                self.save(columns_path)
+                self.open(columns_path)
 
     def __len__(self):
-        return len(self.content)
+        return self._stop - self._start
+
+    # region Columns
+    def _set_columns(self, key_offsets, key_start, keys, sorted_index, value_start, value_refs, value_offsets, values):
+        self._key_offsets = key_offsets
+        self._key_start = key_start
+        self._keys = keys
+        self._sorted_index = sorted_index
+        self._value_start = value_start
+        self._value_refs = value_refs
+        self._value_offsets = value_offsets
+        self._values_blob = values
+        self._key_index_cache = None
+        if self.ndn_encoded:
+            self._values = [[bytes(c) for c in enc.Name.from_bytes(values[value_offsets[i]:value_offsets[i + 1]])]
+                            for i in range(len(value_offsets) - 1)]
+        else:
+            self._values = [str(values[value_offsets[i]:value_offsets[i + 1]], 'utf-8')
+                            for i in range(len(value_offsets) - 1)]
+        self._stop = len(key_start) - 1
+
+    def save(self, path):
+        """Writes the columns of the dataset to path, to be mapped with open(). The file is replaced atomically"""
+        tmp_path = str(path) + '.tmp'
+        with open(tmp_path, 'wb') as fh:
+            fh.write(COLUMNS_HEADER.pack(COLUMNS_MAGIC, 1 if sys.byteorder == 'little' else 2, int(self.ndn_encoded),
+                                         len(self._key_start) - 1, len(self._key_offsets) - 1, len(self._keys),
+                                         len(self._value_refs), len(self._value_offsets) - 1, len(self._values_blob)))
+            for a in (self._key_offsets, self._key_start, self._sorted_index, self._value_start, self._value_refs,
+                      self._value_offsets):
+                fh.write(a)
+            fh.write(self._keys)
+            fh.write(self._values_blob)
+        os.replace(tmp_path, path)
+
+    def open(self, path):
+        """Maps the columns written by save(), replacing the content of the dataset"""
+        with open(path, 'rb') as fh:
+            self._mm = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, byte_order, ndn_encoded, n_entries, n_key_parts, keys_len, n_refs, n_values,
+         values_len) = COLUMNS_HEADER.unpack_from(self._mm)
+        if magic != COLUMNS_MAGIC or byte_order != (1 if sys.byteorder == 'little' else 2) or \
+                ndn_encoded != int(self.ndn_encoded):
+            raise ValueError('{} is not a {} columns file of this platform'.format(path, self.name))
+        view = memoryview(self._mm)
+        offset = COLUMNS_HEADER.size
+        sections = []
+        for count in (n_key_parts + 1, n_entries + 1, n_entries, n_entries + 1, n_refs, n_values + 1):
+            sections.append(view[offset:offset + 4 * count].cast('I'))
+            offset += 4 * count
+        keys = view[offset:offset + keys_len]
+        values = view[offset + keys_len:offset + keys_len + values_len]
+        self._set_columns(sections[0], sections[1], keys, sections[2], sections[3], sections[4], sections[5], values)
+        logging.info('Mapped the {} entries of {} from {}'.format(n_entries, self.name, path))
+
+    def slice(self, start, stop):
+        """Returns a dataset sharing the columns of this one, restricted to the entries start to stop"""
+        view = object.__new__(Dataset)
+        view.__dict__.update(self.__dict__)
+        view._start = self._start + start
+        view._stop = min(self._start + stop, self._stop)
+        return view
+
+    def key(self, i):
+        """Returns the key of entry i, a list of NDN-encoded components or a string"""
+        offsets = self._key_offsets
+        keys = self._keys
+        lo, hi = self._key_start[i], self._key_start[i + 1]
+        if self.ndn_encoded:
+            return [bytes(keys[offsets[j]:offsets[j + 1]]) for j in range(lo, hi)]
+        return str(keys[offsets[lo]:offsets[hi]], 'utf-8')
+
+    def value(self, i):
+        """Returns a new list holding the hosting ASes of entry i"""
+        values = self._values
+        return [values[r] for r in self._value_refs[self._value_start[i]:self._value_start[i + 1]]]
+
+    def _key_bytes(self, i):
+        offsets = self._key_offsets
+        return bytes(self._keys[offsets[self._key_start[i]]:offsets[self._key_start[i + 1]]])
+    # endregion Columns
 
     def items(self):
-        for k, v in self.content.items():
-            yield k, v
+        key = self.key
+        value = self.value
+        for i in range(self._start, self._stop):
+            yield key(i), value(i)
 
     def get(self):
-        """ Returns a generator for unpickled/decoded key-value pairs"""
-        for k, v in self.content.items():
-            k = pickle.loads(k)
-            v = pickle.loads(v)
+        """ Returns a generator for decoded key-value pairs"""
+        for k, v in self.items():
             if self.ndn_encoded:
                 k_decoded = enc.Name.to_str(k)
                 v_decoded = []
@@ -72,96 +313,85 @@ class Dataset:
                 yield k, v
 
     def to_dict(self):
-        """Returns the dataset in dictionary format"""
-        return self.content
+        """Returns the dataset in dictionary format, keys and values decoded"""
+        return self.build_ds()
 
     def read_from_disk(self):
         """Force reading the dataset file from disk. This method is able to read either a csv or a csv compressed with
-        tar.gz """
-        # Reading from a compressed file
-        if self.gz:
-            dicts = []
-            with tarfile.open(name=self.path, mode=self.open_mode) as tar:
-                members = tar.getmembers()
-                for m in members:
-                    if m.name.endswith('.csv'):
-                        temp_dict = {}
-                        f = tar.extractfile(m)
-                        content = f.read()
-                        lines = csv.reader(str(content, 'utf-8').splitlines())
-                        for line in lines:
-                            k = str(line[0]).lower()
-                            v = line[1:]
-                            logging.debug('[READ] {} -> {}'.format(k, v))
-                            if self.ndn_encoded:
-                                # Encode
-                                k_encoded = enc.Name.from_str(k)
-                                v_encoded = list()
-                                for i in v:
-                                    v_encoded.append(enc.Name.from_str(i))
-                                logging.debug('[ENCODE] {} -> {}'.format(k_encoded, v_encoded))
-
-                                # Pickle
-                                k_pickled = pickle.dumps(k_encoded)
-                                v_pickled = pickle.dumps(v_encoded)
-                                logging.debug('[PICKLE] {} -> {}'.format(k_pickled, v_pickled))
-                                temp_dict[k_pickled] = v_pickled
-                            else:
-                                k_pickled = pickle.dumps(k)
-                                v_pickled = pickle.dumps(v)
-                                logging.debug('[PICKLE] {} -> {}'.format(k_pickled, v_pickled))
-                                temp_dict[k_pickled] = v_pickled
-                        dicts.append(temp_dict)
-            self.content = dicts[0]
-
-        # Reading a normal csv file
-        else:
-            entries_dict = {}
-            with open(file=self.path, mode=self.open_mode) as fh:
-                # reading the CSV file
-                lines = csv.reader(fh)
-                # displaying the contents of the CSV file
-                for line in lines:
-                    k = str(line[0]).lower()
-                    v = line[1:]
-                    logging.debug('[READ] {} -> {}'.format(k, v))
-                    if self.ndn_encoded:
-                        # Encode
-                        k_encoded = enc.Name.from_str(k)
-                        v_encoded = list()
-                        for i in v:
-                            v_encoded.append(enc.Name.from_str(i))
-                        logging.debug('[ENCODE] {} -> {}'.format(k_encoded, v_encoded))
-
-                        # Pickle
-                        k_pickled = pickle.dumps(k_encoded)
-                        v_pickled = pickle.dumps(v_encoded)
-                        logging.debug('[PICKLE] {} -> {}'.format(k_pickled, v_pickled))
-                        entries_dict[k_pickled] = v_pickled
-                    else:
-                        # Pickle
-                        k_pickled = pickle.dumps(k)
-                        v_pickled = pickle.dumps(v)
-                        logging.debug('[PICKLE] {} -> {}'.format(k_pickled, v_pickled))
-                        entries_dict[k_pickled] = v_pickled
-
-            self.content = entries_dict
-
-    def unpickle(self):
-        """Returns unpi"""
-        for k, v in self.content.items():
-            yield pickle.loads(k), pickle.loads(v)
+        tar.gz. The file is streamed and encoded by self.workers processes, only the columns are held in memory"""
+        start_time = time.time()
+        self._read_fragments(encode_csv(self.path, self.ndn_encoded, self.workers))
+        logging.info('Read the {} entries of {} with {} workers in {} s'
+                     .format(len(self), self.name, self.workers, time.time() - start_time))
+
+    def _read_fragments(self, fragments):
+        """Builds the columns from the fragments returned by encode_lines(), appended in order"""
+        key_offsets = array('I', [0])
+        key_start = array('I', [0])
+        keys = bytearray()
+        value_start = array('I', [0])
+        value_refs = array('I')
+        value_ids = {}
+        for f_keys, f_key_offsets, f_key_start, f_value_names, f_value_refs, f_value_start in fragments:
+            keys_base = len(keys)
+            parts_base = len(key_offsets) - 1
+            refs_base = len(value_refs)
+            keys += f_keys
+            key_offsets.extend(o + keys_base for o in f_key_offsets)
+            key_start.extend(i + parts_base for i in f_key_start)
+            ids = [value_ids.setdefault(name, len(value_ids)) for name in f_value_names]
+            value_refs.extend(ids[r] for r in f_value_refs)
+            value_start.extend(i + refs_base for i in f_value_start)
+
+        value_offsets = array('I', [0])
+        values = bytearray()
+        for i in value_ids:
+            values += enc.Name.to_bytes(enc.Name.from_str(i)) if self.ndn_encoded else i.encode('utf-8')
+            value_offsets.append(len(values))
+
+        self._set_columns(key_offsets, key_start, bytes(keys), None, value_start, value_refs, value_offsets,
+                          bytes(values))
+        self._sort_keys()
+
+    def _sort_keys(self):
+        """
+        Builds the sorted index used by find(). Entries whose key appears again later are dropped, so the last value
+        wins
+        """
+        sort_keys = [self._key_bytes(i) for i in range(len(self))]
+        sorted_index = sorted(range(len(self)), key=sort_keys.__getitem__)
+        duplicates = set()
+        for j in range(1, len(sorted_index)):
+            if sort_keys[sorted_index[j]] == sort_keys[sorted_index[j - 1]]:
+                duplicates.add(min(sorted_index[j], sorted_index[j - 1]))
+        self._sorted_index = array('I', sorted_index)
+        if duplicates:
+            logging.warning('{} keys of {} appear more than once, keeping their last value'
+                            .format(len(duplicates), self.name))
+            self._keep(i for i in range(len(self)) if i not in duplicates)
+            self._sort_keys()
+
+    def _keep(self, indexes):
+        """Rebuilds the columns with the entries of indexes only, in that order"""
+        offsets, start, refs, value_start_of = self._key_offsets, self._key_start, self._value_refs, self._value_start
+        key_offsets = array('I', [0])
+        key_start = array('I', [0])
+        keys = bytearray()
+        value_start = array('I', [0])
+        value_refs = array('I')
+        for i in indexes:
+            lo, hi = start[i], start[i + 1]
+            keys_base = len(keys) - offsets[lo]
+            keys += self._keys[offsets[lo]:offsets[hi]]
+            key_offsets.extend(offsets[j] + keys_base for j in range(lo + 1, hi + 1))
+            key_start.append(len(key_offsets) - 1)
+            value_refs.extend(refs[value_start_of[i]:value_start_of[i + 1]])
+            value_start.append(len(value_refs))
+        self._set_columns(key_offsets, key_start, bytes(keys), None, value_start, value_refs, self._value_offsets,
+                          self._values_blob)
 
     def decode(self):
-        for k, v in self.unpickle():
-            if self.ndn_encoded:
-                k_decoded = enc.Name.to_str(k)
-                v_decoded = list()
-                for i in v:
-                    v_decoded.append(enc.Name.to_str(i))
-                yield k_decoded, v_decoded
-            else:
-                yield k, v
+        return self.get()
 
     def build_ds(self):
         dicto = dict()
@@ -169,48 +399,76 @@ class Dataset:
             dicto[k] = v
         return dicto
 
-    def get_keys(self, count=None, unpickle=True, decode=False):
+    # region Sampling
+    def sample(self, count, replace=False, seed=None):
+        """
+        Draws random entries of the dataset.
+        :param count: the number of entries, at most len(self) without replacement
+        :param replace: if True, an entry may be drawn more than once
+        :param seed: seeds the generator, the same seed draws the same entries
+        :return: a numpy array of entry indexes, as expected by keys()
+        """
+        rng = np.random.default_rng(seed)
+        if replace:
+            return rng.integers(self._start, self._stop, count)
+        return rng.choice(len(self), min(count, len(self)), replace=False) + self._start
+
+    def keys(self, indexes) -> list:
+        """
+        Returns the keys of the entries of indexes, like key() but built at once: the bounds of all the keys are
+        gathered with numpy and only the final slicing runs in Python
+        """
+        blob, key_offsets, key_start = self._key_index()
+        indexes = np.asarray(indexes, dtype=np.int64)
+        lo = key_start[indexes]
+        hi = key_start[indexes + 1]
+        with _gc_paused():
+            if not self.ndn_encoded:
+                return [str(blob[a:b], 'utf-8') for a, b in zip(key_offsets[lo].tolist(), key_offsets[hi].tolist())]
+            counts = hi - lo
+            bounds = np.zeros(len(indexes) + 1, dtype=np.int64)
+            np.cumsum(counts, out=bounds[1:])
+            parts = np.arange(bounds[-1], dtype=np.int64) - np.repeat(bounds[:-1] - lo, counts)
+            components = [blob[a:b] for a, b in zip(key_offsets[parts].tolist(), key_offsets[parts + 1].tolist())]
+            bounds = bounds.tolist()
+            return [components[a:b] for a, b in zip(bounds, bounds[1:])]
+
+    def _key_index(self):
+        """
+        Returns the keys as bytes and their offsets as numpy arrays, built on first use and kept. The keys are copied
+        out of the columns file once, slicing bytes is cheaper than slicing the map
+        """
+        if self._key_index_cache is None:
+            self._key_index_cache = (bytes(self._keys),
+                                     np.frombuffer(self._key_offsets, dtype=np.uint32).astype(np.int64),
+                                     np.frombuffer(self._key_start, dtype=np.uint32).astype(np.int64))
+        return self._key_index_cache
+    # endregion Sampling
+
+    def get_keys(self, count=None, decode=False, seed=None):
+        """
+        Returns a generator of keys, all of them in order if count is None, otherwise count distinct random keys
+        :param seed: seeds the draw of the keys, see sample()
+        """
         if not self.ndn_encoded and decode:
             decode = False
-        keys = list(self.content.keys())
-        if count is None:
-            for k in keys:
-                if decode:
-                    yield enc.Name.to_str(pickle.loads(k))
-                else:
-                    if unpickle:
-                        yield pickle.loads(k)
-                    else:
-                        yield k
-        else:
-            for i in range(count):
-                k = random.choice(keys)
-                keys.remove(k)
-                if decode:
-                    yield enc.Name.to_str(pickle.loads(k))
-                else:
-                    if unpickle:
-                        yield pickle.loads(k)
-                    else:
-                        yield k
-
-    def choice(self, count=1, scope='from_dataset', encoded=False):
+        indexes = np.arange(self._start, self._stop) if count is None else self.sample(count, seed=seed)
+        for k in self.keys(indexes):
+            yield enc.Name.to_str(k) if decode else k
+
+    def choice(self, count=1, scope='from_dataset', encoded=False, seed=None):
         """
-        Returns an X-amount of random elements from the dataset.
-        Elements will be unpickled before sending them back to the caller. Hence, returned elements will be either in
-        utf or NDN-named based on the dataset this function is called from
+        Returns an X-amount of random elements from the dataset, drawn with replacement.
+        Returned elements will be either in utf or NDN-named based on the dataset this function is called from.
+        Elements of the 'outside_dataset' scope are not checked against the dataset, see negative_names()
         """
         results = []
         if scope == 'from_dataset':
-            for i in range(count):
-                key = random.choice(list(self.content.keys()))
-                key_unpickled = pickle.loads(key)
-                results.append(key_unpickled)
-                # yield key_unpickled
+            results = self.keys(self.sample(count, replace=True, seed=seed))
         elif scope == 'outside_dataset':
-            unpickled_keys = self.choice(count, 'from_dataset')
+            keys = self.choice(count, 'from_dataset', seed=seed)
             results = list()
-            for key in unpickled_keys:
+            for key in keys if count > 1 else [keys]:
                 # Decode key if it is NDN-encoded
                 if self.ndn_encoded:
                     key = enc.Name.to_str(key)
@@ -222,7 +480,6 @@ class Dataset:
                 for new_name in modifications:
                     for i in new_name:
                         results.append(enc.Name.from_str(i) if self.ndn_encoded else i)
-                        # yield enc.Name.from_str(i) if self.ndn_encoded else i
 
         if encoded:
             encoded_results = []
@@ -231,19 +488,62 @@ class Dataset:
             return encoded_results[0] if count == 1 else encoded_results
         return results[0] if count == 1 else results
 
-    def find(self, entry_key):
-        pickled_key = pickle.dumps(entry_key)
-        return pickle.loads(self.content[pickled_key])
+    def negative_names(self, count, seed=None) -> dict:
+        """
+        Generates names absent from the dataset by editing random keys like choice('outside_dataset') does. Every name
+        is checked against all the keys and sorted into the categories of NEGATIVE_CATEGORIES. At most one name of each
+        category is kept per key, so the names are spread over the dataset.
+        :param count: the number of names of each category, fewer if the dataset cannot provide them
+        :param seed: seeds the draw of the keys
+        :return: a dict of category to a list of text names
+        """
+        decode = enc.Name.to_str if self.ndn_encoded else str
+        present = set(map(decode, self.keys(np.arange(self._start, self._stop))))
+        rng = random.Random(seed)
+        # Dicts keep the names in order of generation, without duplicates
+        pools = {category: {} for category in NEGATIVE_CATEGORIES}
+        for i in self.sample(len(self), seed=seed).tolist():
+            if all(len(pool) >= count for pool in pools.values()):
+                break
+            key = decode(self.key(i))
+            candidates = insert_component_prefix(key) + insert_component_suffix(key) + \
+                [insert_component_suffix_component(key)]
+            rng.shuffle(candidates)
+            found = set()
+            for name in candidates:
+                category = self._negative_category(name, present)
+                if category is None or category in found or len(pools[category]) >= count or name in pools[category]:
+                    continue
+                pools[category][name] = None
+                found.add(category)
+        return {category: list(pool) for category, pool in pools.items()}
+
+    @staticmethod
+    def _negative_category(name, present):
+        """Returns the category of a text name given the set of the keys, None if it is a key"""
+        if name in present:
+            return None
+        parts = name.split('/')
+        for j in range(len(parts) - 1, 1, -1):
+            if '/'.join(parts[:j]) in present:
+                return 'lpm'
+        return 'miss'
 
-    def subset(self, size):
+    def find(self, entry_key):
+        """Returns the value of entry_key, found by binary search over the keys. Raises KeyError if it is missing"""
+        target = b''.join(entry_key) if self.ndn_encoded else entry_key.encode('utf-8')
+        sorted_index = self._sorted_index
+        j = bisect.bisect_left(sorted_index, target, key=self._key_bytes)
+        if j == len(sorted_index) or self._key_bytes(sorted_index[j]) != target or \
+                not self._start <= sorted_index[j] < self._stop:
+            raise KeyError(entry_key)
+        return self.value(sorted_index[j])
+
+    def subset(self, size, seed=None):
+        """Returns the indexes of size distinct random entries, see sample()"""
         start_time = time.time()
-        items = list(self.content.items())
-        subset = dict()
-        while len(subset) < size:
-            key, value = random.choice(items)
-            subset[key] = value
-        end_time = time.time()
-        duration = end_time - start_time
+        subset = self.sample(size, seed=seed).tolist()
+        duration = time.time() - start_time
         logging.info('Generated a size {} subset of the dataset {} in {} s'.format(size, self.name, duration))
         return subset
 
@@ -265,39 +565,36 @@ class Dataset:
             (Keys,Values)
         """
         # Get subset
-        if size >= len(self.content):
-            ss = self.content
-        else:
-            ss = self.subset(size)
+        ss = self.subset(size)
 
-        # Unpickle the subset and add the prefix, also, shuffle the values before storing them
+        # Add the prefix, also, shuffle the values before storing them
         start_time = time.time()
 
         if self.ndn_encoded:
             # if dataset is named based
             ks = []
             vs = []
-            for k, v in ss.items():
-                nk = pickle.loads(k)
-                nv = pickle.loads(v)
+            for i in ss:
+                nk = self.key(i)
+                nv = self.value(i)
                 nk.insert(0, enc.Name.from_str(domain_prefix_to_add)[0])
                 random.shuffle(nv)
                 ks.append(nk)
                 vs.append(nv)
             end_time = time.time()
             duration = end_time - start_time
-            logging.info('The {} items subset was unpickled/prefixed/shuffled/scissored in {} s'.format(size, duration))
+            logging.info('The {} items subset was prefixed/shuffled/scissored in {} s'.format(size, duration))
             return ks, vs
         else:
             # if dataset is utf based
             uss = dict()
-            for k, v in ss.items():
-                nv = pickle.loads(v)
+            for i in ss:
+                nv = self.value(i)
                 random.shuffle(nv)
-                uss[domain_prefix_to_add + pickle.loads(k)] = nv
+                uss[domain_prefix_to_add + self.key(i)] = nv
             end_time = time.time()
             duration = end_time - start_time
-            logging.info('The {} items subset was unpickled/prefixed/shuffled in {} s'.format(size, duration))
+            logging.info('The {} items subset was prefixed/shuffled in {} s'.format(size, duration))
 
             # Split the previous subset into two lists: keys and values and then return them
             ks = []
@@ -313,4 +610,3 @@ class Dataset:
             duration = end_time - start_time
             logging.info('The {} items subset was scissored in {} s'.format(size, duration))
             return ks, vs
-
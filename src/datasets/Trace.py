@@ -0,0 +1,184 @@
+import logging
+import mmap
+import struct
+import time
+
+import numpy as np
+
+# region logging
+logging.basicConfig(format='{asctime} {levelname} [{filename}:{lineno}] {message}',
+                    datefmt='%Y-%m-%d %H:%M:%S',
+                    level=logging.INFO,
+                    style='{')
+# endregion logging
+
+# Trace file header: magic, dataset name, Zipf exponent, arrival rate per second (0 for closed loop), seed (-1 for
+# none) and number of queries. The queries follow as RECORD_DTYPE records
+TRACE_MAGIC = b'PNPTR001'
+TRACE_HEADER = struct.Struct('=8s32sddqQ')
+# Arrival time in ns since the start of the trace, index of the kind in KINDS, rank of the name in its source
+RECORD_DTYPE = np.dtype([('time_ns', '<u8'), ('kind', 'u1'), ('index', '<u4')])
+
+# Kinds of queries, named after the resolving journals of BEABC. Positive names are keys of the dataset, LPM positive
+# ones with an extra component, negative names come from the 'miss' pool of DSM.get_negative()
+KINDS = ('get_positive', 'get_negative', 'lpm_positive', 'lpm_negative')
+DEFAULT_MIX = {'get_positive': 0.5, 'get_negative': 0.1, 'lpm_positive': 0.3, 'lpm_negative': 0.1}
+# Seconds before the arrival time of a query during which an open-loop replay spins instead of sleeping
+SPIN_WAIT = 0.001
+
+
+def zipf_ranks(rng, n, exponent, count):
+    """
+    Draws ranks from a Zipf distribution bounded to n items: rank r, from 0, is drawn with a probability proportional
+    to 1 / (r + 1) ** exponent. An exponent of 0 draws uniformly, the Majestic list is close to 1.
+    :param rng: a numpy Generator
+    :return: a numpy array of count ranks
+    """
+    if exponent == 0:
+        return rng.integers(0, n, count)
+    cdf = np.cumsum(1.0 / np.arange(1, n + 1, dtype=np.float64) ** exponent)
+    cdf /= cdf[-1]
+    return np.minimum(np.searchsorted(cdf, rng.random(count), side='right'), n - 1)
+
+
+class Trace:
+    """
+    A stream of queries against a dataset, skewed by popularity: the datasets list publishers by rank, so the rank of
+    an entry is its index and the most popular names are drawn the most often. Queries are a mix of the KINDS and may
+    carry Poisson arrival times for an open-loop replay.
+
+    A trace only stores the kind and rank of each query, 13 bytes, and is resolved into names against the datasets of a
+    DSM. It can be saved and mapped back, so that every backend replays the same queries.
+
+    Attributes
+    ----------
+    ds_name : str
+        The dataset the queries are drawn from, i.e. '1m_named'.
+    zipf : float
+        The Zipf exponent of the popularity of the names.
+    rate : float
+        The mean number of queries per second of the arrival times, 0 if the trace has none and runs back to back.
+    records : numpy.ndarray
+        The queries, RECORD_DTYPE records.
+    """
+
+    def __init__(self, ds_name, records, zipf=0.0, rate=0.0, seed=None):
+        self.ds_name = ds_name
+        self.records = records
+        self.zipf = zipf
+        self.rate = rate
+        self.seed = seed
+        self._mm = None
+
+    def __len__(self):
+        return len(self.records)
+
+    @classmethod
+    def generate(cls, dsm, ds_name, count, zipf=1.0, mix=None, rate=0.0, seed=None):
+        """
+        Draws a trace of count queries.
+        :param dsm: an initialized dataset manager
+        :param ds_name: the dataset, i.e. '1m_named'
+        :param zipf: the Zipf exponent of the popularity of the names, applied to the negative pool as well
+        :param mix: a dict of kind to weight, DEFAULT_MIX if None
+        :param rate: the mean number of queries per second, 0 for no arrival times
+        :param seed: seeds the trace, the same seed draws the same trace
+        """
+        start_time = time.time()
+        mix = DEFAULT_MIX if mix is None else mix
+        unknown = set(mix) - set(KINDS)
+        if unknown:
+            raise ValueError('Unknown query kinds {}, expected some of {}'.format(sorted(unknown), KINDS))
+        weights = np.array([mix.get(kind, 0) for kind in KINDS], dtype=np.float64)
+        rng = np.random.default_rng(seed)
+        records = np.zeros(count, dtype=RECORD_DTYPE)
+        records['kind'] = rng.choice(len(KINDS), count, p=weights / weights.sum())
+        trace = cls(ds_name, records, zipf, rate, seed)
+        for k, kind in enumerate(KINDS):
+            selected = records['kind'] == k
+            records['index'][selected] = zipf_ranks(rng, len(trace._source(dsm, kind)), zipf, selected.sum())
+        if rate:
+            records['time_ns'] = np.cumsum(rng.exponential(1e9 / rate, count))
+        logging.info('Generated a trace of {} queries on {} with a Zipf exponent of {} in {} s'
+                     .format(count, ds_name, zipf, time.time() - start_time))
+        return trace
+
+    def _source(self, dsm, kind):
+        """Returns the dataset the names of a kind of queries are drawn from"""
+        if kind.endswith('_positive'):
+            return dsm.get_cache(self.ds_name)
+        return dsm.get_negative(self.ds_name, 'miss')
+
+    # region Files
+    def save(self, path):
+        """Writes the trace to path, to be mapped with open()"""
+        with open(path, 'wb') as fh:
+            fh.write(TRACE_HEADER.pack(TRACE_MAGIC, self.ds_name.encode('utf-8'), self.zipf, self.rate,
+                                       -1 if self.seed is None else self.seed, len(self.records)))
+            fh.write(self.records.tobytes())
+
+    @classmethod
+    def open(cls, path):
+        """Maps a trace written by save()"""
+        with open(path, 'rb') as fh:
+            mm = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, ds_name, zipf, rate, seed, count = TRACE_HEADER.unpack_from(mm)
+        if magic != TRACE_MAGIC:
+            raise ValueError('{} is not a trace file'.format(path))
+        records = np.frombuffer(mm, dtype=RECORD_DTYPE, count=count, offset=TRACE_HEADER.size)
+        trace = cls(ds_name.rstrip(b'\0').decode('utf-8'), records, zipf, rate, None if seed < 0 else seed)
+        trace._mm = mm
+        return trace
+    # endregion Files
+
+    def names(self, dsm) -> list:
+        """Returns the names of the queries in order, NDN-encoded or text like the dataset"""
+        names = [None] * len(self.records)
+        for k, kind in enumerate(KINDS):
+            where = np.flatnonzero(self.records['kind'] == k)
+            if not len(where):
+                continue
+            source = self._source(dsm, kind)
+            keys = source.keys(self.records['index'][where])
+            if kind == 'lpm_positive':
+                suffix = [b'\x08\x01x'] if source.ndn_encoded else '/x'
+                keys = [key + suffix for key in keys]
+            for i, key in zip(where.tolist(), keys):
+                names[i] = key
+        return names
+
+    def replay(self, algo, dsm, open_loop=False):
+        """
+        Resolves the queries with a backend and adds the time taken by each kind to its resolving journal, i.e.
+        algo.perf_get_positive.
+        :param algo: a loaded backend
+        :param dsm: the dataset manager the trace was generated with
+        :param open_loop: if True, every query waits for its arrival time and its latency is counted from it, so the
+        time spent queued behind slower queries is included. Otherwise the queries run back to back
+        :return: a numpy array of the latency of every query in seconds
+        """
+        names = self.names(dsm)
+        ops = [algo.lpm if kind.startswith('lpm') else algo.get for kind in KINDS]
+        kinds = self.records['kind'].tolist()
+        arrivals = (self.records['time_ns'] / 1e9).tolist()
+        latencies = np.empty(len(names), dtype=np.float64)
+        perf_counter = time.perf_counter
+        start = perf_counter()
+        for i, name in enumerate(names):
+            if open_loop:
+                scheduled = start + arrivals[i]
+                delay = scheduled - perf_counter()
+                # Sleeping may overshoot, the end of the wait spins so that it is not counted as latency
+                if delay > SPIN_WAIT:
+                    time.sleep(delay - SPIN_WAIT)
+                while perf_counter() < scheduled:
+                    pass
+            else:
+                scheduled = perf_counter()
+            ops[kinds[i]](name)
+            latencies[i] = perf_counter() - scheduled
+        for k, kind in enumerate(KINDS):
+            selected = self.records['kind'] == k
+            if selected.any():
+                getattr(algo, 'perf_' + kind).add(int(selected.sum()), float(latencies[selected].sum()))
+        return latencies
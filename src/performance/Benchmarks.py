@@ -0,0 +1,851 @@
+import csv
+import gc
+import itertools
+import logging
+import multiprocessing
+import os
+import random
+import statistics
+import string
+import tarfile
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from ndn import encoding as enc
+from Cryptodome.Hash import SHA256
+from Cryptodome.PublicKey import ECC
+from ndn.security import DigestSha256Signer, Sha256WithEcdsaSigner
+
+import Selector
+import performance.PerformanceManager as perf
+from Algo_ECHT import ECHTBE
+from BloomFilter import BloomFront
+from ComponentTable import table as component_table
+from OurModel import (GetLpmMessage, GetManyMessage, GetMessage, PnpDManyMessage, PnpDMessage, PnpIMessage,
+                      make_data_message)
+from ResultCache import ResultCache
+from Signing import SignedDataCache, get_signer
+from WriteAheadLog import OP_ADD, WriteAheadLog
+from datasets.DSManager import DSM
+from datasets.Dataset import NEGATIVE_CATEGORIES, Dataset, read_csv
+from datasets.Trace import KINDS, Trace
+from profiler import Profiler, sampling_interval
+from utils import deep_sizeof
+
+# Seeds the queries drawn from the datasets, so that runs resolve the same names
+QUERY_SEED = 1
+
+
+def layout_footprint(dsm: DSM, sizes: list) -> pd.DataFrame:
+    """
+    Loads each named dataset into ECHTBE and reports the memory used by the adaptive node layout next to the nested
+    dictionary layout returned by to_dict(). Both figures include the hosting AS lists, the adaptive one also includes
+    the shared ComponentTable.
+    :param dsm: an initialized dataset manager
+    :param sizes: dataset sizes to measure, i.e. ['1k', '10k', '100k', '1m']
+    :return: a dataframe with one row per dataset size
+    """
+    columns = ['Dataset', 'Entries', 'Total Nodes', 'Adaptive Bytes', 'Dict Bytes', 'Adaptive Bytes/Entry',
+               'Dict Bytes/Entry']
+    report = pd.DataFrame(columns=columns)
+    for size in sizes:
+        ds = dsm.get_cache(size + '_named')
+        algo = ECHTBE()
+        algo.load(ds)
+        # Release the components of the backends of the previous sizes
+        gc.collect()
+        component_table.collect()
+        start_time = time.time()
+        adaptive_bytes = algo.size(exact=True) + component_table.size(exact=True)
+        dict_bytes = deep_sizeof(algo.to_dict())
+        logging.info('Measured the {} layouts in {} s'.format(ds.name, time.time() - start_time))
+        report.loc[len(report)] = [ds.name, len(ds), algo.total_nodes, adaptive_bytes, dict_bytes,
+                                   adaptive_bytes / len(ds), dict_bytes / len(ds)]
+    return report
+
+
+def _sample_keys(ds, count):
+    """Returns count keys drawn from the dataset without replacement, the same ones on every run"""
+    return ds.keys(ds.sample(count, seed=QUERY_SEED))
+
+
+def _time_lookups(algo, queries) -> (float, float):
+    """Returns the durations of running get() then lpm() over all queries"""
+    start_time = time.time()
+    for q in queries:
+        algo.get(q)
+    get_duration = time.time() - start_time
+    start_time = time.time()
+    for q in queries:
+        algo.lpm(q)
+    return get_duration, time.time() - start_time
+
+
+def freeze_lookups(dsm: DSM, size: str, count: int) -> pd.DataFrame:
+    """
+    Compares the ECHTBE node trie with its frozen flat-array snapshot: build time, memory (shared ComponentTable
+    excluded) and the time taken by count positive GETs and count LPMs on names with an extra suffix component.
+    :param dsm: an initialized dataset manager
+    :param size: dataset size, i.e. '1m'
+    :param count: number of queries of each type
+    :return: a dataframe with one row per layout
+    """
+    columns = ['Dataset', 'Layout', 'Build Duration in s', 'Bytes', 'Queries', 'GET Duration in s',
+               'LPM Duration in s']
+    report = pd.DataFrame(columns=columns)
+    ds = dsm.get_cache(size + '_named')
+    algo = ECHTBE()
+    start_time = time.time()
+    algo.load(ds)
+    build_duration = time.time() - start_time
+    queries = _sample_keys(ds, count)
+    lpm_queries = [q + [b'\x08\x01x'] for q in queries]
+    get_duration, _ = _time_lookups(algo, queries)
+    _, lpm_duration = _time_lookups(algo, lpm_queries)
+    report.loc[len(report)] = [ds.name, 'Trie', build_duration, algo.size(exact=True), len(queries),
+                               get_duration, lpm_duration]
+
+    start_time = time.time()
+    algo.freeze()
+    build_duration = time.time() - start_time
+    get_duration, _ = _time_lookups(algo, queries)
+    _, lpm_duration = _time_lookups(algo, lpm_queries)
+    report.loc[len(report)] = [ds.name, 'Frozen', build_duration, algo.size(exact=True), len(queries),
+                               get_duration, lpm_duration]
+    return report
+
+
+def bulk_load(dsm: DSM, size: str, batch_size: int) -> pd.DataFrame:
+    """
+    Batch loads a named dataset into ECHTBE twice, once with one add() per entry and once with add_many(), and returns
+    both load journals. The shared ComponentTable is warmed up by the first run, so the comparison is slightly in
+    favour of add_many().
+    :param dsm: an initialized dataset manager
+    :param size: dataset size, i.e. '1m'
+    :param batch_size: number of entries per batch
+    :return: the LoadLogs journals of both runs, concatenated
+    """
+    ds = dsm.get_cache(size + '_named')
+    journals = []
+    for bulk in (False, True):
+        algo = ECHTBE()
+        algo.batch_load(ds, batch_size, bulk)
+        journals.append(algo.load_performance.get())
+        logging.info('Loaded {} with {} in {} s'.format(ds.name, 'add_many' if bulk else 'add',
+                                                        algo.load_performance.get()['Batch Duration in s'].sum()))
+    return pd.concat(journals, ignore_index=True)
+
+
+def _round_trip(algo, queries, batch_size, signer) -> int:
+    """
+    Runs the pnpc -> pnps -> pnpc path of every query without NFD: encode the Interest parameters, parse them, resolve,
+    encode the reply and sign it into a Data packet, then parse the reply. batch_size 1 uses a GetMessage per name.
+    :return: the number of Data packets produced
+    """
+    data_name = enc.Name.from_str('/AS1/PNPS')
+    packets = 0
+    for i in range(0, len(queries), batch_size):
+        names = queries[i:i + batch_size]
+        o_msg = PnpIMessage()
+        if batch_size == 1:
+            o_msg.get_message = GetMessage()
+            o_msg.get_message.publisher_name = names[0]
+        else:
+            o_msg.getmany_message = GetManyMessage()
+            o_msg.getmany_message.publisher_names = names
+        msg = PnpIMessage.parse(o_msg.encode())
+        if msg.get_message is not None:
+            entry_key = [c.tobytes() for c in msg.get_message.publisher_name]
+            data_packet = make_data_message(entry_key, algo.get(entry_key))
+        else:
+            entry_keys = [[c.tobytes() for c in name] for name in msg.getmany_message.publisher_names]
+            data_packet = PnpDManyMessage()
+            data_packet.results = [make_data_message(k, v) for k, v in zip(entry_keys, algo.get_many(entry_keys))]
+        _, _, content, _ = enc.parse_data(enc.make_data(data_name, enc.MetaInfo(freshness_period=10000),
+                                                        data_packet.encode(), signer))
+        if batch_size == 1:
+            PnpDMessage.parse(content)
+        else:
+            PnpDManyMessage.parse(content)
+        packets += 1
+    return packets
+
+
+def batched_queries(dsm: DSM, size: str, count: int, batch_sizes: list) -> pd.DataFrame:
+    """
+    Times count positive GETs on the wire path for each batch size: 1 sends one GetMessage per name, larger sizes send
+    GetManyMessages answered by a single Data packet. Data packets are signed with DigestSha256.
+    :param dsm: an initialized dataset manager
+    :param size: dataset size, i.e. '1m'
+    :param count: number of names to resolve per batch size
+    :param batch_sizes: number of names per Interest, i.e. [1, 10, 50]
+    :return: a dataframe with one row per batch size
+    """
+    columns = ['Dataset', 'Batch Size', 'Names', 'Data Packets', 'Duration in s', 'Names/s']
+    report = pd.DataFrame(columns=columns)
+    ds = dsm.get_cache(size + '_named')
+    algo = ECHTBE()
+    algo.load(ds)
+    queries = _sample_keys(ds, count)
+    signer = DigestSha256Signer()
+    for batch_size in batch_sizes:
+        start_time = time.time()
+        packets = _round_trip(algo, queries, batch_size, signer)
+        duration = time.time() - start_time
+        report.loc[len(report)] = [ds.name, batch_size, len(queries), packets, duration, len(queries) / duration]
+    return report
+
+
+def churn(dsm: DSM, size: str, operations: int, window: int) -> pd.DataFrame:
+    """
+    Runs random add/remove/set operations over the names of a loaded dataset and reports the throughput, the backend
+    estimated size, its total nodes and the process RSS every window operations. Each operation picks a random name:
+    remove (20%) deletes it, add (60%) puts its original hosting ASes back and set (20%) replaces them with a random AS.
+    The number of live names converges to 80% of the dataset, where memory should stay flat.
+    :param dsm: an initialized dataset manager
+    :param size: dataset size, i.e. '1m'
+    :param operations: total number of operations
+    :param window: number of operations per report row
+    :return: a dataframe with one row per window
+    """
+    import psutil
+
+    columns = ['Dataset', 'Operations', 'Live Names', 'Ops/s', 'Total Nodes', 'Estimated Bytes', 'RSS MB']
+    report = pd.DataFrame(columns=columns)
+    process = psutil.Process()
+    ds = dsm.get_cache(size + '_named')
+    algo = ECHTBE()
+    algo.load(ds)
+    entries = list(ds.items())
+    hosting_ases = [enc.Name.from_str('/AS{}'.format(i)) for i in range(1000)]
+    live = [True] * len(entries)
+    live_names = len(entries)
+    report.loc[len(report)] = [ds.name, 0, live_names, 0, algo.total_nodes, algo.size(),
+                               process.memory_info().rss / 1024 ** 2]
+    done = 0
+    while done < operations:
+        # The last window is shorter when operations is not a multiple of window
+        executed = min(window, operations - done)
+        start_time = time.time()
+        for _ in range(executed):
+            i = random.randrange(len(entries))
+            entry_key, entry_value = entries[i]
+            op = random.random()
+            if op < 0.2:
+                algo.remove(entry_key)
+                live_names -= live[i]
+                live[i] = False
+            elif op < 0.8:
+                algo.add(entry_key, entry_value)
+                live_names += not live[i]
+                live[i] = True
+            else:
+                algo.set(entry_key, [random.choice(hosting_ases)])
+                live_names += not live[i]
+                live[i] = True
+            done += 1
+        duration = time.time() - start_time
+        report.loc[len(report)] = [ds.name, done, live_names, executed / duration, algo.total_nodes, algo.size(),
+                                   process.memory_info().rss / 1024 ** 2]
+    return report
+
+
+def _cold_start(source, size, path, batch_size, query) -> (float, object, float):
+    """
+    Runs in a fresh process: builds an ECHTBE from source, then resolves query.
+    :param source: 'csv' to parse the dataset file at path, 'cache' to map the DSM columns file, 'snapshot' to map the
+    snapshot file at path
+    :return: the time to the first answer, the answer and the process RSS in MB once answered
+    """
+    import psutil
+
+    start_time = time.time()
+    algo = ECHTBE()
+    if source == 'snapshot':
+        algo.open_snapshot(path)
+    else:
+        ds = Dataset(size, True, path) if source == 'csv' else DSM().get_cache(size + '_named')
+        algo.batch_load(ds, batch_size)
+    answer = algo.get(query)
+    return time.time() - start_time, answer, psutil.Process().memory_info().rss / 1024 ** 2
+
+
+def _ensure_snapshot(ds, batch_size, snapshot_path):
+    """Writes the snapshot of a named dataset to snapshot_path, unless the file exists"""
+    if Path(snapshot_path).exists():
+        return
+    algo = ECHTBE()
+    algo.batch_load(ds, batch_size)
+    start_time = time.time()
+    algo.save_snapshot(snapshot_path)
+    logging.info('Saved the {} snapshot to {} in {} s'.format(ds.name, snapshot_path, time.time() - start_time))
+
+
+def startup(dsm: DSM, size: str, batch_size: int, snapshot_path: str) -> pd.DataFrame:
+    """
+    Compares the cold start of pnps from the dataset file, from the DSM columns file and from a memory-mapped snapshot:
+    each start runs in a new process and is timed until it answers a first GET. The snapshot is written first if
+    snapshot_path does not exist.
+    :param dsm: an initialized dataset manager, its columns files are used by the 'cache' start
+    :param size: dataset size, i.e. '1m'
+    :param batch_size: number of entries per batch when loading
+    :param snapshot_path: the snapshot file
+    :return: a dataframe with one row per start
+    """
+    columns = ['Dataset', 'Source', 'Time to First GET in s', 'RSS MB', 'Found']
+    report = pd.DataFrame(columns=columns)
+    ds = dsm.get_cache(size + '_named')
+    query = _sample_keys(ds, 1)[0]
+    _ensure_snapshot(ds, batch_size, snapshot_path)
+    for source, path in (('csv', ds.path), ('cache', None), ('snapshot', snapshot_path)):
+        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as executor:
+            duration, answer, rss = executor.submit(_cold_start, source, size, path, batch_size, query).result()
+        report.loc[len(report)] = [ds.name, source, duration, rss, bool(answer)]
+    return report
+
+
+def wal_writes(dsm: DSM, size: str, count: int, group_sizes: list) -> pd.DataFrame:
+    """
+    Times count add() mutations on a loaded ECHTBE without a write-ahead log, then logged with each group size, with
+    and without fsync. A group size of 1 commits every mutation, as acknowledging each Interest separately would. Each
+    log is then replayed into an empty backend.
+    :param dsm: an initialized dataset manager
+    :param size: dataset size, i.e. '1m'
+    :param count: number of mutations per run
+    :param group_sizes: number of mutations per commit, i.e. [1, 16, 64, 256]
+    :return: a dataframe with one row per run
+    """
+    columns = ['Dataset', 'fsync', 'Group Size', 'Mutations', 'Commits', 'Log Bytes', 'Duration in s', 'Mutations/s',
+               'Replay Duration in s']
+    report = pd.DataFrame(columns=columns)
+    ds = dsm.get_cache(size + '_named')
+    algo = ECHTBE()
+    algo.load(ds)
+    hosting_ases = [enc.Name.from_str('/AS{}'.format(i)) for i in range(1000)]
+    mutations = [(k, [random.choice(hosting_ases)]) for k in _sample_keys(ds, count)]
+
+    start_time = time.time()
+    for entry_key, entry_value in mutations:
+        algo.add(entry_key, entry_value)
+    duration = time.time() - start_time
+    report.loc[len(report)] = [ds.name, None, 0, len(mutations), 0, 0, duration, len(mutations) / duration, None]
+    with tempfile.TemporaryDirectory() as wal_dir:
+        for fsync in (False, True):
+            for group_size in group_sizes:
+                wal_path = os.path.join(wal_dir, 'bench_{}_{}.wal'.format(fsync, group_size))
+                wal = WriteAheadLog(wal_path, fsync)
+                start_time = time.time()
+                for i, (entry_key, entry_value) in enumerate(mutations, 1):
+                    algo.add(entry_key, entry_value)
+                    wal.append(OP_ADD, entry_key, entry_value)
+                    if i % group_size == 0:
+                        wal.commit()
+                wal.commit()
+                duration = time.time() - start_time
+                wal.close()
+                replay_algo = ECHTBE()
+                start_time = time.time()
+                WriteAheadLog(wal_path).replay(replay_algo)
+                replay_duration = time.time() - start_time
+                report.loc[len(report)] = [ds.name, fsync, group_size, len(mutations), wal.commits,
+                                           os.path.getsize(wal_path), duration, len(mutations) / duration,
+                                           replay_duration]
+    return report
+
+
+def write_synthetic_dataset(path, rows):
+    """
+    Writes a tar.gz dataset of rows random publishers in the format of the shipped datasets, i.e.
+    '/com/zde8g/6nc,/AS28,/AS27', each hosted in 2 to 4 of 40 ASes.
+    """
+    with tempfile.TemporaryDirectory() as csv_dir:
+        csv_path = os.path.join(csv_dir, 'publisher_synthetic.csv')
+        with open(csv_path, 'w', newline='') as fh:
+            writer = csv.writer(fh)
+            for _ in range(rows):
+                name = '/' + random.choice(['com', 'org', 'net', 'ru', 'de', 'om'])
+                for _ in range(random.randint(1, 3)):
+                    name += '/' + ''.join(random.choices(string.ascii_lowercase + string.digits,
+                                                         k=random.randint(3, 9)))
+                writer.writerow([name] + ['/AS{}'.format(i) for i in random.sample(range(1, 41), random.randint(2, 4))])
+        with tarfile.open(path, 'w:gz') as tar:
+            tar.add(csv_path, arcname='publisher_synthetic.csv')
+
+
+def _read_whole(path):
+    """Reads a dataset file the way Dataset did before streaming: whole file, decoded, split, then NDN-encoded"""
+    if str(path).endswith('gz'):
+        with tarfile.open(name=path, mode='r:gz') as tar:
+            member = next(m for m in tar.getmembers() if m.name.endswith('.csv'))
+            content = str(tar.extractfile(member).read(), 'utf-8')
+    else:
+        with open(path) as fh:
+            content = fh.read()
+    lines = csv.reader(content.splitlines())
+    return [(enc.Name.from_str(line[0].lower()), [enc.Name.from_str(i) for i in line[1:]]) for line in lines]
+
+
+def _ingest(reader, sink, path, batch_size) -> (int, float, float, float):
+    """
+    Runs in a fresh process: reads a dataset file with reader, 'whole' or 'stream', into sink, 'parse' to only count
+    the entries or 'ECHT' to batch load them into an ECHTBE.
+    :return: the number of entries, the time until the first entry was available, the total duration and the peak
+    RSS of the process in MB
+    """
+    import resource
+
+    start_time = time.time()
+    entries = iter(_read_whole(path)) if reader == 'whole' else read_csv(path, True)
+    first = next(entries)
+    first_entry_duration = time.time() - start_time
+    entries = itertools.chain([first], entries)
+    if sink == 'parse':
+        count = sum(1 for _ in entries)
+    else:
+        algo = ECHTBE()
+        algo.batch_load(entries, batch_size)
+        count = algo.processed_nodes
+    duration = time.time() - start_time
+    return count, first_entry_duration, duration, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def ingestion(dsm: DSM, size: str, synthetic_rows: list, batch_size: int) -> pd.DataFrame:
+    """
+    Compares reading a dataset file whole, as Dataset did, with streaming it through read_csv(), on the csv file of a
+    named dataset and on synthetic tar.gz files. Each run happens in a new process, parsing only, then batch loading
+    ECHTBE.
+    :param dsm: an initialized dataset manager
+    :param size: dataset size, i.e. '1m'
+    :param synthetic_rows: number of rows of each synthetic file, i.e. [2000000]
+    :param batch_size: number of entries per batch when loading
+    :return: a dataframe with one row per file, reader and sink
+    """
+    columns = ['File', 'Reader', 'Sink', 'Entries', 'Time to First Entry in s', 'Duration in s', 'Entries/s',
+               'Peak RSS MB']
+    report = pd.DataFrame(columns=columns)
+    with tempfile.TemporaryDirectory() as synthetic_dir:
+        files = [dsm.get_cache(size + '_named').path]
+        for rows in synthetic_rows:
+            files.append(os.path.join(synthetic_dir, 'publisher_{}.tar.gz'.format(rows)))
+            start_time = time.time()
+            write_synthetic_dataset(files[-1], rows)
+            logging.info('Wrote {} in {} s'.format(files[-1], time.time() - start_time))
+        for path in files:
+            for sink in ('parse', 'ECHT'):
+                for reader in ('whole', 'stream'):
+                    spawn = multiprocessing.get_context('spawn')
+                    with ProcessPoolExecutor(max_workers=1, mp_context=spawn) as executor:
+                        count, first_entry_duration, duration, rss = executor.submit(_ingest, reader, sink, path,
+                                                                                     batch_size).result()
+                    report.loc[len(report)] = [os.path.basename(path), reader, sink, count, first_entry_duration,
+                                               duration, count / duration, rss]
+    return report
+
+
+def encoding_scaling(dsm: DSM, size: str, max_workers: int) -> pd.DataFrame:
+    """
+    Builds the columns of a named dataset from its csv file with 1 to max_workers encoding processes and reports the
+    speedup over a single process.
+    :param dsm: an initialized dataset manager
+    :param size: dataset size, i.e. '1m'
+    :param max_workers: largest number of worker processes
+    :return: a dataframe with one row per number of workers
+    """
+    columns = ['Dataset', 'Workers', 'Cores', 'Entries', 'Duration in s', 'Speedup', 'Efficiency']
+    report = pd.DataFrame(columns=columns)
+    path = dsm.get_cache(size + '_named').path
+    for workers in range(1, max_workers + 1):
+        start_time = time.time()
+        ds = Dataset(size, True, path, workers=workers)
+        duration = time.time() - start_time
+        speedup = report['Duration in s'].iloc[0] / duration if len(report) else 1
+        report.loc[len(report)] = [ds.name, workers, os.cpu_count(), len(ds), duration, speedup, speedup / workers]
+    return report
+
+
+def negative_lookups(dsm: DSM, size: str) -> pd.DataFrame:
+    """
+    Resolves the negative pools of a named dataset with ECHTBE and checks that they miss as expected: no GET hit in
+    any pool, no LPM hit in the 'miss' pool and only LPM hits in the 'lpm' pool. Pools are generated by the first run
+    and mapped from cache_home by the next ones, the time to get them ready is reported.
+    :param dsm: an initialized dataset manager
+    :param size: dataset size, i.e. '1m'
+    :return: a dataframe with one row per negative category
+    """
+    columns = ['Dataset', 'Category', 'Names', 'Ready in s', 'GET Hits', 'LPM Hits', 'GET Duration in s',
+               'LPM Duration in s']
+    report = pd.DataFrame(columns=columns)
+    ds = dsm.get_cache(size + '_named')
+    algo = ECHTBE()
+    algo.load(ds)
+    for category in NEGATIVE_CATEGORIES:
+        start_time = time.time()
+        pool = dsm.get_negative(ds.name, category)
+        ready_duration = time.time() - start_time
+        queries = list(pool.get_keys())
+        get_duration, lpm_duration = _time_lookups(algo, queries)
+        get_hits = sum(1 for q in queries if algo.get(q))
+        lpm_hits = sum(1 for q in queries if algo.lpm(q)[1] is not None)
+        report.loc[len(report)] = [ds.name, category, len(queries), ready_duration, get_hits, lpm_hits, get_duration,
+                                   lpm_duration]
+    return report
+
+
+def trace_replay(dsm: DSM, size: str, count: int, exponents: list, rate: float) -> pd.DataFrame:
+    """
+    Replays popularity-skewed traces of the default query mix with ECHTBE, one per Zipf exponent. Traces are replayed
+    back to back, then open-loop at rate queries per second if rate is not 0.
+    :param dsm: an initialized dataset manager
+    :param size: dataset size, i.e. '1m'
+    :param count: number of queries per trace
+    :param exponents: Zipf exponents, i.e. [0, 0.8, 1.2], 0 is uniform
+    :param rate: queries per second of the open-loop replays, 0 to skip them
+    :return: a dataframe with one row per exponent and replay
+    """
+    columns = ['Dataset', 'Zipf', 'Replay', 'Queries', 'Distinct Positive Names', 'Top 1% Share', 'Duration in s',
+               'Latency p50 in us', 'Latency p99 in us', 'Latency p999 in us']
+    report = pd.DataFrame(columns=columns)
+    ds = dsm.get_cache(size + '_named')
+    algo = ECHTBE()
+    algo.load(ds)
+    for exponent in exponents:
+        trace = Trace.generate(dsm, ds.name, count, zipf=exponent, rate=rate, seed=QUERY_SEED)
+        positive_kinds = [k for k, kind in enumerate(KINDS) if kind.endswith('_positive')]
+        positive = trace.records['index'][np.isin(trace.records['kind'], positive_kinds)]
+        distinct = len(np.unique(positive))
+        top_share = np.count_nonzero(positive < max(1, len(ds) // 100)) / max(1, len(positive))
+        for replay in ('closed', 'open') if rate else ('closed',):
+            start_time = time.time()
+            latencies = trace.replay(algo, dsm, open_loop=replay == 'open')
+            duration = time.time() - start_time
+            p50, p99, p999 = np.percentile(latencies, [50, 99, 99.9]) * 1e6
+            report.loc[len(report)] = [ds.name, exponent, replay, count, distinct, top_share, duration, p50, p99, p999]
+    return report
+
+
+def _deepen(key, depth) -> list:
+    """Returns key extended with /d<n> components up to depth components, key itself if it is as deep"""
+    return list(key) + [enc.Component.from_str('d{}'.format(i)) for i in range(len(key), depth)]
+
+
+def _timed_lpm(algo, queries) -> (list, float):
+    """
+    Returns the answers of lpm() for all queries and the duration. A full collection runs first and the collector is
+    paused while timing: with two 1m backends loaded a single pass takes seconds and would land in one measurement.
+    """
+    gc.collect()
+    gc.disable()
+    try:
+        lpm = algo.lpm
+        start_time = time.perf_counter()
+        answers = [lpm(q) for q in queries]
+        return answers, time.perf_counter() - start_time
+    finally:
+        gc.enable()
+
+
+def deep_lpm(dsm: DSM, size: str, count: int, depths: list) -> pd.DataFrame:
+    """
+    LPM on deep names, ECHTBE vs WaldvogelBE. ECHT walks one node per component, the Waldvogel tables probe O(log L)
+    of them. Both backends load a named dataset, then for every depth, count of its keys are extended to depth
+    components and registered. 'deep' queries extend a registered deep name by one component, 'half' ones leave it
+    half way and match a shallower name.
+    :param dsm: an initialized dataset manager
+    :param size: dataset size, i.e. '1m'
+    :param count: number of deep names registered, and of queries of each kind, per depth
+    :param depths: numbers of components of the deep names, i.e. [4, 8, 16, 32]
+    :return: a dataframe with one row per depth, query kind and backend, counting the answers that differ from ECHTBE
+    """
+    columns = ['Dataset', 'Depth', 'Query', 'Queries', 'Backend', 'LPM Duration in s', 'Queries per s', 'Mismatches']
+    report = pd.DataFrame(columns=columns)
+    ds = dsm.get_cache(size + '_named')
+    backends = [ECHTBE(), Selector.get_backend(Selector.Algorithms.Waldvogel)]
+    for algo in backends:
+        algo.load(ds)
+    hosting_as = enc.Name.from_str('/AS-deep')
+    extra = enc.Component.from_str('x')
+    keys = _sample_keys(ds, count)
+    for depth in depths:
+        deep_names = [_deepen(k, depth) for k in keys]
+        for algo in backends:
+            algo.add_many((n, [hosting_as]) for n in deep_names)
+        kinds = {'deep': [n + [extra] for n in deep_names],
+                 'half': [n[:max(len(k), depth // 2)] + [extra] for k, n in zip(keys, deep_names)]}
+        for kind, queries in kinds.items():
+            reference = None
+            for algo in backends:
+                answers, duration = _timed_lpm(algo, queries)
+                if reference is None:
+                    reference = answers
+                mismatches = sum(1 for a, b in zip(answers, reference) if a != b)
+                report.loc[len(report)] = [ds.name, depth, kind, len(queries), algo.be_name, duration,
+                                           len(queries) / duration, mismatches]
+    return report
+
+
+def cr_trials(dsm: DSM, algorithms: list, sizes: list, load_batch_size: int, resolving_batch_sizes: list, warmup=1,
+              repetitions=3, profile=False, bloom_fp_rate=None) -> perf.CR:
+    """
+    Runs a CR trial per backend and dataset size: batch loads the dataset, then times positive and negative GETs and
+    LPMs at each resolving batch size. Positive names are keys, with an extra component for LPM, negative ones come
+    from the 'miss' pool of DSM.get_negative(). Every batch is resolved warmup times unrecorded, then repetitions
+    times, and the median duration goes to the resolving journal of the backend.
+    :param dsm: an initialized dataset manager
+    :param algorithms: Selector.Algorithms members, the ones without a backend are skipped
+    :param sizes: dataset sizes, i.e. ['1k', '1m']
+    :param load_batch_size: entries per load batch
+    :param resolving_batch_sizes: numbers of queries per batch, i.e. [1000, 10000, 100000]
+    :param warmup: unrecorded runs of every batch
+    :param repetitions: recorded runs of every batch
+    :param profile: if True, the Profiler records CPU and memory during each trial under export_home
+    :param bloom_fp_rate: if set, every backend runs a second trial behind a BloomFront sized for the dataset with
+    this false-positive rate, named '<backend>+Bloom'
+    :return: the CR holding the trials and their journals
+    """
+    cr = perf.CR()
+    for algorithm in algorithms:
+        for size, fp_rate in itertools.product(sizes, [None] if bloom_fp_rate is None else [None, bloom_fp_rate]):
+            try:
+                algo = Selector.get_backend(algorithm)
+            except NotImplementedError as e:
+                logging.warning('{}, skipping it'.format(e))
+                break
+            ds_name = size + '_' + algo.default_dataset_format
+            dataset = dsm.get_cache(ds_name)
+            name = algorithm.name
+            if fp_rate is not None:
+                algo = BloomFront(algo, len(dataset), fp_rate)
+                name += '+Bloom'
+            seq = cr.add_trial(name, size, sampling_interval if profile else None, load_batch_size,
+                               resolving_batch_sizes)
+            if profile:
+                cr.profilers[seq] = Profiler(algorithm, os.getpid(), 'cr_{}_{}'.format(size, seq))
+                cr.profilers[seq].start()
+            algo.batch_load(dataset, load_batch_size)
+            cr.add_load(seq, algo.load_performance.get())
+            for kind in KINDS:
+                journal = getattr(algo, 'perf_' + kind)
+                resolve = algo.lpm if kind.startswith('lpm') else algo.get
+                for batch_size in resolving_batch_sizes:
+                    queries = Trace.generate(dsm, ds_name, batch_size, zipf=0, mix={kind: 1},
+                                             seed=QUERY_SEED).names(dsm)
+                    durations = []
+                    for run in range(warmup + repetitions):
+                        start_time = time.perf_counter()
+                        for q in queries:
+                            resolve(q)
+                        if run >= warmup:
+                            durations.append(time.perf_counter() - start_time)
+                    journal.add(batch_size, statistics.median(durations))
+                cr.add_resolve(seq, kind, journal)
+            if profile:
+                cr.profilers[seq].stop()
+            cr.finish_trial(seq, getattr(algo, 'total_nodes', None), getattr(algo, 'total_components', None))
+            if fp_rate is not None:
+                logging.info('Bloom filter of {}: {}'.format(name, algo.stats()))
+            logging.info('Finished the CR trial {} of {} on {}'.format(seq, name, ds_name))
+    return cr
+
+
+def _encode_queries(trace, dsm, route=None) -> list:
+    """
+    Encodes the positive GETs and LPMs of a trace into the Interest parameters pnps receives.
+    :param route: the name prefix of the Interests, None not to build their names
+    :return: (Interest parameters, Interest name, mutated name) triples. The Interest name ends with the digest of the
+    parameters, or is None without route. The mutated name is the queried key: the name of a GET, and the name of an
+    LPM without its last component, as LPM queries are keys with an extra component
+    """
+    queries = []
+    for name, kind in zip(trace.names(dsm), trace.records['kind'].tolist()):
+        o_msg = PnpIMessage()
+        if KINDS[kind] == 'get_positive':
+            o_msg.get_message = GetMessage()
+            o_msg.get_message.publisher_name = name
+            key = name
+        else:
+            o_msg.getlpm_message = GetLpmMessage()
+            o_msg.getlpm_message.publisher_name = name
+            key = name[:-1]
+        params = bytes(o_msg.encode())
+        interest_name = None
+        if route is not None:
+            interest_name = route + [enc.Component.from_bytes(SHA256.new(params).digest(),
+                                                              enc.Component.TYPE_PARAMETERS_SHA256)]
+        queries.append((params, interest_name, key))
+    return queries
+
+
+def _serve(algo, params, cache) -> bytes:
+    """Answers the Interest parameters of a GET or an LPM the way pnps does, without signing: from the cache if it
+    holds them, otherwise resolved and encoded, then cached"""
+    content = cache.get(params) if cache is not None else None
+    if content is None:
+        msg = PnpIMessage.parse(params)
+        if msg.get_message is not None:
+            entry_key = [c.tobytes() for c in msg.get_message.publisher_name]
+            reply = entry_key, algo.get(entry_key)
+        else:
+            reply = algo.lpm([c.tobytes() for c in msg.getlpm_message.publisher_name])
+        content = make_data_message(*reply).encode()
+        if cache is not None:
+            cache.put(params, msg, reply, content)
+    return content
+
+
+def cached_replies(dsm: DSM, size: str, count: int, exponents: list, capacities: list, mutation_interval: int
+                   ) -> pd.DataFrame:
+    """
+    Serves Zipf traces of positive GETs and LPMs with ECHTBE on the wire path of pnps --cache, without NFD nor
+    signing: the Interest parameters are answered from a ResultCache, or parsed, resolved and encoded then cached. Every
+    mutation_interval queries, the name of the current query is set to another hosting AS and invalidated.
+    :param dsm: an initialized dataset manager
+    :param size: dataset size, i.e. '1m'
+    :param count: number of queries per trace
+    :param exponents: Zipf exponents, i.e. [0, 0.8, 1.2], 0 is uniform
+    :param capacities: numbers of cached replies, 0 runs without cache
+    :param mutation_interval: queries between two mutations, 0 for none
+    :return: a dataframe with one row per exponent and capacity
+    """
+    columns = ['Dataset', 'Zipf', 'Capacity', 'Queries', 'Mutations', 'Duration in s', 'Queries/s', 'Hit Ratio',
+               'Evictions', 'Invalidations']
+    report = pd.DataFrame(columns=columns)
+    ds = dsm.get_cache(size + '_named')
+    algo = None
+    hosting_as = enc.Name.from_str('/AS99')
+    for exponent in exponents:
+        trace = Trace.generate(dsm, ds.name, count, zipf=exponent, mix={'get_positive': 0.5, 'lpm_positive': 0.5},
+                               seed=QUERY_SEED)
+        queries = _encode_queries(trace, dsm)
+        for capacity in capacities:
+            if algo is None or mutation_interval:
+                # Every run starts from the dataset, not from the names the previous one set
+                algo = ECHTBE()
+                algo.load(ds)
+            cache = ResultCache(capacity) if capacity else None
+            mutations = 0
+            start_time = time.time()
+            for i, (params, _, name) in enumerate(queries):
+                _serve(algo, params, cache)
+                if mutation_interval and i % mutation_interval == mutation_interval - 1:
+                    algo.set(name, [hosting_as])
+                    if cache is not None:
+                        cache.invalidate(name)
+                    mutations += 1
+            duration = time.time() - start_time
+            stats = cache.stats() if cache is not None else {'Hit Ratio': 0.0, 'Evictions': 0, 'Invalidations': 0}
+            report.loc[len(report)] = [ds.name, exponent, capacity, count, mutations, duration, count / duration,
+                                       stats['Hit Ratio'], stats['Evictions'], stats['Invalidations']]
+    return report
+
+
+def _bench_signer(mode):
+    """Returns the signer of a signing mode. ecdsa stands for the default keychain certificate, a P-256 key, with a key
+    generated on the fly so that no keychain is needed"""
+    if mode == 'ecdsa':
+        return Sha256WithEcdsaSigner('/AS1/PNPS/KEY/ecdsa', ECC.generate(curve='P-256').export_key(format='DER'))
+    return get_signer(mode, hmac_key_name='/AS1/PNPS/KEY/hmac', hmac_key=os.urandom(32).hex())
+
+
+def signed_replies(dsm: DSM, size: str, count: int, exponents: list, modes: list, capacities: list) -> pd.DataFrame:
+    """
+    Times the signing of the replies of pnps into Data packets, per signing mode, on Zipf traces of positive GETs and
+    LPMs resolved with ECHTBE. The replies are resolved and encoded first, only SignedDataCache.make_data() is timed:
+    capacity 0 signs every reply, larger capacities reuse the Data packets of the Interests answered before.
+    :param dsm: an initialized dataset manager
+    :param size: dataset size, i.e. '1m'
+    :param count: number of queries per trace
+    :param exponents: Zipf exponents, i.e. [0, 1.2], 0 is uniform
+    :param modes: signing modes, 'ecdsa' (as the default keychain certificate), 'digest' or 'hmac'
+    :param capacities: numbers of Data packets kept, 0 signs every reply
+    :return: a dataframe with one row per exponent, mode and capacity
+    """
+    columns = ['Dataset', 'Zipf', 'Mode', 'Capacity', 'Replies', 'Signatures', 'Duration in s', 'Replies/s',
+               'Signatures/s']
+    report = pd.DataFrame(columns=columns)
+    ds = dsm.get_cache(size + '_named')
+    algo = ECHTBE()
+    algo.load(ds)
+    route = enc.Name.from_str('/AS1/PNPS')
+    for exponent in exponents:
+        trace = Trace.generate(dsm, ds.name, count, zipf=exponent, mix={'get_positive': 0.5, 'lpm_positive': 0.5},
+                               seed=QUERY_SEED)
+        replies = [(interest_name, _serve(algo, params, None))
+                   for params, interest_name, _ in _encode_queries(trace, dsm, route)]
+        for mode in modes:
+            signer = _bench_signer(mode)
+            for capacity in capacities:
+                data_cache = SignedDataCache(signer, capacity)
+                start_time = time.time()
+                for interest_name, content in replies:
+                    data_cache.make_data(interest_name, content)
+                duration = time.time() - start_time
+                report.loc[len(report)] = [ds.name, exponent, mode, capacity, count, data_cache.signatures, duration,
+                                           count / duration, data_cache.signatures / duration]
+    return report
+
+
+def _serve_worker(snapshot_path, queries, barrier) -> (float, float, float, float):
+    """
+    Runs in a worker process: maps the snapshot, then answers queries on the wire path of a pnps worker, signing every
+    reply with a DigestSha256. The workers start answering together, once all of them passed the barrier.
+    :param queries: (Interest name as a URI, Interest parameters) pairs
+    :return: the start and end times, and the RSS and USS of the process in MB. The pages of the snapshot shared with
+    the other workers are only counted in the RSS
+    """
+    import psutil
+
+    algo = ECHTBE()
+    algo.open_snapshot(snapshot_path)
+    data_cache = SignedDataCache(get_signer('digest'), 0)
+    queries = [(enc.Name.from_str(name), params) for name, params in queries]
+    barrier.wait()
+    start_time = time.time()
+    for interest_name, params in queries:
+        data_cache.make_data(interest_name, _serve(algo, params, None))
+    end_time = time.time()
+    memory = psutil.Process().memory_full_info()
+    return start_time, end_time, memory.rss / 1024 ** 2, memory.uss / 1024 ** 2
+
+
+def worker_scaling(dsm: DSM, size: str, count: int, workers: list, batch_size: int, snapshot_path: str
+                   ) -> pd.DataFrame:
+    """
+    Serves a uniform trace of positive GETs and LPMs with 1 or more processes mapping the same ECHT snapshot, as the
+    workers of pnps --workers do, without NFD. The queries are spread round-robin over the workers, and the throughput
+    is the number of queries over the time from the first start to the last end. The snapshot is written first if
+    snapshot_path does not exist.
+    :param dsm: an initialized dataset manager
+    :param size: dataset size, i.e. '1m'
+    :param count: number of queries per run
+    :param workers: numbers of worker processes, i.e. [1, 2, 4, 8]
+    :param batch_size: number of entries per batch when loading
+    :param snapshot_path: the snapshot file
+    :return: a dataframe with one row per number of workers
+    """
+    columns = ['Dataset', 'Workers', 'Cores', 'Queries', 'Duration in s', 'Queries/s', 'Speedup', 'Efficiency',
+               'Mean RSS MB', 'Mean USS MB']
+    report = pd.DataFrame(columns=columns)
+    ds = dsm.get_cache(size + '_named')
+    _ensure_snapshot(ds, batch_size, snapshot_path)
+    route = enc.Name.from_str('/AS1/PNPS')
+    trace = Trace.generate(dsm, ds.name, count, zipf=0, mix={'get_positive': 0.5, 'lpm_positive': 0.5},
+                           seed=QUERY_SEED)
+    queries = [(enc.Name.to_str(interest_name), params)
+               for params, interest_name, _ in _encode_queries(trace, dsm, route)]
+    context = multiprocessing.get_context('spawn')
+    for n in workers:
+        with context.Manager() as manager, ProcessPoolExecutor(max_workers=n, mp_context=context) as executor:
+            barrier = manager.Barrier(n)
+            results = list(executor.map(_serve_worker, [snapshot_path] * n, [queries[i::n] for i in range(n)],
+                                        [barrier] * n))
+        duration = max(r[1] for r in results) - min(r[0] for r in results)
+        throughput = count / duration
+        speedup = throughput / report['Queries/s'].iloc[0] if len(report) else 1
+        report.loc[len(report)] = [ds.name, n, os.cpu_count(), count, duration, throughput, speedup,
+                                   speedup * report['Workers'].iloc[0] / n if len(report) else 1,
+                                   statistics.mean(r[2] for r in results), statistics.mean(r[3] for r in results)]
+    return report
@@ -11,7 +11,7 @@ class LoadLogs:
     def __init__(self, backend):
         self._backend = backend
         columns = ['Cumulative Batch Size', 'Current Batch Size', 'Batch Start Time', 'Batch Finish Time',
-                   'Batch Duration in s', 'Cumulative Duration in s']
+                   'Batch Duration in s', 'Cumulative Duration in s', 'Method']
         self.journal = pd.DataFrame(columns=columns)
         self.journal.name = 'LoadPerformance'
         pd.set_option('display.max_columns', None)
@@ -19,12 +19,13 @@ class LoadLogs:
         self._last_cumulative_batch_size = 0
         self._last_cumulative_duration = 0
 
-    def add(self, batch_size, batch_start_time, batch_finish_time):
+    def add(self, batch_size, batch_start_time, batch_finish_time, method='add'):
         current_cumulative_batch_size = self._last_cumulative_batch_size + batch_size
         current_duration = batch_finish_time - batch_start_time
         current_cumulative_duration = self._last_cumulative_duration + current_duration
         self.journal.loc[len(self.journal)] = [current_cumulative_batch_size, batch_size, batch_start_time,
-                                               batch_finish_time, current_duration, current_cumulative_duration]
+                                               batch_finish_time, current_duration, current_cumulative_duration,
+                                               method]
         self._last_cumulative_batch_size = current_cumulative_batch_size
         self._last_cumulative_duration = current_cumulative_duration
 
@@ -210,7 +211,30 @@ class CR:
                 f4.to_excel(writer, sheet_name='lpm_negative', startrow=start_row_f4)
                 start_row_f4 = start_row_f4 + 5 + len(f4.index)
 
-    def summarize(self):
+    def consolidated(self) -> pd.DataFrame:
+        """Returns one row per trial, test and resolving batch size, next to the trial it belongs to"""
+        columns = ['seq', 'backend_name', 'dataset_size', 'test', 'Count', 'Cumulative Duration in s',
+                   'Queries per s']
+        rows = []
+        for _, t in self.trials.iterrows():
+            seq = t['seq']
+            load = self.perf_load[seq]
+            loaded, load_duration = load['Cumulative Batch Size'].iloc[-1], load['Cumulative Duration in s'].iloc[-1]
+            rows.append([seq, t['backend_name'], t['dataset_size'], 'load', loaded, load_duration,
+                         loaded / load_duration])
+            for test, journals in (('get_positive', self.perf_get_positive), ('get_negative', self.perf_get_negative),
+                                   ('lpm_positive', self.perf_lpm_positive), ('lpm_negative', self.perf_lpm_negative)):
+                for _, r in journals[seq].get_df().iterrows():
+                    rows.append([seq, t['backend_name'], t['dataset_size'], test, r['Count'],
+                                 r['Cumulative Duration in s'], r['Count'] / r['Cumulative Duration in s']])
+        return pd.DataFrame(rows, columns=columns)
+
+    def summarize(self, export_directory=None):
+        """
+        Puts the trials side by side, one column per trial named after its backend and dataset size.
+        :param export_directory: if given, the summaries are also stored in store.h5 under it
+        :return: a dict of summary name to dataframe
+        """
         # Initialize Summarize Load
         summary_load_df = pd.DataFrame()
         cbs = self.perf_load[0]
@@ -231,7 +255,8 @@ class CR:
         i = 1
         for idx, t in self.trials.iterrows():
             seq = t['seq']
-            algo_name = t['backend_name']
+            # A backend may run on several dataset sizes
+            algo_name = '{}_{}'.format(t['backend_name'], t['dataset_size'])
 
             # Summarize Load
             summary_load_df.insert(i, algo_name, self.perf_load[seq]['Cumulative Duration in s'])
@@ -250,11 +275,13 @@ class CR:
 
             i += 1
 
-        store = pd.HDFStore('exports/store.h5')
-        store['summary_load_df'] = summary_load_df
-        store['summary_gp_df'] = summary_gp_df
-        store['summary_gn_df'] = summary_gn_df
-        store['summary_lp_df'] = summary_lp_df
-        store['summary_ln_df'] = summary_ln_df
-        pass
-
+        self.summary_load = summary_load_df
+        summaries = {'summary_load_df': summary_load_df, 'summary_gp_df': summary_gp_df,
+                     'summary_gn_df': summary_gn_df, 'summary_lp_df': summary_lp_df, 'summary_ln_df': summary_ln_df}
+        if export_directory is not None:
+            if not export_directory.endswith('/'):
+                export_directory = export_directory + '/'
+            with pd.HDFStore(export_directory + 'store.h5') as store:
+                for name, summary in summaries.items():
+                    store[name] = summary
+        return summaries
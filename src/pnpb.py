@@ -0,0 +1,224 @@
+import argparse
+import configparser
+import logging
+import os
+import pathlib
+
+import Selector
+from datasets.DSManager import DSM
+import performance.Benchmarks as bench
+
+# region logging
+logging.basicConfig(format='{asctime} {levelname} [{filename}:{lineno}] {message}',
+                    datefmt='%Y-%m-%d %H:%M:%S',
+                    level=logging.INFO,
+                    style='{')
+# endregion logging
+
+
+def get_args():
+    parser = argparse.ArgumentParser(prog='pnpb.py', description='PNP Benchmarks. Runs headless, NFD is not needed.')
+    parser.add_argument('--config', nargs=1, metavar='ConfigFile', default=['/etc/ndn/pnp/app.ini'],
+                        help='Configuration File. (Created by running: sudo ./runme.sh. Default: /etc/ndn/pnp/app.ini)')
+    parser.add_argument('--export', action='store_true',
+                        help='Export the report as csv under export_home (Default: print only)')
+    subparsers = parser.add_subparsers(dest='benchmark', title='Available benchmarks', required=True)
+
+    parser_footprint = subparsers.add_parser('footprint', help='Bytes per entry of the ECHT node layouts')
+    parser_footprint.add_argument('--sizes', nargs='+', metavar='Size', default=['1k', '10k', '100k', '1m'],
+                                  help='Dataset sizes to measure (Default: 1k 10k 100k 1m)')
+
+    parser_freeze = subparsers.add_parser('freeze', help='ECHT trie vs its frozen snapshot: build, memory, GET/LPM')
+    parser_freeze.add_argument('--size', metavar='Size', default='1m', help='Dataset size (Default: 1m)')
+    parser_freeze.add_argument('--count', metavar='Count', type=int, default=100000,
+                               help='Number of GET and of LPM queries (Default: 100000)')
+
+    parser_load = subparsers.add_parser('load', help='ECHT batch load: add() per entry vs add_many()')
+    parser_load.add_argument('--size', metavar='Size', default='1m', help='Dataset size (Default: 1m)')
+    parser_load.add_argument('--batch-size', metavar='BatchSize', type=int, default=100000,
+                             help='Entries per batch (Default: 100000)')
+
+    parser_batch = subparsers.add_parser('batch', help='Wire path of one GET per Interest vs batched GETs')
+    parser_batch.add_argument('--size', metavar='Size', default='1m', help='Dataset size (Default: 1m)')
+    parser_batch.add_argument('--count', metavar='Count', type=int, default=10000,
+                              help='Number of names to resolve (Default: 10000)')
+    parser_batch.add_argument('--batch-sizes', nargs='+', metavar='BatchSize', type=int, default=[1, 10, 50],
+                              help='Names per Interest (Default: 1 10 50)')
+
+    parser_churn = subparsers.add_parser('churn',
+                                         help='Mixed add/remove/set operations: throughput and memory over time')
+    parser_churn.add_argument('--size', metavar='Size', default='1m', help='Dataset size (Default: 1m)')
+    parser_churn.add_argument('--operations', metavar='Operations', type=int, default=2000000,
+                              help='Number of operations (Default: 2000000)')
+    parser_churn.add_argument('--window', metavar='Window', type=int, default=100000,
+                              help='Operations per report row (Default: 100000)')
+
+    parser_startup = subparsers.add_parser('startup', help='Cold start from the dataset file, the cache or a snapshot')
+    parser_startup.add_argument('--size', metavar='Size', default='1m', help='Dataset size (Default: 1m)')
+    parser_startup.add_argument('--batch-size', metavar='BatchSize', type=int, default=100000,
+                                help='Entries per batch when loading (Default: 100000)')
+    parser_startup.add_argument('--snapshot', metavar='SnapshotFile', default='/tmp/pnp_snapshot.bin',
+                                help='Snapshot file, written first if missing (Default: /tmp/pnp_snapshot.bin)')
+
+    parser_wal = subparsers.add_parser('wal', help='Mutation throughput without and with the write-ahead log')
+    parser_wal.add_argument('--size', metavar='Size', default='1m', help='Dataset size (Default: 1m)')
+    parser_wal.add_argument('--count', metavar='Count', type=int, default=20000,
+                            help='Number of mutations per run (Default: 20000)')
+    parser_wal.add_argument('--group-sizes', nargs='+', metavar='GroupSize', type=int, default=[1, 16, 64, 256],
+                            help='Mutations per commit (Default: 1 16 64 256)')
+
+    parser_ingest = subparsers.add_parser('ingest', help='Dataset file read whole vs streamed: time and peak memory')
+    parser_ingest.add_argument('--size', metavar='Size', default='1m', help='Dataset size (Default: 1m)')
+    parser_ingest.add_argument('--synthetic-rows', nargs='*', metavar='Rows', type=int, default=[2000000],
+                               help='Rows of each synthetic tar.gz file (Default: 2000000)')
+    parser_ingest.add_argument('--batch-size', metavar='BatchSize', type=int, default=100000,
+                               help='Entries per batch when loading (Default: 100000)')
+
+    parser_encode = subparsers.add_parser('encode', help='Parallel NDN encoding of a dataset: scaling over workers')
+    parser_encode.add_argument('--size', metavar='Size', default='1m', help='Dataset size (Default: 1m)')
+    parser_encode.add_argument('--max-workers', metavar='Workers', type=int, default=os.cpu_count(),
+                               help='Largest number of encoding processes (Default: one per core)')
+
+    parser_negative = subparsers.add_parser('negative', help='Negative query pools: readiness and miss checks')
+    parser_negative.add_argument('--size', metavar='Size', default='1m', help='Dataset size (Default: 1m)')
+
+    parser_trace = subparsers.add_parser('trace', help='Zipf-skewed query traces replayed closed and open loop')
+    parser_trace.add_argument('--size', metavar='Size', default='1m', help='Dataset size (Default: 1m)')
+    parser_trace.add_argument('--count', metavar='Count', type=int, default=1000000,
+                              help='Number of queries per trace (Default: 1000000)')
+    parser_trace.add_argument('--zipf', nargs='+', metavar='Exponent', type=float, default=[0, 0.8, 1.0, 1.2],
+                              help='Zipf exponents, 0 is uniform (Default: 0 0.8 1.0 1.2)')
+    parser_trace.add_argument('--rate', metavar='QPS', type=float, default=0,
+                              help='Queries per second of an extra open-loop replay (Default: 0, none)')
+
+    parser_deep = subparsers.add_parser('deep', help='LPM on deep names: ECHT trie walk vs Waldvogel binary search')
+    parser_deep.add_argument('--size', metavar='Size', default='1m', help='Dataset size (Default: 1m)')
+    parser_deep.add_argument('--count', metavar='Count', type=int, default=10000,
+                             help='Deep names registered and queries per depth (Default: 10000)')
+    parser_deep.add_argument('--depths', nargs='+', metavar='Depth', type=int, default=[4, 8, 16, 32],
+                             help='Components of the deep names (Default: 4 8 16 32)')
+
+    parser_cache = subparsers.add_parser('cache', help='GET/LPM wire path of pnps --cache, Zipf traces with mutations')
+    parser_cache.add_argument('--size', metavar='Size', default='1m', help='Dataset size (Default: 1m)')
+    parser_cache.add_argument('--count', metavar='Count', type=int, default=200000,
+                              help='Number of queries per trace (Default: 200000)')
+    parser_cache.add_argument('--zipf', nargs='+', metavar='Exponent', type=float, default=[0, 0.8, 1.2],
+                              help='Zipf exponents of the traces, 0 is uniform (Default: 0 0.8 1.2)')
+    parser_cache.add_argument('--capacities', nargs='+', metavar='Capacity', type=int, default=[0, 10000, 100000],
+                              help='Cached replies, 0 runs without cache (Default: 0 10000 100000)')
+    parser_cache.add_argument('--mutation-interval', metavar='Queries', type=int, default=100,
+                              help='Queries between two set() of a queried name, 0 for none (Default: 100)')
+
+    parser_sign = subparsers.add_parser('sign', help='Signatures/s per signing mode, without and with Data reuse')
+    parser_sign.add_argument('--size', metavar='Size', default='1m', help='Dataset size (Default: 1m)')
+    parser_sign.add_argument('--count', metavar='Count', type=int, default=20000,
+                             help='Number of replies per trace (Default: 20000)')
+    parser_sign.add_argument('--zipf', nargs='+', metavar='Exponent', type=float, default=[0, 1.2],
+                             help='Zipf exponents of the traces, 0 is uniform (Default: 0 1.2)')
+    parser_sign.add_argument('--modes', nargs='+', metavar='Mode', default=['ecdsa', 'digest', 'hmac'],
+                             choices=['ecdsa', 'digest', 'hmac'],
+                             help='Signing modes, ecdsa as the keychain certificate (Default: ecdsa digest hmac)')
+    parser_sign.add_argument('--capacities', nargs='+', metavar='Capacity', type=int, default=[0, 100000],
+                             help='Signed Data packets kept, 0 signs every reply (Default: 0 100000)')
+
+    parser_workers = subparsers.add_parser('workers', help='GET/LPM throughput of processes sharing a mapped snapshot')
+    parser_workers.add_argument('--size', metavar='Size', default='1m', help='Dataset size (Default: 1m)')
+    parser_workers.add_argument('--count', metavar='Count', type=int, default=200000,
+                                help='Number of queries per run (Default: 200000)')
+    parser_workers.add_argument('--workers', nargs='+', metavar='Workers', type=int, default=[1, 2, 4, 8],
+                                help='Numbers of worker processes (Default: 1 2 4 8)')
+    parser_workers.add_argument('--batch-size', metavar='BatchSize', type=int, default=100000,
+                                help='Entries per batch when loading (Default: 100000)')
+    parser_workers.add_argument('--snapshot', metavar='SnapshotFile', default='/tmp/pnp_snapshot.bin',
+                                help='Snapshot file, written first if missing (Default: /tmp/pnp_snapshot.bin)')
+
+    parser_cr = subparsers.add_parser('cr', help='CR trials: load then GET/LPM positive/negative per backend and size')
+    parser_cr.add_argument('--algorithms', nargs='+', metavar='Algorithm', default=['ECHT'],
+                           choices=[a.name for a in Selector.Algorithms],
+                           help='Selector.Algorithms backends, the ones not implemented are skipped (Default: ECHT)')
+    parser_cr.add_argument('--sizes', nargs='+', metavar='Size', default=['1k', '1m'],
+                           help='Dataset sizes (Default: 1k 1m)')
+    parser_cr.add_argument('--load-batch-size', metavar='BatchSize', type=int, default=100000,
+                           help='Entries per load batch (Default: 100000)')
+    parser_cr.add_argument('--resolving-batch-sizes', nargs='+', metavar='BatchSize', type=int,
+                           default=[1000, 10000, 100000],
+                           help='Queries per resolving batch (Default: 1000 10000 100000)')
+    parser_cr.add_argument('--warmup', metavar='Runs', type=int, default=1,
+                           help='Unrecorded runs of every batch (Default: 1)')
+    parser_cr.add_argument('--repetitions', metavar='Runs', type=int, default=3,
+                           help='Recorded runs of every batch, the median is kept (Default: 3)')
+    parser_cr.add_argument('--profile', action='store_true',
+                           help='Record CPU and memory during each trial with the Profiler, under export_home')
+    parser_cr.add_argument('--bloom', metavar='FPRate', type=float,
+                           help='Also run every backend behind a Bloom filter front with this false-positive rate, as '
+                                '<backend>+Bloom trials (Default: no front)')
+    return parser.parse_args()
+
+
+def export(report, export_home, benchmark):
+    export_home = export_home if export_home.endswith('/') else export_home + '/'
+    csv_file_name = export_home + 'bench_' + benchmark + '.csv'
+    report.to_csv(csv_file_name, index=False)
+    logging.info('Exported the {} benchmark to {}'.format(benchmark, csv_file_name))
+
+
+def main():
+    args = get_args()
+
+    # region Configuration
+    path = pathlib.Path(args.config[0])
+    if not path.exists():
+        exit('Can not find the configuration file in: {}'.format(args.config[0]))
+    application_config = configparser.ConfigParser()
+    application_config.read(args.config[0])
+    export_home = application_config.get('Paths', 'export_home')
+    # endregion Configuration
+
+    match args.benchmark:
+        case 'footprint':
+            report = bench.layout_footprint(DSM(), args.sizes)
+        case 'freeze':
+            report = bench.freeze_lookups(DSM(), args.size, args.count)
+        case 'load':
+            report = bench.bulk_load(DSM(), args.size, args.batch_size)
+        case 'batch':
+            report = bench.batched_queries(DSM(), args.size, args.count, args.batch_sizes)
+        case 'churn':
+            report = bench.churn(DSM(), args.size, args.operations, args.window)
+        case 'startup':
+            report = bench.startup(DSM(), args.size, args.batch_size, args.snapshot)
+        case 'wal':
+            report = bench.wal_writes(DSM(), args.size, args.count, args.group_sizes)
+        case 'ingest':
+            report = bench.ingestion(DSM(), args.size, args.synthetic_rows, args.batch_size)
+        case 'encode':
+            report = bench.encoding_scaling(DSM(), args.size, args.max_workers)
+        case 'negative':
+            report = bench.negative_lookups(DSM(), args.size)
+        case 'trace':
+            report = bench.trace_replay(DSM(), args.size, args.count, args.zipf, args.rate)
+        case 'deep':
+            report = bench.deep_lpm(DSM(), args.size, args.count, args.depths)
+        case 'cache':
+            report = bench.cached_replies(DSM(), args.size, args.count, args.zipf, args.capacities,
+                                          args.mutation_interval)
+        case 'sign':
+            report = bench.signed_replies(DSM(), args.size, args.count, args.zipf, args.modes, args.capacities)
+        case 'workers':
+            report = bench.worker_scaling(DSM(), args.size, args.count, args.workers, args.batch_size, args.snapshot)
+        case 'cr':
+            cr = bench.cr_trials(DSM(), [Selector.Algorithms[a] for a in args.algorithms], args.sizes,
+                                 args.load_batch_size, args.resolving_batch_sizes, args.warmup, args.repetitions,
+                                 args.profile, args.bloom)
+            cr.stats(1)
+            report = cr.consolidated()
+            if args.export:
+                cr.export_to_excel(export_home)
+                cr.summarize(export_home)
+    print(report.to_string(index=False))
+    if args.export:
+        export(report, export_home, args.benchmark)
+
+
+if __name__ == "__main__":
+    main()
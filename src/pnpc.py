@@ -7,7 +7,8 @@ from ndn import encoding as enc
 
 import validator
 from pnpc_arg_parser import get_args, get_examples
-from OurModel import AddMessage, GetMessage, GetLpmMessage, PnpDMessage, PnpIMessage, RemoveMessage, SetMessage
+from OurModel import AddMessage, GetManyMessage, GetMessage, GetLpmMessage, ListPublishersMessage, PnpDManyMessage, \
+    PnpDMessage, PnpDPublishersMessage, PnpIMessage, RemoveMessage, SetMessage, WithdrawMessage
 from utils import convert_names_to_strings, convert_strings_to_names
 
 # region Logging
@@ -54,7 +55,7 @@ def switcher(pnpc_args):
         o_msg = PnpIMessage()
         msg = RemoveMessage()
         msg.publisher_name = enc.Name.from_str(pnpc_args.remove.publisher_name[0])
-        msg.hosting_as_list = convert_strings_to_names(pnpc_args.remove.as_list)
+        msg.hosting_as_list = [enc.Name.from_str(n) for n in pnpc_args.remove.as_list]
         o_msg.remove_message = msg
         logging.debug('Remove message:\n{}'.format(o_msg.remove_message))
     elif pnpc_args.set is not None:
@@ -63,7 +64,7 @@ def switcher(pnpc_args):
         o_msg = PnpIMessage()
         msg = SetMessage()
         msg.publisher_name = enc.Name.from_str(pnpc_args.set.publisher_name[0])
-        msg.hosting_as_list = convert_strings_to_names(pnpc_args.set.as_list)
+        msg.hosting_as_list = [enc.Name.from_str(n) for n in pnpc_args.set.as_list]
         o_msg.set_message = msg
         logging.debug('Set message:\n{}'.format(o_msg.set_message))
     elif pnpc_args.get is not None:
@@ -80,11 +81,41 @@ def switcher(pnpc_args):
         msg.publisher_name = enc.Name.from_str(pnpc_args.getlpm.publisher_name[0])
         o_msg.getlpm_message = msg
         logging.debug('Get message:\n{}'.format(o_msg.getlpm_message))
+    elif pnpc_args.getmany is not None:
+        logging.debug('Getting (LPM Mode: {0}) the advertisements of {1}'.format(pnpc_args.getmany.lpm,
+                                                                                 pnpc_args.getmany.publisher_names))
+        o_msg = PnpIMessage()
+        msg = GetManyMessage()
+        msg.lpm = pnpc_args.getmany.lpm
+        msg.publisher_names = [enc.Name.from_str(n) for n in pnpc_args.getmany.publisher_names]
+        o_msg.getmany_message = msg
+        logging.debug('GetMany message:\n{}'.format(o_msg.getmany_message))
+    elif pnpc_args.withdraw is not None:
+        logging.debug('Withdrawing {0} from all its publishers'.format(pnpc_args.withdraw.hosting_as))
+        o_msg = PnpIMessage()
+        msg = WithdrawMessage()
+        msg.hosting_as = enc.Name.from_str(pnpc_args.withdraw.hosting_as[0])
+        o_msg.withdraw_message = msg
+        logging.debug('Withdraw message:\n{}'.format(o_msg.withdraw_message))
+    elif pnpc_args.publishers is not None:
+        logging.debug('Listing the publishers hosted in {0}'.format(pnpc_args.publishers.hosting_as))
+        o_msg = PnpIMessage()
+        msg = ListPublishersMessage()
+        msg.hosting_as = enc.Name.from_str(pnpc_args.publishers.hosting_as[0])
+        o_msg.listpublishers_message = msg
+        logging.debug('ListPublishers message:\n{}'.format(o_msg.listpublishers_message))
     else:
         exit(get_examples())
     return o_msg
 
 
+def print_result(dpkt):
+    if not dpkt.hosting_as_list:
+        print('{} -> not found'.format(enc.Name.to_str(dpkt.publisher_name)))
+        return
+    print('{} -> {}'.format(enc.Name.to_str(dpkt.publisher_name), convert_names_to_strings(dpkt.hosting_as_list)))
+
+
 async def main(msg):
     try:
         logging.debug('About to express an interest to: {}'.format(pnps_string_name))
@@ -105,8 +136,15 @@ async def main(msg):
         logging.debug('Received Data Name: {}'.format(enc.Name.to_str(data_name)))
         logging.debug(pkt_context['meta_info'])
         logging.debug(bytes(content) if content else None)
-        dpkt = PnpDMessage.parse(content)
-        print('{} -> {}'.format(enc.Name.to_str(dpkt.publisher_name), convert_names_to_strings(dpkt.hosting_as_list)))
+        if msg.getmany_message is not None:
+            for dpkt in PnpDManyMessage.parse(content).results:
+                print_result(dpkt)
+        elif msg.withdraw_message is not None or msg.listpublishers_message is not None:
+            dpkt = PnpDPublishersMessage.parse(content)
+            print('{} -> {}'.format(enc.Name.to_str(dpkt.hosting_as),
+                                    [enc.Name.to_str(n) for n in dpkt.publisher_names]))
+        else:
+            print_result(PnpDMessage.parse(content))
     except types.InterestNack as err:
         # A NACK is received
         print('Nacked with reason={}'.format(err.reason))
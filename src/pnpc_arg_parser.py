@@ -26,11 +26,14 @@ def parse_args(parser, commands):
 def get_examples():
     example_string = """
 Examples:
-  Add:     pnps.py add     /google /AS1 /AS2 /AS3
-  Remove:  pnps.py remove  /google /AS2
-  Set:     pnps.py set     /google /AS4 /AS5
-  Get:     pnps.py get     /google
-  GetLpm:  pnps.py getlpm  /google2"""
+  Add:        pnps.py add        /google /AS1 /AS2 /AS3
+  Remove:     pnps.py remove     /google /AS2
+  Set:        pnps.py set        /google /AS4 /AS5
+  Get:        pnps.py get        /google
+  GetLpm:     pnps.py getlpm     /google2
+  GetMany:    pnps.py getmany    /google /yahoo /squ [--lpm]
+  Withdraw:   pnps.py withdraw   /AS2
+  Publishers: pnps.py publishers /AS2"""
     return example_string
 
 
@@ -69,5 +72,19 @@ def get_args():
     parser_getlpm.add_argument('publisher_name', metavar='<Publisher Name>', nargs=1,
                                help='the name of publisher, i.e. /squ')
 
+    parser_getmany = subparsers.add_parser('getmany', help='Get hosting ASes for several publisher names at once')
+    parser_getmany.add_argument('publisher_names', metavar='<Publisher Names>', nargs='+',
+                                help='the names of publishers, i.e. /squ /google')
+    parser_getmany.add_argument('--lpm', action='store_true',
+                                help='Resolve the names with LPM (Default: exact match)')
+
+    parser_withdraw = subparsers.add_parser('withdraw', help='Remove a hosting AS from every publisher listing it')
+    parser_withdraw.add_argument('hosting_as', metavar='<AS Number>', nargs=1,
+                                 help='the hosting Autonomous System Number, i.e. /AS1')
+
+    parser_publishers = subparsers.add_parser('publishers', help='List the publishers hosted in an AS')
+    parser_publishers.add_argument('hosting_as', metavar='<AS Number>', nargs=1,
+                                   help='the hosting Autonomous System Number, i.e. /AS1')
+
     args = parse_args(parent_parser, subparsers)
     return args
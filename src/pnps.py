@@ -1,17 +1,30 @@
 import argparse
+import asyncio
+import json
 import pathlib
 import typing
 import logging
+import multiprocessing
 import os
+import socket
+from time import perf_counter_ns
 from ndn import appv2
 from ndn import encoding as enc
 
 import validator
-from Algo_ECHT import ECHTBE
-from OurModel import AddMessage, PnpDMessage, PnpIMessage
+import Selector
+from Algo_Mapping import NamedAdapter
+from BloomFilter import BloomFront
+from ComponentTable import table as component_table
+from LatencyStats import LatencyStats
+from OurModel import AddMessage, PnpDManyMessage, PnpIMessage, make_data_message, make_publishers_message
+from ResultCache import ResultCache
+from Signing import SignedDataCache, get_signer
+from SnapshotWorkers import WorkerLinks, WriterLink, is_mutation
+from WriteAheadLog import OP_ADD, OP_REMOVE, OP_SET, OP_WITHDRAW, WriteAheadLog
 import configparser
+from concurrent.futures import ThreadPoolExecutor
 from datasets.DSManager import DSM
-from utils import convert_names_to_strings
 
 # region logging
 logging.basicConfig(format='{asctime} {levelname} [{filename}:{lineno}] {message}',
@@ -20,89 +33,423 @@ logging.basicConfig(format='{asctime} {levelname} [{filename}:{lineno}] {message
                     style='{')
 
 logging.getLogger('asyncio').setLevel(logging.WARNING)
+# Messages logged for every request pass their arguments to logging, which formats them only if the level is enabled
 # endregion logging
 
 # region Globals
 app = appv2.NDNApp()
 keychain = app.default_keychain()
-keychain.get_signer({})
 pid = os.getpid()
+refreeze_future = None
+# Replies to mutations waiting for the next WAL group commit, and the timer flushing them
+uncommitted_replies = []
+group_commit_handle = None
+compaction_future = None
+# Commits must be written in order, they all go through a single thread
+wal_executor = ThreadPoolExecutor(max_workers=1)
+# The stages of a request timed in the latency histograms. cache_hit replaces parse, resolve and encode for the replies
+# found in the result cache, forward replaces resolve and encode for the mutations a worker sends to the writer. The
+# reply of a mutation waiting for the WAL is only scheduled in the reply stage
+LATENCY_STAGES = ('parse', 'resolve', 'encode', 'cache_hit', 'forward', 'sign', 'reply', 'total')
 # endregion Globals
 
 
-def construct_proper_reply(received_app_params, dbm):
-    msg = PnpIMessage.parse(received_app_params)
-    logging.debug('Received the following PNP_Interest message:{}'.format(msg))
+def refreeze_if_needed(dbm, threshold):
+    """Merges the overlay of a frozen backend into a new snapshot in a worker thread, lookups keep being answered"""
+    global refreeze_future
+    if dbm.overlay_entries < threshold or (refreeze_future is not None and not refreeze_future.done()) or \
+            (compaction_future is not None and not compaction_future.done()):
+        return
+    logging.info('Refreezing the backend after {} mutations'.format(dbm.overlay_entries))
+    refreeze_future = asyncio.get_running_loop().run_in_executor(None, dbm.freeze)
+    refreeze_future.add_done_callback(lambda f: release_components())
+
+
+def release_components():
+    """
+    Releases the components of the names a refreeze merged away from the shared ComponentTable. Runs on the event loop,
+    where the backend is mutated, and not while a compaction writes a snapshot of the backend in a worker thread.
+    """
+    if compaction_future is not None and not compaction_future.done():
+        return
+    logging.info('Released {} components of removed names'.format(component_table.collect()))
+
+
+def reply_when_committed(wal, send_reply, group_size, group_window):
+    """
+    Defers the reply to a mutation until the WAL is flushed. The group is committed when it reaches group_size replies,
+    or group_window seconds after its first reply, so that a single fsync acknowledges all of them.
+    """
+    global group_commit_handle
+    uncommitted_replies.append(send_reply)
+    if len(uncommitted_replies) >= group_size:
+        commit_group(wal)
+    elif group_commit_handle is None:
+        group_commit_handle = asyncio.get_running_loop().call_later(group_window, commit_group, wal)
+
+
+def commit_group(wal):
+    global group_commit_handle, uncommitted_replies
+    if group_commit_handle is not None:
+        group_commit_handle.cancel()
+        group_commit_handle = None
+    replies, uncommitted_replies = uncommitted_replies, []
+    future = asyncio.get_running_loop().run_in_executor(wal_executor, wal.commit)
+
+    def send_replies(f):
+        if f.exception() is not None:
+            logging.error('WAL commit failed, {} mutations are not acknowledged: {}'
+                          .format(len(replies), f.exception()))
+            return
+        for send_reply in replies:
+            send_reply()
+    future.add_done_callback(send_replies)
+
+
+def compact_if_needed(dbm, wal, snapshot_path, threshold):
+    """
+    Folds the WAL into a new base snapshot in the background once it reaches threshold bytes. The log is rotated
+    first, mutations made while the snapshot is written go to the new log.
+    """
+    global compaction_future
+    if (compaction_future is not None and not compaction_future.done()) or \
+            (refreeze_future is not None and not refreeze_future.done()) or len(wal) < threshold:
+        return
+    logging.info('Compacting the WAL of {} bytes into {}'.format(len(wal), snapshot_path))
+
+    async def compact():
+        await publish_snapshot(dbm, wal, snapshot_path)
+        logging.info('Compacted the WAL into {}'.format(snapshot_path))
+    compaction_future = asyncio.ensure_future(compact())
+
+
+async def publish_snapshot(dbm, wal, snapshot_path):
+    """
+    Writes a new snapshot of the backend, then renames it over snapshot_path: the processes that mapped the previous
+    one keep reading it until they open the new one. The WAL, if any, is rotated first and the mutations it held are
+    dropped once they are in the snapshot.
+    """
+    loop = asyncio.get_running_loop()
+    if wal is not None:
+        await loop.run_in_executor(wal_executor, wal.rotate)
+    tmp_path = str(snapshot_path) + '.tmp'
+    await loop.run_in_executor(None, dbm.save_snapshot, tmp_path)
+    os.replace(tmp_path, snapshot_path)
+    if wal is not None:
+        wal.drop_rotated()
+
+
+def construct_proper_reply(msg, dbm, wal=None, cache=None):
+    logging.debug('Received the following PNP_Interest message:%s', msg)
     reply = []
     if msg.add_message is not None:
-        logging.debug('Add message:\n{}'.format(msg.add_message))
+        logging.debug('Add message:\n%s', msg.add_message)
         entry_key = [i.tobytes() for i in msg.add_message.publisher_name]
         entry_values = [[location.tobytes() for location in locations] for locations in msg.add_message.hosting_as_list]
-        logging.debug('Received a pnps-add request to advertise {} in {}'.format(entry_key, entry_values))
+        logging.debug('Received a pnps-add request to advertise %s in %s', entry_key, entry_values)
         dbm.add(entry_key, entry_values)
+        if wal is not None:
+            wal.append(OP_ADD, entry_key, entry_values)
+        if cache is not None:
+            cache.invalidate(entry_key)
         reply = dbm.get(entry_key)
-        logging.debug('Replying to pnps-add({}) with: {}'.format(entry_key, reply))
+        logging.debug('Replying to pnps-add(%s) with: %s', entry_key, reply)
         reply = (entry_key, reply)
     elif msg.remove_message is not None:
-        logging.debug('Received a pnps-remove request for: %s', enc.Name.to_str(msg.remove_message.publisher_name))
-        entry_key = enc.Name.to_str(msg.remove_message.publisher_name)
-        entry_values = convert_names_to_strings(msg.remove_message.hosting_as_list)
-        if entry_values is None:
+        entry_key = [i.tobytes() for i in msg.remove_message.publisher_name]
+        logging.debug('Received a pnps-remove request for: %s', entry_key)
+        entry_values = [[location.tobytes() for location in locations]
+                        for locations in msg.remove_message.hosting_as_list]
+        if not entry_values:
             reply = dbm.remove(entry_key)
         else:
             reply = dbm.remove(entry_key, entry_values)
+        if wal is not None:
+            wal.append(OP_REMOVE, entry_key, entry_values)
+        if cache is not None:
+            cache.invalidate(entry_key)
+        logging.debug('Replying to pnps-remove(%s) with: %s', entry_key, reply)
         reply = (entry_key, reply)
     elif msg.set_message is not None:
-        logging.debug('Received a pnps-set request for: %s', enc.Name.to_str(msg.set_message.publisher_name))
         entry_key = [i.tobytes() for i in msg.set_message.publisher_name]
+        logging.debug('Received a pnps-set request for: %s', entry_key)
         entry_values = [[location.tobytes() for location in locations] for locations in msg.set_message.hosting_as_list]
         dbm.set(entry_key, entry_values)
+        if wal is not None:
+            wal.append(OP_SET, entry_key, entry_values)
+        if cache is not None:
+            cache.invalidate(entry_key)
         reply = dbm.get(entry_key)
-        logging.debug('Replying to pnps-set({}) with: {}'.format(entry_key, reply))
+        logging.debug('Replying to pnps-set(%s) with: %s', entry_key, reply)
         reply = (entry_key, reply)
     elif msg.get_message is not None:
         entry_key = [i.tobytes() for i in msg.get_message.publisher_name]
-        logging.debug('Received a pnps-get request for: {}'.format(entry_key))
+        logging.debug('Received a pnps-get request for: %s', entry_key)
         reply = dbm.get(entry_key)
-        logging.debug('Replying to pnps-get({}) with: {}'.format(entry_key, reply))
+        logging.debug('Replying to pnps-get(%s) with: %s', entry_key, reply)
         reply = (entry_key, reply)
     elif msg.getlpm_message is not None:
         entry_key = [i.tobytes() for i in msg.getlpm_message.publisher_name]
-        logging.debug('Received a pnps-getlpm request for: {}'.format(entry_key))
+        logging.debug('Received a pnps-getlpm request for: %s', entry_key)
         reply = dbm.lpm(entry_key)
-        logging.debug('Replying to pnps-getlpm({}) with: {}'.format(entry_key, reply))
-    logging.debug("Returning the following reply to express_interest: {}".format(reply))
+        logging.debug('Replying to pnps-getlpm(%s) with: %s', entry_key, reply)
+    elif msg.getmany_message is not None:
+        entry_keys = [[i.tobytes() for i in name] for name in msg.getmany_message.publisher_names]
+        logging.debug('Received a pnps-getmany request for %s names (LPM: %s)', len(entry_keys),
+                      bool(msg.getmany_message.lpm))
+        if msg.getmany_message.lpm:
+            # Misses keep the queried name, so every result of the batch can be matched with its query
+            reply = [(k if lpm_k is None else lpm_k, v)
+                     for k, (lpm_k, v) in zip(entry_keys, dbm.lpm_many(entry_keys))]
+        else:
+            reply = list(zip(entry_keys, dbm.get_many(entry_keys)))
+    elif msg.withdraw_message is not None:
+        hosting_as = [i.tobytes() for i in msg.withdraw_message.hosting_as]
+        logging.debug('Received a pnps-withdraw request for: %s', hosting_as)
+        withdrawn = dbm.withdraw(hosting_as)
+        if wal is not None:
+            wal.append(OP_WITHDRAW, hosting_as, [])
+        if cache is not None:
+            for entry_key in withdrawn:
+                cache.invalidate(entry_key)
+        reply = make_publishers_message(hosting_as, withdrawn)
+        logging.debug('Withdrew %s from %s publishers', hosting_as, len(withdrawn))
+    elif msg.listpublishers_message is not None:
+        hosting_as = [i.tobytes() for i in msg.listpublishers_message.hosting_as]
+        logging.debug('Received a pnps-publishers request for: %s', hosting_as)
+        reply = make_publishers_message(hosting_as, dbm.get_publishers(hosting_as))
+    logging.debug("Returning the following reply to express_interest: %s", reply)
     return reply
 
 
-async def main(database_manager):
+def encode_reply(reply_content) -> bytes:
+    """Encodes the result of construct_proper_reply() into the content of the Data packet"""
+    if isinstance(reply_content, list):
+        # A batched query is answered with all of its results in a single Data packet
+        data_packet = PnpDManyMessage()
+        data_packet.results = [make_data_message(k, v) for k, v in reply_content]
+    elif isinstance(reply_content, enc.TlvModel):
+        data_packet = reply_content
+    else:
+        data_packet = make_data_message(*reply_content)
+    return data_packet.encode()
+
+
+def cache_stats(result_cache, data_cache) -> dict:
+    """Returns the statistics reported with the latency histograms"""
+    return {'pid': pid, 'result_cache': result_cache.stats() if result_cache is not None else None,
+            'signed_data': data_cache.stats()}
+
+
+async def main(database_manager, wal, result_cache, data_cache, latency, writer_link=None):
+    """
+    Serves the registrations on app_route.
+    :param writer_link: in a worker, the WriterLink mutations are sent to. Lookups are answered from the last snapshot
+    generation the writer published
+    """
     logging.info('The ndn app server on {} is ready ...'.format(app_route))
+    interests = 0
+    # The histograms are looked up once, recording a duration is then a method call
+    parse_histogram, resolve_histogram, encode_histogram, hit_histogram, forward_histogram, sign_histogram, \
+        reply_histogram, total_histogram = (latency.histogram(stage) for stage in LATENCY_STAGES)
+
+    def forward_to_writer(name, params, reply, start, parsed):
+        """Sends a mutation to the writer, and replies with its answer"""
+        def on_written(future):
+            if future.exception() is not None:
+                logging.error('The mutation {} was not applied: {}'.format(enc.Name.to_str(name), future.exception()))
+                return
+            forwarded = perf_counter_ns()
+            forward_histogram.record(forwarded - parsed)
+            data = data_cache.make_data(name, future.result())
+            signed = perf_counter_ns()
+            sign_histogram.record(signed - forwarded)
+            reply(data)
+            replied = perf_counter_ns()
+            reply_histogram.record(replied - signed)
+            total_histogram.record(replied - start)
+        writer_link.mutate(params).add_done_callback(on_written)
+
+    def on_generation(generation):
+        database_manager.open_snapshot(snapshot_path)
+        if result_cache is not None:
+            result_cache.clear()
+        logging.info('Serving the snapshot generation {} of {}'.format(generation, snapshot_path))
+
+    if writer_link is not None:
+        await writer_link.start(on_generation)
 
     @app.route(app_route, validator=appv2.pass_all)
     def on_interest(name: enc.FormalName, _app_param: typing.Optional[enc.BinaryStr],
                     reply: appv2.ReplyFunc, context: appv2.PktContext):
-        publisher_lpm, data_packet_content = construct_proper_reply(_app_param, database_manager)
-        data_packet = PnpDMessage()
-        data_packet.publisher_name = publisher_lpm
-        data_packet.hosting_as_list = data_packet_content
-        logging.debug('>> I: {}, {}'.format(enc.Name.to_str(name), context["int_param"]))
-        content = data_packet.encode()
-        reply(app.make_data(name, content=content, signer=keychain.get_signer({}), freshness_period=10000))
-        logging.debug('<< D: {}'.format(enc.Name.to_str(name)))
-        logging.debug(enc.MetaInfo(freshness_period=10000))
-        logging.debug('Content: (size: {})'.format(len(content)))
+        nonlocal interests
+        interests += 1
+        start = perf_counter_ns()
+        appended = wal.appended if wal is not None else 0
+        cache_key = bytes(_app_param) if result_cache is not None and _app_param is not None else None
+        content = result_cache.get(cache_key) if cache_key is not None else None
+        if content is None:
+            msg = PnpIMessage.parse(_app_param)
+            parsed = perf_counter_ns()
+            parse_histogram.record(parsed - start)
+            if writer_link is not None and is_mutation(msg):
+                forward_to_writer(name, _app_param, reply, start, parsed)
+                return
+            reply_content = construct_proper_reply(msg, database_manager, wal, result_cache)
+            resolved = perf_counter_ns()
+            resolve_histogram.record(resolved - parsed)
+            content = encode_reply(reply_content)
+            if cache_key is not None:
+                result_cache.put(cache_key, msg, reply_content, content)
+            encoded = perf_counter_ns()
+            encode_histogram.record(encoded - resolved)
+        else:
+            encoded = perf_counter_ns()
+            hit_histogram.record(encoded - start)
+        data = data_cache.make_data(name, content)
+        signed = perf_counter_ns()
+        sign_histogram.record(signed - encoded)
+        if wal is not None and wal.appended > appended:
+            reply_when_committed(wal, lambda: reply(data), wal_group_size, wal_group_window)
+        else:
+            reply(data)
+        replied = perf_counter_ns()
+        reply_histogram.record(replied - signed)
+        total_histogram.record(replied - start)
+        if logging.root.isEnabledFor(logging.DEBUG):
+            logging.debug('>> I: {}, {}'.format(enc.Name.to_str(name), context["int_param"]))
+            logging.debug('<< D: {}'.format(enc.Name.to_str(name)))
+            logging.debug(enc.MetaInfo(freshness_period=10000))
+            logging.debug('Content: (size: {})'.format(len(content)))
+        if interests % cache_stats_interval == 0:
+            if result_cache is not None:
+                logging.info('Result cache after {} Interests: {}'.format(interests, result_cache.stats()))
+            logging.info('Signed Data after {} Interests: {}'.format(interests, data_cache.stats()))
+        if args.freeze:
+            refreeze_if_needed(database_manager, refreeze_threshold)
+        if wal is not None and snapshot_path is not None:
+            compact_if_needed(database_manager, wal, snapshot_path, wal_compaction_bytes)
+
+    @app.route(app_route + '/stats', validator=appv2.pass_all)
+    def on_stats(name: enc.FormalName, _app_param: typing.Optional[enc.BinaryStr],
+                 reply: appv2.ReplyFunc, context: appv2.PktContext):
+        content = json.dumps(latency.to_dict(**cache_stats(result_cache, data_cache))).encode()
+        reply(app.make_data(name, content=content, signer=data_cache.signer, freshness_period=1000))
+
+
+async def writer(database_manager, wal, links):
+    """
+    Applies the mutations the workers send, one at a time, and publishes a new snapshot generation publish_interval
+    seconds after the first mutation it does not hold. Mutations received while a generation is written go to the next
+    one. Returns once every worker is disconnected.
+    """
+    loop = asyncio.get_running_loop()
+    generation = 0
+    publish_handle = None
+    publishing = False
+
+    def schedule_publish():
+        nonlocal publish_handle
+        if publish_handle is None and not publishing:
+            publish_handle = loop.call_later(publish_interval, publish)
+
+    def publish():
+        nonlocal publish_handle, publishing
+        publish_handle = None
+        publishing = True
+        asyncio.ensure_future(publish_snapshot(database_manager, wal, snapshot_path)).add_done_callback(published)
+
+    def published(future):
+        nonlocal generation, publishing
+        publishing = False
+        if future.exception() is not None:
+            logging.error('Could not publish a new snapshot generation: {}'.format(future.exception()))
+        else:
+            generation += 1
+            links.publish(generation)
+            logging.info('Published the snapshot generation {} after {} mutations'.format(generation, links.mutations))
+        if database_manager.overlay_entries:
+            schedule_publish()
+
+    def on_mutation(params, send_reply):
+        appended = wal.appended if wal is not None else 0
+        content = encode_reply(construct_proper_reply(PnpIMessage.parse(params), database_manager, wal))
+        if wal is not None and wal.appended > appended:
+            reply_when_committed(wal, lambda: send_reply(content), wal_group_size, wal_group_window)
+        else:
+            send_reply(content)
+        schedule_publish()
+
+    logging.info('The writer of {} is serving {} workers'.format(snapshot_path, len(links.socks)))
+    await links.serve(on_mutation)
+    if publish_handle is not None:
+        publish_handle.cancel()
+    if wal is not None and uncommitted_replies:
+        commit_group(wal)
+
+
+def run_worker(index, database_manager, sock, writer_socks, result_cache, data_cache):
+    """
+    Runs in a worker process forked by the writer: serves app_route from the snapshot the writer mapped before forking,
+    whose pages are shared by all the processes, and sends the mutations to the writer.
+    :param writer_socks: the ends of the writer inherited when forking, closed so that the worker sees the writer exit
+    """
+    global pid
+    pid = os.getpid()
+    for writer_sock in writer_socks:
+        writer_sock.close()
+    latency = LatencyStats()
+    writer_link = WriterLink(sock)
+    try:
+        app.run_forever(after_start=main(database_manager, None, result_cache, data_cache, latency, writer_link))
+    except ConnectionRefusedError:
+        logging.warning('NFD is not running ... worker {} exiting.'.format(index))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        writer_link.close()
+        if stats_file:
+            worker_stats_file = '{}.{}'.format(stats_file, index)
+            latency.dump(worker_stats_file, worker=index, **cache_stats(result_cache, data_cache))
+            logging.info('Dumped the latency statistics of worker {} to {}'.format(index, worker_stats_file))
 
 
 if __name__ == "__main__":
     # region Arguments Parser
-    algorithms = {'echt': ECHTBE}
+    algorithms = {a.name.lower(): a for a in Selector.Algorithms}
     parser = argparse.ArgumentParser('pnps.py')
-    parser.add_argument('--algo', nargs=1, metavar='Algorithm', default='echt',
-                        help='Backend algorithm (Options: echt. Default: echt)')
+    parser.add_argument('--algo', metavar='Algorithm', default='echt', choices=algorithms,
+                        help='Backend algorithm (Options: {}. Default: echt). Text backends are served through a '
+                             'NamedAdapter'.format(', '.join(algorithms)))
     parser.add_argument('--route', nargs=1, metavar='Route', default='/AS1/PNPS',
                         help='Server mounting point (Default: /AS1/PNPS)')
     parser.add_argument('--noload', action='store_true',
                         help='Do not preload the default dataset (Default: load)')
+    parser.add_argument('--freeze', action='store_true',
+                        help='Serve from a read-only snapshot of the loaded dataset. Mutations go to an overlay that '
+                             'is merged into a new snapshot every refreeze_threshold mutations '
+                             '(Default: do not freeze)')
+    parser.add_argument('--snapshot', nargs=1, metavar='SnapshotFile',
+                        help='Serve from a memory-mapped snapshot file. The file is written after loading the dataset '
+                             'if it does not exist yet, and opened without loading the dataset otherwise '
+                             '(Default: no snapshot)')
+    parser.add_argument('--bloom', action='store_true',
+                        help='Answer the GETs and LPMs of unregistered names from a Bloom filter of the registered '
+                             'ones, sized in the [BloomFilter] section of app.ini. Not supported with --snapshot '
+                             '(Default: no filter)')
+    parser.add_argument('--cache', action='store_true',
+                        help='Answer repeated GETs and LPMs from a cache of their encoded replies, invalidated by the '
+                             'mutations of their names and sized in the [ResultCache] section of app.ini '
+                             '(Default: no cache)')
+    parser.add_argument('--wal', nargs=1, metavar='LogFile',
+                        help='Log every add/remove/set/withdraw to a write-ahead log replayed at startup. Replies to '
+                             'mutations are sent once the log is flushed. With --snapshot, the log is compacted into '
+                             'the snapshot (Default: no log)')
+    parser.add_argument('--workers', metavar='Count', type=int, default=0,
+                        help='Serve with Count worker processes mapping the --snapshot file, each registering the '
+                             'route. Mutations are applied by this process, which publishes them in new snapshot '
+                             'generations every publish_interval_ms of the [Workers] section of app.ini '
+                             '(Default: 0, a single process)')
     parser.add_argument('--config', nargs=1, metavar='ConfigFile', default='/etc/ndn/pnp/app.ini',
                         help='Configuration File. (Created by running: sudo ./runme.sh)')
     args = parser.parse_args()
@@ -116,19 +463,53 @@ if __name__ == "__main__":
     application_config = configparser.ConfigParser()
     application_config.read(args.config)
     app_route = application_config.get('PNPS', 'app_route')
+    logging.getLogger().setLevel(application_config.get('PNPS', 'log_level', fallback='DEBUG').upper())
+    stats_file = application_config.get('PNPS', 'stats_file', fallback=None)
+    refreeze_threshold = application_config.getint('AlgorithmsConfiguration', 'refreeze_threshold', fallback=10000)
+    wal_group_size = application_config.getint('WriteAheadLog', 'group_size', fallback=64)
+    wal_group_window = application_config.getfloat('WriteAheadLog', 'group_window_ms', fallback=5) / 1000
+    wal_fsync = application_config.getboolean('WriteAheadLog', 'fsync', fallback=True)
+    wal_compaction_bytes = application_config.getint('WriteAheadLog', 'compaction_bytes', fallback=64 * 1024 ** 2)
+    bloom_capacity = application_config.getint('BloomFilter', 'capacity', fallback=1000000)
+    bloom_fp_rate = application_config.getfloat('BloomFilter', 'fp_rate', fallback=0.01)
+    cache_capacity = application_config.getint('ResultCache', 'capacity', fallback=100000)
+    cache_stats_interval = application_config.getint('ResultCache', 'stats_interval', fallback=100000)
+    cache_doorkeeper = application_config.getboolean('ResultCache', 'doorkeeper', fallback=True)
+    publish_interval = application_config.getfloat('Workers', 'publish_interval_ms', fallback=1000) / 1000
+    try:
+        signer = get_signer(application_config.get('Signing', 'mode', fallback='keychain'), keychain,
+                            application_config.get('Signing', 'hmac_key_name', fallback=None),
+                            application_config.get('Signing', 'hmac_key', fallback=None))
+    except ValueError as e:
+        exit(str(e))
+    data_cache = SignedDataCache(signer, application_config.getint('Signing', 'data_cache_capacity', fallback=100000))
     # endregion Configuration
 
     # region Backend Algorithm - instantiation
-    if args.algo in algorithms:
-        dbm = algorithms[args.algo]()
-    else:
+    try:
+        dbm = Selector.get_backend(algorithms[args.algo])
+    except NotImplementedError:
         exit('{} is not an implemented algorithm'.format(args.algo))
+    if args.bloom:
+        if args.snapshot:
+            exit('--bloom is not supported with --snapshot, the filter is not saved in the snapshot')
+        dbm = BloomFront(dbm, bloom_capacity, bloom_fp_rate)
+    if dbm.default_dataset_format == Selector.BackEndType.utf.name:
+        dbm = NamedAdapter(dbm)
+    if (args.freeze or args.snapshot) and not hasattr(dbm, 'freeze'):
+        exit('--freeze and --snapshot are not supported by {}, only by echt'.format(args.algo))
+    if args.workers and not args.snapshot:
+        exit('--workers requires --snapshot, the workers share the snapshot file')
 
     logging.info('Staring the server on {}'.format(app_route))
     # endregion Backend Algorithm - instantiation
 
     # region Dataset Manager -if configured-
-    if not args.noload:
+    snapshot_path = pathlib.Path(args.snapshot[0]) if args.snapshot else None
+    if snapshot_path is not None and snapshot_path.exists():
+        dbm.open_snapshot(snapshot_path)
+        logging.info('Serving from the snapshot {} of {} nodes'.format(snapshot_path, dbm.get_total_nodes()))
+    elif not args.noload:
         default_ds = application_config.get('DatasetManager', 'default_ds')
         loading_batch_size = int(application_config.get('AlgorithmsConfiguration',
                                                         'batch_size_for_batch_loading'))
@@ -136,15 +517,74 @@ if __name__ == "__main__":
         dsm.active_dataset = default_ds + '_' + dbm.default_dataset_format
         dataset = dsm.get_current()
         dbm.batch_load(dataset, loading_batch_size)
+        logging.info('Loaded {} components, {} of them distinct'.format(dbm.get_total_components(),
+                                                                        dbm.get_distinct_components()))
+        logging.info('Backend estimated size: {} bytes'.format(dbm.size()))
+        if args.bloom:
+            logging.info('Bloom filter: {}'.format(dbm.stats()))
+        if snapshot_path is not None:
+            dbm.save_snapshot(snapshot_path)
+            logging.info('Saved the snapshot {}'.format(snapshot_path))
+    if args.freeze and snapshot_path is None:
+        dbm.freeze()
+        logging.info('Serving from a frozen snapshot of {} nodes'.format(dbm.get_total_nodes()))
     # endregion Dataset Manager -if configured-
 
+    # region Write-ahead log
+    wal = None
+    if args.wal:
+        wal = WriteAheadLog(args.wal[0], wal_fsync)
+        logging.info('Replayed {} mutations from the write-ahead log'.format(wal.replay(dbm)))
+    # endregion Write-ahead log
+
+    result_cache = ResultCache(cache_capacity, cache_doorkeeper) if args.cache else None
+    latency = LatencyStats()
+
+    # region Workers
+    if args.workers:
+        # The workers map the snapshot file rather than copying the backend: it is written with the mutations of the
+        # WAL, and mapped by this process too before forking
+        if wal is not None and dbm.overlay_entries:
+            wal.rotate()
+            dbm.save_snapshot(str(snapshot_path) + '.tmp')
+            os.replace(str(snapshot_path) + '.tmp', snapshot_path)
+            wal.drop_rotated()
+        dbm.open_snapshot(snapshot_path)
+        socks = []
+        workers = []
+        context = multiprocessing.get_context('fork')
+        for index in range(args.workers):
+            writer_sock, worker_sock = socket.socketpair()
+            worker = context.Process(target=run_worker, name='pnps-worker-{}'.format(index),
+                                     args=(index, dbm, worker_sock, socks + [writer_sock], result_cache, data_cache))
+            worker.start()
+            worker_sock.close()
+            socks.append(writer_sock)
+            workers.append(worker)
+        logging.info('Started {} workers on {}'.format(args.workers, app_route))
+        try:
+            asyncio.run(writer(dbm, wal, WorkerLinks(socks)))
+        except KeyboardInterrupt:
+            logging.info('Interrupted')
+        for worker in workers:
+            worker.join()
+        logging.info('Shutting down the workers on ' + app_route)
+        exit(0)
+    # endregion Workers
+
     # region main
     try:
         # Start the ndn listening server
-        app.run_forever(after_start=main(dbm))
+        app.run_forever(after_start=main(dbm, wal, result_cache, data_cache, latency))
     except ConnectionRefusedError:
         logging.warning("NFD is not running ... exiting.")
         exit('NFD is not running .. exiting.')
+    except KeyboardInterrupt:
+        logging.info('Interrupted')
+    finally:
+        if stats_file:
+            latency.dump(stats_file, **cache_stats(result_cache, data_cache))
+            logging.info('Dumped the latency statistics to {}'.format(stats_file))
     # endregion main
 
     logging.info('Shutting down the server on ' + app_route)
@@ -1,4 +1,5 @@
 import logging
+import sys
 from ndn import encoding as enc
 
 
@@ -67,3 +68,44 @@ def insert_component_suffix_component(text: str):
     results = text + '/x'
     return results
 # endregion Text Modifications
+
+
+# region Memory
+def deep_sizeof(obj, exclude=None) -> int:
+    """
+    Returns the number of bytes reachable from obj, counting every object once. Containers, objects with __slots__
+    and objects with __dict__ are walked iteratively, so deep structures do not hit the recursion limit.
+    :param obj: the object to measure
+    :param exclude: an optional object whose reachable objects are not counted, i.e. a table shared with others
+    """
+    seen = set()
+    if exclude is not None:
+        _sizeof_walk(exclude, seen)
+    return _sizeof_walk(obj, seen)
+
+
+def _sizeof_walk(obj, seen: set) -> int:
+    """Returns the size of the objects reachable from obj that are not in seen, and adds them to seen"""
+    total = 0
+    stack = [obj]
+    while stack:
+        o = stack.pop()
+        if id(o) in seen:
+            continue
+        seen.add(id(o))
+        total += sys.getsizeof(o)
+        if isinstance(o, dict):
+            stack.extend(o.keys())
+            stack.extend(o.values())
+        elif isinstance(o, (list, tuple, set, frozenset)):
+            stack.extend(o)
+        else:
+            for cls in type(o).__mro__:
+                slots = cls.__dict__.get('__slots__', ())
+                for s in (slots,) if isinstance(slots, str) else slots:
+                    if hasattr(o, s):
+                        stack.append(getattr(o, s))
+            if hasattr(o, '__dict__') and not isinstance(o, type):
+                stack.append(o.__dict__)
+    return total
+# endregion Memory
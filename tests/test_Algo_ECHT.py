@@ -1,6 +1,10 @@
+import os
+import tempfile
 import unittest
-from unittest import TestCase
+from unittest import TestCase, mock
+import Algo_ECHT
 from Algo_ECHT import ECHTBE
+from ComponentTable import table as component_table
 from datasets.DSManager import DSM
 from ndn import encoding as enc
 unittest.TestLoader.sortTestMethodsUsing = None
@@ -59,3 +63,251 @@ class TestECHTBE(TestCase):
         new_key = enc.Name.from_str('/xyxyxyx' + enc.Name.to_str(query_key))
         actual_k, actual_v = self.algo.bcm(new_key)
         self.assertIsNone(actual_v)
+
+
+class TestECHTBENodes(TestCase):
+
+    def setUp(self) -> None:
+        self.algo = ECHTBE()
+
+    def test_node_promotion(self):
+        for i in range(20):
+            self.algo.add(enc.Name.from_str('/com/google/x{}'.format(i)),
+                          [enc.Name.from_str('/AS{}'.format(i)), enc.Name.from_str('/AS99')])
+        self.assertEqual(22, self.algo.total_nodes)
+        for i in range(20):
+            actual = self.algo.get(enc.Name.from_str('/com/google/x{}'.format(i)))
+            self.assertListEqual([enc.Name.from_str('/AS{}'.format(i)), enc.Name.from_str('/AS99')], actual)
+        self.assertListEqual([], self.algo.get(enc.Name.from_str('/com/google/x20')))
+        self.assertListEqual([], self.algo.get(enc.Name.from_str('/com/google')))
+
+    def test_lpm_skips_intermediary_nodes(self):
+        value = [enc.Name.from_str('/AS1'), enc.Name.from_str('/AS2')]
+        self.algo.add(enc.Name.from_str('/com/google'), value)
+        self.algo.add(enc.Name.from_str('/com/google/mail/www'), [enc.Name.from_str('/AS3')])
+        actual_k, actual_v = self.algo.lpm(enc.Name.from_str('/com/google/mail/x'))
+        self.assertListEqual(enc.Name.from_str('/com/google'), actual_k)
+        self.assertListEqual(value, actual_v)
+
+    def test_to_dict(self):
+        value = [enc.Name.from_str('/AS1'), enc.Name.from_str('/AS2')]
+        self.algo.add(enc.Name.from_str('/om/edu/squ'), value)
+        expected = {b'\x08\x02om': {'': None, b'\x08\x03edu': {'': None, b'\x08\x03squ': {'': value}}}}
+        self.assertDictEqual(expected, self.algo.to_dict())
+
+    def test_add_many(self):
+        keys = [enc.Name.from_str('/com/google/x{}'.format(i)) for i in range(20)] + \
+               [enc.Name.from_str('/com/google'), enc.Name.from_str('/com/google/x3')]
+        values = [[enc.Name.from_str('/AS{}'.format(i)), enc.Name.from_str('/AS99')] for i in range(22)]
+        for k, v in zip(keys, values):
+            self.algo.add(k, v)
+        bulk = ECHTBE()
+        bulk.add_many(zip(keys, values))
+        self.assertDictEqual(self.algo.to_dict(), bulk.to_dict())
+        self.assertEqual(self.algo.total_nodes, bulk.total_nodes)
+        self.assertEqual(self.algo.size(), bulk.size())
+
+    def test_get_many(self):
+        value = [enc.Name.from_str('/AS1'), enc.Name.from_str('/AS2')]
+        self.algo.add(enc.Name.from_str('/com/google'), value)
+        queries = [enc.Name.from_str(n) for n in ['/com/google', '/com/google/mail', '/org']]
+        self.assertListEqual([value, [], []], self.algo.get_many(queries))
+        self.assertListEqual([(queries[0], value), (queries[0], value), (None, None)], self.algo.lpm_many(queries))
+
+
+class TestECHTBEFrozen(TestCase):
+
+    def setUp(self) -> None:
+        self.algo = ECHTBE()
+        self.names = ['/com/google', '/com/google/mail', '/com/yahoo/www', '/om/edu/squ'] + \
+                     ['/org/x{}'.format(i) for i in range(40)]
+        for n in self.names:
+            self.algo.add(enc.Name.from_str(n), [enc.Name.from_str('/AS1'), enc.Name.from_str('/AS2')])
+        self.expected = self.algo.to_dict()
+        self.algo.freeze()
+
+    def test_freeze(self):
+        self.assertTrue(self.algo.is_frozen())
+        self.assertDictEqual(self.expected, self.algo.to_dict())
+        for n in self.names:
+            self.assertListEqual([enc.Name.from_str('/AS1'), enc.Name.from_str('/AS2')],
+                                 self.algo.get(enc.Name.from_str(n)))
+        self.assertListEqual([], self.algo.get(enc.Name.from_str('/com')))
+        actual_k, actual_v = self.algo.lpm(enc.Name.from_str('/com/yahoo/www/x'))
+        self.assertListEqual(enc.Name.from_str('/com/yahoo/www'), actual_k)
+        actual_k, actual_v = self.algo.lpm(enc.Name.from_str('/com/yahoo'))
+        self.assertIsNone(actual_v)
+
+    def test_overlay_and_refreeze(self):
+        self.algo.add(enc.Name.from_str('/com/google'), [enc.Name.from_str('/AS3')])
+        self.algo.add(enc.Name.from_str('/com/yahoo'), [enc.Name.from_str('/AS4'), enc.Name.from_str('/AS5')])
+        self.assertEqual(2, self.algo.overlay_entries)
+        expected = [enc.Name.from_str('/AS1'), enc.Name.from_str('/AS2'), enc.Name.from_str('/AS3')]
+        self.assertListEqual(expected, self.algo.get(enc.Name.from_str('/com/google')))
+        actual_k, actual_v = self.algo.lpm(enc.Name.from_str('/com/yahoo/mail'))
+        self.assertListEqual(enc.Name.from_str('/com/yahoo'), actual_k)
+        # The snapshot itself is never changed
+        self.assertEqual(2, len(self.algo._frozen.get(enc.Name.from_str('/com/google'))))
+
+        self.algo.freeze()
+        self.assertEqual(0, self.algo.overlay_entries)
+        self.assertListEqual(expected, self.algo.get(enc.Name.from_str('/com/google')))
+        self.assertListEqual([enc.Name.from_str('/AS4'), enc.Name.from_str('/AS5')],
+                             self.algo.get(enc.Name.from_str('/com/yahoo')))
+
+    def test_mutations_during_freeze(self):
+        reference = ECHTBE()
+        for n in self.names:
+            reference.add(enc.Name.from_str(n), [enc.Name.from_str('/AS1'), enc.Name.from_str('/AS2')])
+        reference.freeze()
+        mutations = [(enc.Name.from_str('/net/new/www'), [enc.Name.from_str('/AS3')]),
+                     (enc.Name.from_str('/com/google'), [enc.Name.from_str('/AS3')])]
+        for algo in (self.algo, reference):
+            algo.add(enc.Name.from_str('/com/yahoo'), [enc.Name.from_str('/AS4')])
+        reference.freeze()
+        for entry_key, entry_value in mutations:
+            reference.add(entry_key, entry_value)
+
+        # The mutations are made by the event loop while the snapshot is built in a worker thread
+        def build(root):
+            for k, v in mutations:
+                self.algo.add(k, v)
+            return frozen_echt(root)
+        frozen_echt = Algo_ECHT.FrozenECHT
+        with mock.patch.object(Algo_ECHT, 'FrozenECHT', build):
+            self.algo.freeze()
+        self.assertDictEqual(reference.to_dict(), self.algo.to_dict())
+        self.assertEqual(reference.total_nodes, self.algo.total_nodes)
+        # The snapshots differ by the ids of the components interned meanwhile, the overlays do not
+        self.assertEqual(reference._root_size, self.algo._root_size)
+        self.assertEqual(self.algo._frozen.estimated_size + self.algo._root_size + self.algo._hosted.estimated_size,
+                         self.algo.estimated_size)
+
+    def test_collect_components(self):
+        algo = ECHTBE()
+        names = [enc.Name.from_str('/collect/collect-{}'.format(i)) for i in range(3)]
+        hosting_as = enc.Name.from_str('/collect-as')
+        for name in names:
+            algo.add(name, [hosting_as])
+        algo.freeze()
+        for name in names[:2]:
+            algo.remove(name)
+        algo.freeze()
+        self.assertGreaterEqual(component_table.collect(), 2)
+        self.assertIsNone(component_table.id_of(names[0][1]))
+        self.assertIsNone(component_table.id_of(names[1][1]))
+        self.assertEqual(hosting_as, algo.get(names[2]))
+        # The released ids are reused by the names added afterwards
+        algo.add(names[0], [hosting_as])
+        self.assertEqual(hosting_as, algo.get(names[0]))
+        self.assertEqual((names[2], hosting_as), algo.lpm(names[2]))
+        self.assertCountEqual([names[0], names[2]], algo.get_publishers(hosting_as))
+        # The components of the other backends are kept
+        self.assertDictEqual(self.expected, self.algo.to_dict())
+
+    def test_snapshot_file(self):
+        self.algo.add(enc.Name.from_str('/com/yahoo'), [enc.Name.from_str('/AS3')])
+        expected = self.algo.to_dict()
+        with tempfile.TemporaryDirectory() as snapshot_dir:
+            snapshot_path = os.path.join(snapshot_dir, 'snapshot.bin')
+            self.algo.save_snapshot(snapshot_path)
+            algo = ECHTBE()
+            algo.open_snapshot(snapshot_path)
+            self.assertDictEqual(expected, algo.to_dict())
+            self.assertEqual(self.algo.total_nodes, algo.total_nodes)
+            self.assertListEqual(enc.Name.from_str('/AS3'), algo.get(enc.Name.from_str('/com/yahoo')))
+            actual_k, actual_v = algo.lpm(enc.Name.from_str('/com/google/mail/x'))
+            self.assertListEqual(enc.Name.from_str('/com/google/mail'), actual_k)
+            self.assertListEqual([enc.Name.from_str('/com/yahoo')], algo.get_publishers(enc.Name.from_str('/AS3')))
+            algo.remove(enc.Name.from_str('/com/yahoo'))
+            algo.freeze()
+            self.assertListEqual([], algo.get(enc.Name.from_str('/com/yahoo')))
+            self.assertListEqual([], algo.get_publishers(enc.Name.from_str('/AS3')))
+
+
+class TestECHTBEMutations(TestCase):
+
+    def setUp(self) -> None:
+        self.algo = ECHTBE()
+        self.as1 = enc.Name.from_str('/AS1')
+        self.as2 = enc.Name.from_str('/AS2')
+        self.algo.add(enc.Name.from_str('/com/google'), [self.as1, self.as2])
+
+    def test_remove_prunes(self):
+        self.algo.add(enc.Name.from_str('/com/google/mail/www'), [self.as1, self.as2])
+        self.assertListEqual([self.as2], self.algo.remove(enc.Name.from_str('/com/google/mail/www'), [self.as1]))
+        self.assertListEqual([], self.algo.remove(enc.Name.from_str('/com/google/mail/www')))
+        self.assertEqual(2, self.algo.total_nodes)
+        actual_k, actual_v = self.algo.lpm(enc.Name.from_str('/com/google/mail/www'))
+        self.assertListEqual(enc.Name.from_str('/com/google'), actual_k)
+        self.assertListEqual([], self.algo.remove(enc.Name.from_str('/com/google'), [self.as1, self.as2]))
+        self.assertEqual(0, self.algo.total_nodes)
+        self.assertDictEqual({}, self.algo.to_dict())
+        self.assertListEqual([], self.algo.get_publishers(self.as1))
+
+    def test_set(self):
+        as3 = enc.Name.from_str('/AS3')
+        self.algo.set(enc.Name.from_str('/com/google'), [self.as2, as3])
+        self.assertListEqual([self.as2, as3], self.algo.get(enc.Name.from_str('/com/google')))
+        self.assertListEqual([], self.algo.get_publishers(self.as1))
+        self.assertListEqual([enc.Name.from_str('/com/google')], self.algo.get_publishers(as3))
+        self.algo.set(enc.Name.from_str('/com/google'), [])
+        self.assertEqual(0, self.algo.total_nodes)
+
+    def test_remove_frozen(self):
+        self.algo.add(enc.Name.from_str('/com/google/mail'), [self.as1, self.as2])
+        self.algo.freeze()
+        self.algo.remove(enc.Name.from_str('/com/google/mail'))
+        self.assertListEqual([], self.algo.get(enc.Name.from_str('/com/google/mail')))
+        actual_k, actual_v = self.algo.lpm(enc.Name.from_str('/com/google/mail/www'))
+        self.assertListEqual(enc.Name.from_str('/com/google'), actual_k)
+        self.algo.freeze()
+        self.assertEqual(2, self.algo.total_nodes)
+        self.assertListEqual([], self.algo.get(enc.Name.from_str('/com/google/mail')))
+
+
+class TestECHTBEReverseIndex(TestCase):
+
+    def setUp(self) -> None:
+        self.algo = ECHTBE()
+        self.as1 = enc.Name.from_str('/AS1')
+        self.as2 = enc.Name.from_str('/AS2')
+        self.algo.add(enc.Name.from_str('/com/google'), [self.as1, self.as2])
+        self.algo.add(enc.Name.from_str('/com/yahoo'), [self.as2, enc.Name.from_str('/AS3')])
+        self.algo.add(enc.Name.from_str('/om/edu/squ'), [self.as1, enc.Name.from_str('/AS3')])
+
+    def test_get_publishers(self):
+        expected = [enc.Name.from_str('/com/google'), enc.Name.from_str('/com/yahoo')]
+        self.assertListEqual(expected, self.algo.get_publishers(self.as2))
+        self.assertListEqual([], self.algo.get_publishers(enc.Name.from_str('/AS9')))
+
+    def test_withdraw(self):
+        self.algo.freeze()
+        expected = [enc.Name.from_str('/com/google'), enc.Name.from_str('/om/edu/squ')]
+        self.assertListEqual(expected, self.algo.withdraw(self.as1))
+        self.assertListEqual([], self.algo.get_publishers(self.as1))
+        self.assertListEqual(self.as2, self.algo.get(enc.Name.from_str('/com/google')))
+        self.assertListEqual(enc.Name.from_str('/AS3'), self.algo.get(enc.Name.from_str('/om/edu/squ')))
+        self.assertListEqual([], self.algo.withdraw(self.as1))
+
+
+class TestECHTBESize(TestCase):
+
+    def assertEstimate(self, algo):
+        exact = algo.size(exact=True)
+        self.assertAlmostEqual(exact, algo.size(), delta=exact * 0.01)
+
+    def test_estimated_size(self):
+        algo = ECHTBE()
+        for i in range(1000):
+            algo.add(enc.Name.from_str('/com/site{}/www'.format(i)),
+                     [enc.Name.from_str('/AS1'), enc.Name.from_str('/AS2')])
+        algo.add(enc.Name.from_str('/com/site1/www'), [enc.Name.from_str('/AS3')])
+        algo.remove(enc.Name.from_str('/com/site2/www'), [enc.Name.from_str('/AS1'), enc.Name.from_str('/AS2')])
+        for i in range(100, 300):
+            algo.remove(enc.Name.from_str('/com/site{}/www'.format(i)))
+        algo.set(enc.Name.from_str('/com/site4/www'), [enc.Name.from_str('/AS5')])
+        self.assertEstimate(algo)
+        algo.freeze()
+        algo.add(enc.Name.from_str('/com/site3/www'), [enc.Name.from_str('/AS4')])
+        self.assertEstimate(algo)
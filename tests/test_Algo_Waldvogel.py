@@ -0,0 +1,54 @@
+import random
+from unittest import TestCase
+
+from ndn import encoding as enc
+
+from Algo_Mapping import NamedTestBE
+from Algo_Waldvogel import INITIAL_MAX_LENGTH, WaldvogelBE
+
+
+class TestWaldvogel(TestCase):
+
+    def setUp(self) -> None:
+        self.algo = WaldvogelBE()
+        self.ref = NamedTestBE()
+        self.as1 = enc.Name.from_str('/AS1')
+        self.as2 = enc.Name.from_str('/AS2')
+
+    def name(self, depth, prefix='/a'):
+        return enc.Name.from_str(prefix + ''.join('/c{}'.format(i) for i in range(1, depth)))
+
+    def check(self, names):
+        for name in names:
+            self.assertEqual(self.ref.lpm(name), self.algo.lpm(name))
+            self.assertEqual(self.ref.get(name), self.algo.get(name))
+
+    def test_markers(self):
+        # Shorter names added after the longer ones make the markers of the longer ones stale
+        deep = self.name(7)
+        queries = [self.name(d) for d in range(1, 9)] + [self.name(6, '/b')]
+        for depth, hosting_as in ((7, self.as1), (2, self.as2), (5, self.as1), (1, self.as2)):
+            for a in (self.algo, self.ref):
+                a.add(self.name(depth), [hosting_as])
+            self.check(queries)
+        self.assertEqual((self.name(5), [self.as1]), self.algo.lpm(self.name(6)))
+        for depth in (5, 7, 2):
+            for a in (self.algo, self.ref):
+                a.remove(self.name(depth))
+            self.check(queries + [deep])
+        self.assertEqual((self.name(1), [self.as2]), self.algo.lpm(deep))
+
+    def test_grow(self):
+        rng = random.Random(3)
+        names = [self.name(rng.randint(1, 3 * INITIAL_MAX_LENGTH), '/' + rng.choice('abc')) for _ in range(200)]
+        for name in names:
+            hosting_as = rng.choice((self.as1, self.as2))
+            for a in (self.algo, self.ref):
+                a.add(name, [hosting_as])
+        self.assertGreaterEqual(self.algo._map.max_length, 3 * INITIAL_MAX_LENGTH)
+        self.check(names + [n + [enc.Component.from_str('x')] for n in names] + [n[:-1] for n in names])
+        for name in names[::2]:
+            for a in (self.algo, self.ref):
+                a.remove(name)
+        self.check(names)
+        self.assertEqual(len(self.ref.to_dict()), len(self.algo.to_dict()))
@@ -0,0 +1,90 @@
+from unittest import TestCase
+
+from ndn import encoding as enc
+
+import Selector
+from Algo_Mapping import MappingBE, NamedAdapter
+from datasets.DSManager import DSM
+from datasets.Trace import Trace
+
+
+class TestBackends(TestCase):
+    """Checks every backend against the reference backend of its format, UTFTest or NamedTest"""
+
+    def setUp(self) -> None:
+        self.dsm = DSM()
+        self.backends = [a for a in Selector.Algorithms
+                         if a not in (Selector.Algorithms.UTFTest, Selector.Algorithms.NamedTest)]
+
+    def reference(self, algorithm):
+        if algorithm.value is Selector.BackEndType.utf:
+            return Selector.get_backend(Selector.Algorithms.UTFTest)
+        return Selector.get_backend(Selector.Algorithms.NamedTest)
+
+    def names(self, algo, **kwargs):
+        return Trace.generate(self.dsm, '1k_' + algo.default_dataset_format, 300, seed=5, **kwargs).names(self.dsm)
+
+    def test_resolve(self):
+        for algorithm in self.backends:
+            with self.subTest(algorithm.name):
+                algo = Selector.get_backend(algorithm)
+                ref = self.reference(algorithm)
+                for a in (algo, ref):
+                    a.batch_load(self.dsm.get_cache('1k_' + a.default_dataset_format), 400)
+                for name in self.names(algo):
+                    self.assertEqual(ref.get(name), algo.get(name))
+                    self.assertEqual(ref.lpm(name), algo.lpm(name))
+                self.assertEqual(ref.get_total_components(), algo.get_total_components())
+                if algorithm is not Selector.Algorithms.ECHT:
+                    # ECHT counts the components of its table, shared by all its instances
+                    self.assertEqual(ref.get_distinct_components(), algo.get_distinct_components())
+
+    def test_update(self):
+        for algorithm in self.backends:
+            with self.subTest(algorithm.name):
+                algo = Selector.get_backend(algorithm)
+                if algo.default_dataset_format == 'utf':
+                    google, mail, as1, as2 = '/com/google', '/com/google/mail', '/as1', '/as2'
+                else:
+                    google, mail, as1, as2 = (enc.Name.from_str(n) for n in
+                                              ('/com/google', '/com/google/mail', '/as1', '/as2'))
+                algo.add(google, [as1, as2])
+                algo.add(mail, [as1])
+                child = mail + '/x' if isinstance(mail, str) else mail + [enc.Component.from_str('x')]
+                self.assertEqual((mail, [as1]), algo.lpm(child))
+                self.assertEqual((mail, as1), algo.lpm(mail))
+                self.assertEqual([as2], algo.remove(google, [as1]))
+                self.assertEqual([mail], algo.get_publishers(as1))
+                self.assertEqual([mail], algo.withdraw(as1))
+                self.assertEqual([], algo.get(mail))
+                self.assertFalse(algo.is_entry(mail)[0])
+                algo.set(google, [as1])
+                self.assertEqual(as1, algo.get(google))
+                algo.set(google, [])
+                self.assertEqual((None, None), algo.lpm(mail))
+                if algo.default_dataset_format == 'utf':
+                    self.assertEqual(0, algo.entries)
+
+    def test_estimated_size(self):
+        # The per-name and per-node constants of the mapping backends are calibrated on these datasets
+        for algorithm in Selector.Algorithms:
+            for dataset, names in (('1k', None), ('1m', 20000)):
+                algo = Selector.get_backend(algorithm)
+                if not isinstance(algo, MappingBE):
+                    continue
+                with self.subTest(algorithm.name, dataset=dataset):
+                    ds = self.dsm.get_cache(dataset + '_' + algo.default_dataset_format)
+                    algo.batch_load(ds.slice(0, names) if names else ds, 10000)
+                    self.assertLess(abs(algo.size() / algo.size(exact=True) - 1), 0.03)
+
+    def test_named_adapter(self):
+        algo = NamedAdapter(Selector.get_backend(Selector.Algorithms.SimpleDictionary))
+        google = enc.Name.from_str('/com/google')
+        as1 = enc.Name.from_str('/AS1')
+        algo.add(google, [as1])
+        self.assertEqual(as1, algo.get(google))
+        self.assertEqual((google, [as1]), algo.lpm(google + [enc.Component.from_str('x')]))
+        self.assertEqual([google], algo.get_publishers(as1))
+        self.assertEqual('SimpleDictionary', algo.be_name)
+        self.assertEqual([google], algo.withdraw(as1))
+        self.assertEqual([], algo.get(google))
@@ -0,0 +1,75 @@
+from unittest import TestCase
+
+from ndn import encoding as enc
+
+import Selector
+from BloomFilter import BloomFront, CountingBloomFilter
+from datasets.DSManager import DSM
+from datasets.Trace import Trace
+
+
+class TestCountingBloomFilter(TestCase):
+
+    def test_add_remove(self):
+        flt = CountingBloomFilter(1000, 0.01)
+        items = [hash('/name/{}'.format(i)) for i in range(1000)]
+        for h in items:
+            flt.add(h)
+        self.assertTrue(all(h in flt for h in items))
+        self.assertTrue(flt.contains_many(items).all())
+        others = [hash('/other/{}'.format(i)) for i in range(10000)]
+        self.assertLess(sum(h in flt for h in others), 300)
+        self.assertEqual([h in flt for h in others], list(flt.contains_many(others)))
+        for h in items[::2]:
+            flt.remove(h)
+        self.assertTrue(all(h in flt for h in items[1::2]))
+        self.assertEqual(500, len(flt))
+
+
+class TestBloomFront(TestCase):
+    """The front must answer every lookup as its backend does"""
+
+    def setUp(self) -> None:
+        self.dsm = DSM()
+
+    def test_resolve(self):
+        for algorithm in (Selector.Algorithms.ECHT, Selector.Algorithms.STrie, Selector.Algorithms.Waldvogel):
+            with self.subTest(algorithm.name):
+                algo = Selector.get_backend(algorithm)
+                front = BloomFront(Selector.get_backend(algorithm), 1000, 0.01)
+                ds_name = '1k_' + algo.default_dataset_format
+                for a in (algo, front):
+                    a.batch_load(self.dsm.get_cache(ds_name), 400)
+                names = Trace.generate(self.dsm, ds_name, 300, seed=7).names(self.dsm)
+                for name in names:
+                    self.assertEqual(algo.get(name), front.get(name))
+                    self.assertEqual(algo.lpm(name), front.lpm(name))
+                self.assertEqual(algo.get_many(names), front.get_many(names))
+                self.assertGreater(front.rejected, 0)
+
+    def test_update(self):
+        front = BloomFront(Selector.get_backend(Selector.Algorithms.ECHT), 100, 0.01)
+        google, mail, child, as1, as2 = (enc.Name.from_str(n) for n in
+                                         ('/com/google', '/com/google/mail', '/com/google/mail/x', '/as1', '/as2'))
+        front.add(google, [as1, as2])
+        front.add(mail, [as1])
+        self.assertEqual((mail, [as1]), front.lpm(child))
+        self.assertEqual([google, mail], front.withdraw(as1))
+        self.assertEqual([], front.get(mail))
+        self.assertEqual((google, [as2]), front.lpm(child))
+        self.assertEqual([], front.remove(google))
+        self.assertEqual((None, None), front.lpm(child))
+        self.assertEqual(0, len(front.filter))
+        self.assertFalse(any(front.filter.counters))
+
+    def test_long_names(self):
+        # Names longer than the initial hash powers, registered before and after the powers grow
+        front = BloomFront(Selector.get_backend(Selector.Algorithms.STrie), 100, 0.01)
+        deep = '/' + '/'.join(str(i) for i in range(20))
+        deeper = '/' + '/'.join(str(i) for i in range(40))
+        front.add(deep, ['/as1'])
+        self.assertEqual((deep, ['/as1']), front.lpm(deeper + '/x'))
+        front.add(deeper, ['/as2'])
+        self.assertEqual((deeper, ['/as2']), front.lpm(deeper + '/x'))
+        self.assertEqual((deep, ['/as1']), front.lpm(deep + '/x'))
+        self.assertEqual('/as1', front.get(deep))
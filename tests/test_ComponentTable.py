@@ -0,0 +1,54 @@
+from unittest import TestCase
+
+from ComponentTable import ComponentTable
+from ndn import encoding as enc
+
+
+class TestComponentTable(TestCase):
+
+    def setUp(self) -> None:
+        self.table = ComponentTable()
+
+    def test_intern(self):
+        www = enc.Name.from_str('/www')[0]
+        cid = self.table.intern(www)
+        self.assertEqual(cid, self.table.intern(bytes(www)))
+        self.assertEqual(cid, self.table.id_of(www))
+        self.assertEqual(bytes(www), self.table.component(cid))
+        self.assertIsNone(self.table.id_of(enc.Name.from_str('/edu')[0]))
+        self.assertEqual(1, self.table.get_distinct_components())
+        self.assertEqual(2, self.table.get_dedup_ratio())
+
+    def test_intern_name(self):
+        name = self.table.intern_name(enc.Name.from_str('/AS1'))
+        self.assertIs(name, self.table.intern_name(enc.Name.from_str('/AS1')))
+        self.assertListEqual(enc.Name.from_str('/AS1'), name)
+        self.assertIsNot(name, self.table.intern_name(enc.Name.from_str('/AS2')))
+        self.assertEqual(2, len(self.table))
+
+    def test_collect(self):
+        class User:
+            def __init__(self, ids, names):
+                self.ids = ids
+                self.names = names
+
+            def mark_components(self, ids, names):
+                ids.update(self.ids)
+                names.update(map(id, self.names))
+
+        www, edu, org = (enc.Name.from_str(n)[0] for n in ('/www', '/edu', '/org'))
+        as1 = self.table.intern_name(enc.Name.from_str('/AS1'))
+        user = User([self.table.intern(www)], [as1])
+        self.table.register(user)
+        edu_id = self.table.intern(edu)
+        self.table.intern_name(enc.Name.from_str('/AS2'))
+        self.assertEqual(2, self.table.collect())
+        self.assertIsNone(self.table.id_of(edu))
+        self.assertIs(as1, self.table.intern_name(enc.Name.from_str('/AS1')))
+        self.assertEqual(2, len(self.table))
+        # Released ids are reused, the ids kept do not change
+        self.assertIn(self.table.intern(org), (edu_id, edu_id + 1))
+        self.assertEqual(bytes(www), self.table.component(user.ids[0]))
+        del user
+        self.assertEqual(3, self.table.collect())
+        self.assertEqual(0, len(self.table))
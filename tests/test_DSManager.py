@@ -1,5 +1,13 @@
-from unittest import TestCase
+import os
+import tarfile
+import shutil
+import tempfile
+from unittest import TestCase, mock
+from Algo_ECHT import ECHTBE
+import datasets.DSManager
 from datasets.DSManager import DSM
+from datasets.Dataset import Dataset, encode_csv, read_csv
+from ndn import encoding as enc
 import pathlib
 
 
@@ -8,10 +16,10 @@ class TestDSM(TestCase):
         self.dsm = DSM()
         self.assertIsNotNone(self.dsm)
 
-        # Check cache file
-        path = pathlib.Path('/tmp/dsm_cache.pkl')
-        is_file = path.is_file()
-        self.assertTrue(is_file)
+        # Check cache files
+        for name in self.dsm.cache:
+            path = pathlib.Path(DSM.get_columns_path(name))
+            self.assertTrue(path.is_file())
 
     def test_populate_cache(self):
         self.assertGreater(self.dsm.populate_time, 0, msg='Time should elapse while creating/loading dataset')
@@ -31,3 +39,99 @@ class TestDSM(TestCase):
         self.assertEqual(1000000, len(utf_cache))
         self.assertEqual(1000000, len(named_cache))
 
+    def test_columns(self):
+        utf_cache = self.dsm.get_cache('few_utf')
+        named_cache = self.dsm.get_cache('few_named')
+        for (utf_k, utf_v), (named_k, named_v) in zip(utf_cache.items(), named_cache.items()):
+            self.assertEqual(enc.Name.from_str(utf_k), named_k)
+            self.assertListEqual([enc.Name.from_str(i) for i in utf_v], named_v)
+            self.assertListEqual(utf_v, utf_cache.find(utf_k))
+            self.assertListEqual(named_v, named_cache.find(named_k))
+        with self.assertRaises(KeyError):
+            named_cache.find(enc.Name.from_str('/not/in/few'))
+        batch = named_cache.slice(2, 4)
+        self.assertEqual(2, len(batch))
+        self.assertListEqual(list(named_cache.items())[2:4], list(batch.items()))
+
+    def test_read_csv(self):
+        named_cache = self.dsm.get_cache('few_named')
+        with tempfile.TemporaryDirectory() as ds_dir:
+            tar_path = os.path.join(ds_dir, 'publisher_few.tar.gz')
+            with tarfile.open(tar_path, 'w:gz') as tar:
+                tar.add(named_cache.path, arcname='publisher_few.csv')
+            for path in (named_cache.path, tar_path):
+                entries = list(read_csv(path, True, chunk_size=64))
+                self.assertListEqual(list(named_cache.items()), entries)
+            streamed = ECHTBE()
+            streamed.batch_load(read_csv(tar_path, True), 3)
+            loaded = ECHTBE()
+            loaded.batch_load(named_cache, 3)
+            self.assertDictEqual(loaded.to_dict(), streamed.to_dict())
+            self.assertEqual(len(named_cache), streamed.processed_nodes)
+
+    def test_parallel_encoding(self):
+        named_cache = self.dsm.get_cache('few_named')
+        with tempfile.TemporaryDirectory() as ds_dir:
+            csv_path = os.path.join(ds_dir, 'publisher_dup.csv')
+            with open(named_cache.path) as src, open(csv_path, 'w') as dst:
+                dst.write(src.read())
+                dst.write('/com/zde8g/6nc,/AS1\n')
+            fragments = list(encode_csv(csv_path, True, workers=2, chunk_size=64))
+            self.assertGreater(len(fragments), 1)
+            self.assertEqual(len(named_cache) + 1, sum(len(f[2]) for f in fragments))
+            serial = Dataset('dup', True, csv_path)
+            parallel = Dataset('dup', True, csv_path, workers=2)
+            self.assertEqual(len(named_cache), len(parallel))
+            self.assertListEqual(list(serial.items()), list(parallel.items()))
+            self.assertListEqual([enc.Name.from_str('/AS1')], parallel.find(enc.Name.from_str('/com/zde8g/6nc')))
+
+    def test_incremental_rebuild(self):
+        with tempfile.TemporaryDirectory() as ds_dir, tempfile.TemporaryDirectory() as cache_dir:
+            files = {}
+            for name in ('few', '1k'):
+                files[name] = os.path.join(ds_dir, 'publisher_{}.csv'.format(name))
+                shutil.copy(self.dsm.get_cache(name + '_named').path, files[name])
+            with mock.patch.object(datasets.DSManager, 'cache_home', cache_dir), \
+                    mock.patch.object(datasets.DSManager, 'datasets', {v: k for k, v in files.items()}):
+                self.assertCountEqual(['few_utf', 'few_named', '1k_utf', '1k_named'], DSM().rebuilt)
+                # Same content, newer mtime
+                os.utime(files['1k'], ns=(0, os.stat(files['1k']).st_mtime_ns + 10 ** 9))
+                self.assertListEqual([], DSM().rebuilt)
+                with open(files['few'], 'a') as fh:
+                    fh.write('/com/zde8g/6nc,/AS1\n')
+                dsm = DSM()
+                self.assertListEqual(['few_utf', 'few_named'], dsm.rebuilt)
+                self.assertListEqual(['/AS1'], dsm.get_cache('few_utf').find('/com/zde8g/6nc'))
+                self.assertCountEqual(['few_utf', 'few_named', '1k_utf', '1k_named'], dsm.populate_times)
+                self.assertListEqual([], DSM().rebuilt)
+                # A deleted columns file is rebuilt, even when its fingerprint still matches the content
+                os.utime(files['1k'], ns=(0, os.stat(files['1k']).st_mtime_ns + 10 ** 9))
+                os.remove(DSM.get_columns_path('1k_named'))
+                self.assertListEqual(['1k_named'], DSM().rebuilt)
+
+    def test_sampling(self):
+        for name in ('few_utf', 'few_named', '1m_named'):
+            ds = self.dsm.get_cache(name)
+            sample = ds.sample(len(ds), seed=7)
+            self.assertEqual(len(ds), len(set(sample.tolist())))
+            self.assertListEqual(sample.tolist(), ds.sample(len(ds), seed=7).tolist())
+            self.assertListEqual([ds.key(i) for i in sample[:100].tolist()], ds.keys(sample[:100]))
+            self.assertListEqual(ds.keys(ds.sample(10, seed=7)), list(ds.get_keys(10, seed=7)))
+            self.assertEqual(5, len(ds.choice(5, seed=3)))
+        batch = self.dsm.get_cache('few_named').slice(2, 4)
+        self.assertListEqual(sorted(batch.sample(10).tolist()), [2, 3])
+        self.assertListEqual([batch.key(2), batch.key(3)], list(batch.get_keys()))
+
+    def test_negative_pools(self):
+        algo = ECHTBE()
+        algo.load(self.dsm.get_cache('few_named'))
+        for category in ('miss', 'lpm'):
+            pool = self.dsm.get_negative('few_named', category)
+            self.assertGreater(len(pool), 0)
+            self.assertListEqual([enc.Name.to_str(k) for k in pool.get_keys()],
+                                 list(self.dsm.get_negative('few_utf', category).get_keys()))
+            for name in pool.get_keys():
+                self.assertListEqual([], algo.get(name))
+                self.assertEqual(category == 'lpm', algo.lpm(name)[1] is not None)
+        with self.assertRaises(ValueError):
+            self.dsm.get_negative('few_named', 'hit')
@@ -0,0 +1,46 @@
+import json
+import os
+import tempfile
+from unittest import TestCase
+
+from LatencyStats import BUCKETS, LatencyHistogram, LatencyStats, bucket_bounds
+
+
+class TestLatencyStats(TestCase):
+
+    def test_buckets(self):
+        h = LatencyHistogram()
+        for ns in (0, 15, 16, 17, 1000, 123456789, 2 ** 63 - 1):
+            h.record(ns)
+            index = max(i for i, c in enumerate(h.counts) if c)
+            lower, upper = bucket_bounds(index)
+            self.assertTrue(lower <= ns < upper, ns)
+            self.assertLessEqual(upper - lower, max(1, lower // 8))
+        self.assertEqual(BUCKETS - 1, index)
+
+    def test_percentiles(self):
+        h = LatencyHistogram()
+        for ns in range(1, 1001):
+            h.record(ns * 1000)
+        for q, expected in ((50, 500000), (90, 900000), (99, 990000)):
+            self.assertTrue(expected <= h.percentile(q) <= expected * 1.125, q)
+        self.assertEqual(1000000, h.percentile(100))
+        self.assertEqual({'count': 1000, 'mean_us': 500.5, 'max_us': 1000.0},
+                         {k: v for k, v in h.summary().items() if k in ('count', 'mean_us', 'max_us')})
+        self.assertEqual(0, LatencyHistogram().percentile(50))
+
+    def test_merge(self):
+        stats = LatencyStats()
+        for ns in (100, 2000, 30000):
+            stats.record('total', ns)
+        with tempfile.TemporaryDirectory() as d:
+            path = os.path.join(d, 'stats.json')
+            stats.dump(path, pid=1)
+            with open(path) as f:
+                dumped = json.load(f)
+        self.assertEqual(1, dumped['pid'])
+        h = LatencyHistogram.from_dict(dumped['stages']['total'])
+        self.assertEqual(stats.histogram('total').counts, h.counts)
+        h.merge(stats.histogram('total'))
+        self.assertEqual((6, 64200, 30000), (h.count, h.total, h.max))
+        self.assertEqual(stats.histogram('total').percentile(50), h.percentile(50))
@@ -0,0 +1,19 @@
+from unittest import TestCase
+
+import Selector
+import performance.Benchmarks as bench
+from datasets.DSManager import DSM
+
+
+class TestCR(TestCase):
+    def test_cr_trials(self):
+        cr = bench.cr_trials(DSM(), [Selector.Algorithms.ECHT, Selector.Algorithms.STrie], ['few', '1k'], 100,
+                             [10, 100], warmup=1, repetitions=2)
+        self.assertListEqual(['ECHT', 'ECHT', 'STrie', 'STrie'], list(cr.trials['backend_name']))
+        report = cr.consolidated()
+        self.assertEqual(4 * (1 + 4 * 2), len(report))
+        self.assertListEqual([20, 1000, 20, 1000], list(report.loc[report['test'] == 'load', 'Count']))
+        self.assertTrue((report['Cumulative Duration in s'] > 0).all())
+        summaries = cr.summarize()
+        self.assertListEqual(['Queries Count', 'ECHT_few', 'ECHT_1k', 'STrie_few', 'STrie_1k'],
+                             list(summaries['summary_gp_df'].columns))
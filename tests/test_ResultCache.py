@@ -0,0 +1,92 @@
+from unittest import TestCase
+
+from ndn import encoding as enc
+
+from Algo_ECHT import ECHTBE
+from OurModel import GetLpmMessage, GetMessage, PnpIMessage, make_data_message
+from ResultCache import ResultCache
+
+
+class TestResultCache(TestCase):
+
+    def setUp(self) -> None:
+        self.algo = ECHTBE()
+        self.cache = ResultCache(100, doorkeeper=False)
+        self.as1 = enc.Name.from_str('/AS1')
+        self.as2 = enc.Name.from_str('/AS2')
+
+    @staticmethod
+    def params(name, lpm=False) -> bytes:
+        o_msg = PnpIMessage()
+        if lpm:
+            o_msg.getlpm_message = GetLpmMessage()
+            o_msg.getlpm_message.publisher_name = enc.Name.from_str(name)
+        else:
+            o_msg.get_message = GetMessage()
+            o_msg.get_message.publisher_name = enc.Name.from_str(name)
+        return bytes(o_msg.encode())
+
+    def resolve(self, name, lpm=False) -> tuple:
+        entry_key = enc.Name.from_str(name)
+        return self.algo.lpm(entry_key) if lpm else (entry_key, self.algo.get(entry_key))
+
+    def reply(self, name, lpm=False) -> bytes:
+        return bytes(make_data_message(*self.resolve(name, lpm)).encode())
+
+    def serve(self, name, lpm=False) -> bytes:
+        params = self.params(name, lpm)
+        content = self.cache.get(params)
+        if content is None:
+            reply = self.resolve(name, lpm)
+            content = bytes(make_data_message(*reply).encode())
+            self.cache.put(params, PnpIMessage.parse(params), reply, content)
+        return content
+
+    def check(self, queries):
+        for name, lpm in queries:
+            self.assertEqual(self.reply(name, lpm), self.serve(name, lpm), name)
+
+    def test_invalidation(self):
+        queries = [('/com/google', False), ('/com/google/mail', False), ('/com/google/mail/x', True),
+                   ('/com/google/x', True), ('/com/other', True), ('/org/x', True)]
+        self.algo.add(enc.Name.from_str('/com/google'), [self.as1])
+        self.check(queries)
+        self.check(queries)
+        self.assertEqual(len(queries), self.cache.hits)
+        mutations = ((self.algo.add, '/com/google/mail', [self.as2]), (self.algo.set, '/com/google', [self.as2]),
+                     (self.algo.add, '/com', [self.as1]), (self.algo.remove, '/com/google/mail', 'all'),
+                     (self.algo.remove, '/com/google', 'all'))
+        for mutate, name, value in mutations:
+            mutate(enc.Name.from_str(name), value)
+            self.cache.invalidate(enc.Name.from_str(name))
+            self.check(queries)
+        # LPMs that matched a longer prefix than the mutated name are kept: all the queries but /com/google/x and
+        # /com/other are hits after adding /com
+        mail = enc.Name.from_str('/com/google/mail')
+        self.algo.add(mail, [self.as1])
+        self.cache.invalidate(mail)
+        self.check(queries)
+        hits = self.cache.hits
+        self.algo.add(enc.Name.from_str('/com'), [self.as2])
+        self.cache.invalidate(enc.Name.from_str('/com'))
+        self.check(queries)
+        self.assertEqual(hits + 4, self.cache.hits)
+
+    def test_eviction(self):
+        cache = self.cache = ResultCache(3, doorkeeper=False)
+        self.algo.add(enc.Name.from_str('/a'), [self.as1])
+        for name in ('/a', '/b', '/c', '/a', '/d'):
+            self.serve(name, lpm=True)
+        self.assertEqual(1, cache.hits)
+        self.assertEqual(1, cache.evictions)
+        self.assertIsNone(cache.get(self.params('/b', lpm=True)))
+        self.assertIsNotNone(cache.get(self.params('/a', lpm=True)))
+        self.assertEqual({tuple(bytes(c) for c in enc.Name.from_str(n)) for n in ('/a', '/c', '/d')}, set(cache.under))
+
+    def test_doorkeeper(self):
+        cache = self.cache = ResultCache(3)
+        for name in ('/a', '/b', '/a', '/a', '/c', '/d', '/e', '/b'):
+            self.serve(name)
+        # /a is cached on its second miss, /b was forgotten when the doorkeeper reached 3 queries
+        self.assertEqual(1, cache.hits)
+        self.assertEqual(1, len(cache))
@@ -15,3 +15,8 @@ class TestNamedBased(TestCase):
         self.assertEqual(x.value.name, 'named')
         self.assertEqual(x.value.value, 2)
 
+    def test_get_backend(self):
+        for a in Selector.Algorithms:
+            algo = Selector.get_backend(a)
+            self.assertIs(a, algo.get_be())
+            self.assertEqual(a.value.name, algo.default_dataset_format)
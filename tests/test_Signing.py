@@ -0,0 +1,34 @@
+from unittest import TestCase
+
+from ndn import encoding as enc
+from ndn.security import DigestSha256Signer
+
+from Signing import SignedDataCache, get_signer
+
+
+class TestSigning(TestCase):
+
+    def test_get_signer(self):
+        self.assertIsInstance(get_signer('digest'), DigestSha256Signer)
+        signer = get_signer('hmac', hmac_key_name='/AS1/PNPS/KEY/hmac', hmac_key='00' * 32)
+        data = enc.make_data('/a', enc.MetaInfo(), b'x', signer=signer)
+        self.assertEqual(enc.SignatureType.HMAC_WITH_SHA256, enc.parse_data(data)[3].signature_info.signature_type)
+        with self.assertRaises(ValueError):
+            get_signer('hmac', hmac_key_name='/AS1/PNPS/KEY/hmac', hmac_key='')
+        with self.assertRaises(ValueError):
+            get_signer('rsa')
+
+    def test_reuse(self):
+        data_cache = SignedDataCache(get_signer('digest'), 2)
+        a, b, c = (enc.Name.from_str(n) for n in ('/AS1/PNPS/a', '/AS1/PNPS/b', '/AS1/PNPS/c'))
+        wire = data_cache.make_data(a, b'1')
+        self.assertIs(wire, data_cache.make_data(a, b'1'))
+        name, _, content, _ = enc.parse_data(wire)
+        self.assertEqual((a, b'1'), (name, bytes(content)))
+        # A changed answer is signed again
+        self.assertEqual(b'2', bytes(enc.parse_data(data_cache.make_data(a, b'2'))[2]))
+        data_cache.make_data(b, b'1')
+        data_cache.make_data(c, b'1')
+        self.assertEqual(2, len(data_cache))
+        self.assertEqual({'Capacity': 2, 'Entries': 2, 'Hits': 1, 'Signatures': 4, 'Reuse Ratio': 0.2},
+                         data_cache.stats())
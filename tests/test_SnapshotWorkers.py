@@ -0,0 +1,53 @@
+import asyncio
+import socket
+from unittest import TestCase
+
+from ndn import encoding as enc
+
+from OurModel import AddMessage, GetMessage, PnpIMessage
+from SnapshotWorkers import WorkerLinks, WriterLink, is_mutation
+
+
+class TestSnapshotWorkers(TestCase):
+
+    def test_is_mutation(self):
+        msg = PnpIMessage()
+        msg.get_message = GetMessage()
+        msg.get_message.publisher_name = enc.Name.from_str('/a')
+        self.assertFalse(is_mutation(PnpIMessage.parse(msg.encode())))
+        msg = PnpIMessage()
+        msg.add_message = AddMessage()
+        msg.add_message.publisher_name = enc.Name.from_str('/a')
+        msg.add_message.hosting_as_list = [enc.Name.from_str('/AS1')]
+        self.assertTrue(is_mutation(PnpIMessage.parse(msg.encode())))
+
+    def test_links(self):
+        async def run():
+            pairs = [socket.socketpair() for _ in range(2)]
+            links = WorkerLinks(writer_sock for writer_sock, _ in pairs)
+            # The writer answers every mutation with its parameters reversed, the second one once the first is sent
+            deferred = []
+
+            def on_mutation(params, send_reply):
+                deferred.append((params[::-1], send_reply))
+                if len(deferred) == 2:
+                    for content, send in reversed(deferred):
+                        send(content)
+            serving = asyncio.ensure_future(links.serve(on_mutation))
+            generations = []
+            workers = [WriterLink(worker_sock) for _, worker_sock in pairs]
+            for worker in workers:
+                await worker.start(generations.append)
+            replies = await asyncio.gather(workers[0].mutate(b'abc'), workers[1].mutate(b'xyz'))
+            links.publish(1)
+            await asyncio.sleep(0.01)
+            for worker in workers:
+                worker.close()
+            await asyncio.wait_for(serving, 1)
+            return replies, generations, links.mutations, [worker.generation for worker in workers]
+
+        replies, generations, mutations, worker_generations = asyncio.run(run())
+        self.assertEqual([b'cba', b'zyx'], replies)
+        self.assertEqual([1, 1], generations)
+        self.assertEqual(2, mutations)
+        self.assertEqual([1, 1], worker_generations)
@@ -0,0 +1,58 @@
+import os
+import tempfile
+from unittest import TestCase
+
+import numpy as np
+
+from Algo_ECHT import ECHTBE
+from datasets.DSManager import DSM
+from datasets.Trace import KINDS, Trace, zipf_ranks
+
+
+class TestTrace(TestCase):
+    def setUp(self) -> None:
+        self.dsm = DSM()
+        self.trace = Trace.generate(self.dsm, '1k_named', 5000, zipf=1.2, rate=100000, seed=3)
+
+    def test_skew(self):
+        ranks = zipf_ranks(np.random.default_rng(1), 1000, 1.2, 100000)
+        counts = np.bincount(ranks, minlength=1000)
+        self.assertGreater(counts[0], counts[1])
+        self.assertGreater(counts[:10].sum(), counts[500:].sum())
+        uniform = zipf_ranks(np.random.default_rng(1), 1000, 0, 100000)
+        self.assertLess(np.bincount(uniform)[:10].sum(), 2000)
+
+    def test_mix(self):
+        trace = Trace.generate(self.dsm, '1k_named', 1000, mix={'get_negative': 1}, seed=3)
+        self.assertTrue((trace.records['kind'] == KINDS.index('get_negative')).all())
+        self.assertTrue((trace.records['time_ns'] == 0).all())
+        self.assertTrue((np.diff(self.trace.records['time_ns'].astype(np.int64)) >= 0).all())
+        with self.assertRaises(ValueError):
+            Trace.generate(self.dsm, '1k_named', 10, mix={'put': 1})
+
+    def test_save_open(self):
+        with tempfile.TemporaryDirectory() as trace_dir:
+            path = os.path.join(trace_dir, '1k.trace')
+            self.trace.save(path)
+            trace = Trace.open(path)
+            self.assertEqual('1k_named', trace.ds_name)
+            self.assertEqual(3, trace.seed)
+            self.assertTrue((self.trace.records == trace.records).all())
+            self.assertListEqual(self.trace.names(self.dsm), trace.names(self.dsm))
+
+    def test_replay(self):
+        algo = ECHTBE()
+        algo.load(self.dsm.get_cache('1k_named'))
+        names = self.trace.names(self.dsm)
+        kinds = [KINDS[k] for k in self.trace.records['kind'].tolist()]
+        for kind, name in zip(kinds, names):
+            if kind == 'get_positive':
+                self.assertNotEqual([], algo.get(name))
+            elif kind == 'lpm_positive':
+                self.assertIsNotNone(algo.lpm(name)[1])
+            else:
+                self.assertListEqual([], algo.get(name))
+                self.assertIsNone(algo.lpm(name)[1])
+        latencies = self.trace.replay(algo, self.dsm)
+        self.assertEqual(len(self.trace), len(latencies))
+        self.assertEqual(kinds.count('get_positive'), algo.perf_get_positive.get_df()['Count'].iloc[0])
@@ -0,0 +1,76 @@
+import os
+import tempfile
+from unittest import TestCase
+
+from Algo_ECHT import ECHTBE
+from WriteAheadLog import OP_ADD, OP_REMOVE, OP_SET, OP_WITHDRAW, WriteAheadLog
+from ndn import encoding as enc
+
+
+class TestWriteAheadLog(TestCase):
+
+    def setUp(self) -> None:
+        self.wal_dir = tempfile.TemporaryDirectory()
+        self.wal_path = os.path.join(self.wal_dir.name, 'pnps.wal')
+        self.wal = WriteAheadLog(self.wal_path, fsync=False)
+        self.as1 = enc.Name.from_str('/AS1')
+        self.as2 = enc.Name.from_str('/AS2')
+        self.wal.append(OP_ADD, enc.Name.from_str('/com/google'), [self.as1, self.as2])
+        self.wal.append(OP_ADD, enc.Name.from_str('/com/yahoo'), [self.as1])
+        self.wal.append(OP_REMOVE, enc.Name.from_str('/com/google'), [self.as1])
+        self.wal.append(OP_SET, enc.Name.from_str('/om/edu'), [self.as2])
+        self.wal.append(OP_REMOVE, enc.Name.from_str('/com/yahoo'), [])
+        as2 = [[bytes(c) for c in self.as2]]
+        self.expected = {b'\x08\x03com': {'': None, b'\x08\x06google': {'': as2}},
+                         b'\x08\x02om': {'': None, b'\x08\x03edu': {'': as2}}}
+
+    def tearDown(self) -> None:
+        self.wal.close()
+        self.wal_dir.cleanup()
+
+    def test_group_commit(self):
+        self.assertEqual(0, len(self.wal))
+        self.assertEqual(5, self.wal.commit())
+        self.assertEqual(0, self.wal.commit())
+        self.assertEqual(1, self.wal.commits)
+        algo = ECHTBE()
+        self.assertEqual(5, WriteAheadLog(self.wal_path).replay(algo))
+        self.assertListEqual(self.as2, algo.get(enc.Name.from_str('/com/google')))
+        self.assertListEqual([], algo.get(enc.Name.from_str('/com/yahoo')))
+        self.assertListEqual(self.as2, algo.get(enc.Name.from_str('/om/edu')))
+        self.assertDictEqual(self.expected, algo.to_dict())
+
+    def test_withdraw(self):
+        self.wal.append(OP_ADD, enc.Name.from_str('/com/bing'), [self.as1, self.as2])
+        self.wal.append(OP_WITHDRAW, self.as2, [])
+        self.wal.commit()
+        algo = ECHTBE()
+        self.assertEqual(7, WriteAheadLog(self.wal_path).replay(algo))
+        # The adds replayed before the withdraw do not bring the AS back
+        self.assertListEqual(self.as1, algo.get(enc.Name.from_str('/com/bing')))
+        self.assertListEqual([], algo.get(enc.Name.from_str('/com/google')))
+        self.assertListEqual([], algo.get_publishers(self.as2))
+
+    def test_torn_record(self):
+        self.wal.commit()
+        size = len(self.wal)
+        self.wal.append(OP_ADD, enc.Name.from_str('/com/bing'), [self.as1])
+        self.wal.commit()
+        self.wal.close()
+        os.truncate(self.wal_path, os.path.getsize(self.wal_path) - 3)
+        self.wal = WriteAheadLog(self.wal_path, fsync=False)
+        self.assertEqual(5, self.wal.replay(ECHTBE()))
+        self.assertEqual(size, os.path.getsize(self.wal_path))
+        self.assertEqual(size, len(self.wal))
+
+    def test_rotate(self):
+        self.wal.rotate()
+        self.assertEqual(0, len(self.wal))
+        self.wal.append(OP_ADD, enc.Name.from_str('/com/bing'), [self.as1])
+        self.wal.commit()
+        # A crash before drop_rotated() replays both logs
+        algo = ECHTBE()
+        self.assertEqual(6, WriteAheadLog(self.wal_path).replay(algo))
+        self.assertListEqual(self.as1, algo.get(enc.Name.from_str('/com/bing')))
+        self.wal.drop_rotated()
+        self.assertEqual(1, WriteAheadLog(self.wal_path).replay(ECHTBE()))